@@ -0,0 +1,113 @@
+"""Пакетная генерация: исходный цикл на f-строках, generate_* и BatchEncoder (пресетов в секунду).
+
+    python benchmarks/bench_batch.py [n_presets]
+
+«Исходный цикл» — генераторы до пакета luma_gen: HEX-строки уровня копируются
+и float подставляются через struct.pack(...).hex() (воспроизведены здесь, таблица
+строк Sharp нарезается из шаблона раскладки). generate_* — нынешние генераторы
+на скомпилированной раскладке. Оба пути на порядок быстрее исходного цикла, но
+encode_batch + hex не быстрее цикла generate_* (sharp медленнее, bayer на уровне шума):
+время уходит на сборку строк HEX. Быстрее generate_* только encode_batch без HEX (bytes).
+"""
+import os
+import struct
+import sys
+import time
+from copy import deepcopy
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from luma_gen.batch import blobs_to_hex, encode_batch
+from luma_gen.layouts import (
+    bayer_levels, generate_bayer_hex, generate_sharp_hex, layouts, main_sharp_levels, sharp_slices,
+)
+
+
+# --- Исходные генераторы (как до luma_gen) ---
+def float_to_hex(f):
+    return struct.pack('<f', f).hex()
+
+
+def _sharp_hex_lines():
+    """Строки HEX уровней Sharp ID15 в исходном виде: пара float через 1d, затем служебный хвост."""
+    layout = layouts["sharp_id15"]
+    template, offsets = layout.template, layout.offsets
+    bounds = list(offsets[::2]) + [len(template)]
+    lines = []
+    for i, start in enumerate(offsets[::2]):
+        lines.append(template[start:offsets[2 * i + 1] + 4].hex())
+        lines.append(template[offsets[2 * i + 1] + 4:bounds[i + 1]].hex())
+    return lines
+
+
+original_sharp_hex_lines = _sharp_hex_lines()
+
+
+def baseline_sharp_hex(values_list, level_names, level_slices):
+    lines = []
+    for i, values in enumerate(values_list):
+        l1, l1a, l2, l2a, l3, l3a = values
+        start, end = level_slices[level_names[i]["name"]]
+        modified_block = deepcopy(original_sharp_hex_lines[start:end])
+        modified_block[0] = f"{float_to_hex(l1)}1d{float_to_hex(l1a)}"
+        modified_block[2] = f"{float_to_hex(l2)}1d{float_to_hex(l2a)}"
+        modified_block[4] = f"{float_to_hex(l3)}1d{float_to_hex(l3a)}"
+        lines.extend(modified_block)
+    return "".join(lines)
+
+
+_bayer_tails = ["12050d0000a0401dcdcccc3f250000003f0a610a0f0d", "12050d000020411dcdcccc3f250000003f0a610a0f0d",
+                "12050d0000a0411dcdcccc3f250000003f0a610a0f0d", "12050d000020421dcdcccc3f250000003f0a610a0f0d"]
+
+
+def baseline_bayer_hex(values_list, level_names):
+    lines = []
+    for i, values in enumerate(values_list):
+        l1, l1a, l1b, l2, l2a, l2b, l3, l3a, l3b, l4, l4a, l4b, l5, l5a = values
+        level_hex = (
+            f"{float_to_hex(l1)}15{float_to_hex(l1a)}1d{float_to_hex(l1b)}0a0f0d"
+            f"{float_to_hex(l2)}15{float_to_hex(l2a)}1d{float_to_hex(l2b)}0a0f0d"
+            f"{float_to_hex(l3)}15{float_to_hex(l3a)}1d{float_to_hex(l3b)}0a0f0d"
+            f"{float_to_hex(l4)}15{float_to_hex(l4a)}1d{float_to_hex(l4b)}0a0a0d"
+            f"{float_to_hex(l5)}1d{float_to_hex(l5a)}"
+        )
+        if i < len(values_list) - 1:
+            level_hex += _bayer_tails[i - len(values_list) + 5]
+        lines.append(level_hex)
+    return "".join(lines)
+
+
+def rate(name, fn, n):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<38}{n / elapsed:14,.0f} пресетов/с")
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rng = np.random.default_rng(0)
+    sharp = (np.array([l["default"] for l in main_sharp_levels]) * rng.uniform(0.5, 1.5, (n, 5, 6))).astype(np.float32)
+    bayer = (np.array([l["default"] for l in bayer_levels]) * rng.uniform(0.5, 1.5, (n, 5, 14))).astype(np.float32)
+
+    # --- Сверка: все пути дают один и тот же HEX ---
+    for i in range(0, n, max(1, n // 50)):
+        expected = baseline_sharp_hex(sharp[i].tolist(), main_sharp_levels, sharp_slices)
+        assert blobs_to_hex(encode_batch("sharp_id15", sharp[i]))[0] == expected
+        assert generate_sharp_hex(sharp[i].tolist()) == expected
+        expected = baseline_bayer_hex(bayer[i].tolist(), bayer_levels)
+        assert blobs_to_hex(encode_batch("bayer", bayer[i]))[0] == expected
+        assert generate_bayer_hex(bayer[i].tolist()) == expected
+
+    sharp_lists, bayer_lists = sharp.tolist(), bayer.tolist()
+    rate("sharp: исходный цикл f-строк",
+         lambda: [baseline_sharp_hex(v, main_sharp_levels, sharp_slices) for v in sharp_lists], n)
+    rate("sharp: цикл generate_sharp_hex", lambda: [generate_sharp_hex(v) for v in sharp_lists], n)
+    rate("sharp: encode_batch", lambda: encode_batch("sharp_id15", sharp), n)
+    rate("sharp: encode_batch + hex", lambda: blobs_to_hex(encode_batch("sharp_id15", sharp)), n)
+    rate("bayer: исходный цикл f-строк", lambda: [baseline_bayer_hex(v, bayer_levels) for v in bayer_lists], n)
+    rate("bayer: цикл generate_bayer_hex", lambda: [generate_bayer_hex(v) for v in bayer_lists], n)
+    rate("bayer: encode_batch", lambda: encode_batch("bayer", bayer), n)
+    rate("bayer: encode_batch + hex", lambda: blobs_to_hex(encode_batch("bayer", bayer)), n)
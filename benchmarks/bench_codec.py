@@ -0,0 +1,88 @@
+"""Парсер Sharp/Bayer: старая нарезка HEX-строки, разбор wire-формата и скомпилированный шаблон.
+
+«wire-формат» — Frame.decode с запомненной формой фрагмента (повторный разбор),
+«без кэша формы» — первый разбор новым Frame: полный проход по тегам.
+
+    python benchmarks/bench_codec.py
+"""
+import os
+import struct
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from luma_gen.codec import Frame
+from luma_gen.templates import CompiledLayout
+
+sharp_frame = Frame("0a490a140d", [(1, 3)] * 3)
+bayer_frame = Frame("0a610a0f0d", [(1, 2, 3)] * 4 + [(1, 3)])
+
+SHARP_HEX = (
+    "0000e0401d8fc2753d250000803f2d0000803f0a140dcdcc44401d0ad7233d250000803f2d0000803f0a140d"
+    "0000f03f1d68916d3d250000803f2d0000803f12050d0000a03f0a490a140d"
+) * 5
+BAYER_LEVEL = (
+    "0000803f15cdcccc3d1dae50223f0a0f0d6666663f15cdcccc3d1d95806d3e0a0f0d9a99593f15cdcc4c3d1d09997a3e"
+    "0a0f0dcdcc4c3f15cdcc4c3d1d0e06743e0a0a0d0000403f1d68ceb13e"
+)
+BAYER_HEX = (BAYER_LEVEL + "12050d0000a0401dcdcccc3f250000003f0a610a0f0d") * 4 + BAYER_LEVEL
+
+sharp_layout = CompiledLayout(sharp_frame, SHARP_HEX)
+bayer_layout = CompiledLayout(bayer_frame, BAYER_HEX)
+
+
+def hex_to_float(h):
+    return struct.unpack('<f', bytes.fromhex(h))[0]
+
+
+# --- Старый разбор: фиксированные сдвиги по строке ---
+def slice_sharp(hex_str):
+    results = []
+    offset = 0
+    for _ in range(5):
+        level = []
+        for skip in (26, 26, 44):
+            level.append(hex_to_float(hex_str[offset:offset + 8]))
+            offset += 8 + 2
+            level.append(hex_to_float(hex_str[offset:offset + 8]))
+            offset += 8 + skip
+        results.append(level)
+    return results
+
+
+def slice_bayer(hex_str):
+    results = []
+    offset = 0
+    for _ in range(5):
+        level = []
+        for _ in range(4):
+            for skip in (2, 2, 6):
+                level.append(hex_to_float(hex_str[offset:offset + 8]))
+                offset += 8 + skip
+        level.append(hex_to_float(hex_str[offset:offset + 8]))
+        offset += 8 + 2
+        level.append(hex_to_float(hex_str[offset:offset + 8]))
+        offset += 8 + 44
+        results.append(level)
+    return results
+
+
+def bench(name, fn, arg, number=2000):
+    best = min(timeit.repeat(lambda: fn(arg), number=number, repeat=5)) / number
+    print(f"{name:<28}{best * 1e6:10.1f} мкс")
+    return best
+
+
+if __name__ == "__main__":
+    assert slice_sharp(SHARP_HEX) == sharp_frame.decode(SHARP_HEX, 5) == sharp_layout.decode(SHARP_HEX)
+    assert slice_bayer(BAYER_HEX) == bayer_frame.decode(BAYER_HEX, 5) == bayer_layout.decode(BAYER_HEX)
+
+    bench("sharp: нарезка строки", slice_sharp, SHARP_HEX)
+    bench("sharp: wire-формат", lambda h: sharp_frame.decode(h, 5), SHARP_HEX)
+    bench("sharp: без кэша формы", lambda h: Frame("0a490a140d", [(1, 3)] * 3).decode(h, 5), SHARP_HEX)
+    bench("sharp: шаблон", sharp_layout.decode, SHARP_HEX)
+    bench("bayer: нарезка строки", slice_bayer, BAYER_HEX)
+    bench("bayer: wire-формат", lambda h: bayer_frame.decode(h, 5), BAYER_HEX)
+    bench("bayer: без кэша формы", lambda h: Frame("0a610a0f0d", [(1, 2, 3)] * 4 + [(1, 3)]).decode(h, 5), BAYER_HEX)
+    bench("bayer: шаблон", bayer_layout.decode, BAYER_HEX)
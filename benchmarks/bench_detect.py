@@ -0,0 +1,30 @@
+"""Определение раскладки на смеси блоков всех типов.
+
+    python benchmarks/bench_detect.py [n_blobs]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from luma_gen.detect import decode_any
+from luma_gen.layouts import layouts
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    rng = random.Random(0)
+    names = list(layouts)
+    blobs = []
+    for _ in range(n):
+        name = rng.choice(names)
+        layout = layouts[name]
+        values = [[rng.uniform(0.01, 20.0) for _ in range(layout.n_params)] for _ in range(layout.n_levels)]
+        blobs.append((name, layout.encode(values).hex()))
+
+    start = time.perf_counter()
+    results = [decode_any(blob)[0].layout for _, blob in blobs]
+    elapsed = time.perf_counter() - start
+    wrong = sum(result != name for result, (name, _) in zip(results, blobs))
+    print(f"{n} блоков: {elapsed * 1e3:.0f} мс, {elapsed / n * 1e6:.1f} мкс/блок, ошибок: {wrong}")
@@ -0,0 +1,70 @@
+"""История правок: версии с общими строками уровней против копии всех полей на шаг.
+
+    python benchmarks/bench_history.py [шагов]
+
+Каждый шаг меняет одно поле случайного уровня (как правка в поле ввода), каждый
+десятый — все уровни (как вставка HEX). «Копии» — словарь ключ -> float на версию,
+как хранились бы *_temp ключи. Переход — к случайной версии и обратно.
+"""
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from luma_gen.history import History
+from luma_gen.store import new_store
+
+
+def edits(store, steps, seed=0):
+    rng = random.Random(seed)
+    names = store.dtype.names
+    for step in range(steps):
+        if step % 10 == 9:
+            for name in names:
+                store[name] = [rng.uniform(0.01, 20.0) for _ in range(len(store))]
+        else:
+            store[rng.randrange(len(store))][rng.choice(names)] = rng.uniform(0.01, 20.0)
+        yield step
+
+
+def full_copies(layout, steps):
+    store = new_store(layout)
+    versions = []
+    for _ in edits(store, steps):
+        versions.append({f"{name}_{idx}": float(store[idx][name]) for idx in range(len(store)) for name in store.dtype.names})
+    return versions
+
+
+def shared(layout, steps):
+    store = new_store(layout)
+    history = History(store, limit=steps + 1)
+    started = time.perf_counter()
+    for _ in edits(store, steps):
+        history.record(store)
+    record_us = (time.perf_counter() - started) / steps * 1e6
+    rng = random.Random(1)
+    started = time.perf_counter()
+    for _ in range(1000):
+        history.goto(store, rng.randrange(len(history)))
+    goto_us = (time.perf_counter() - started) / 1000 * 1e6
+    return history, record_us, goto_us
+
+
+def traced(fn, *args):
+    tracemalloc.start()
+    result = fn(*args)
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, used
+
+
+if __name__ == "__main__":
+    steps = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    print(f"{'раскладка':<14}{'копии, КБ':>11}{'история, КБ':>13}{'запись, мкс':>13}{'переход, мкс':>14}")
+    for layout in ("sharp_id15", "bayer", "chroma"):
+        _, copies = traced(full_copies, layout, steps)
+        (history, record_us, goto_us), used = traced(shared, layout, steps)
+        print(f"{layout:<14}{copies / 1024:>11,.0f}{used / 1024:>13,.0f}{record_us:>13.1f}{goto_us:>14.1f}")
@@ -0,0 +1,77 @@
+"""Время импорта ядра: `python -X importtime` в свежем интерпретаторе на каждый модуль.
+
+    python benchmarks/bench_import.py [повторов] [--check] [--json]
+
+Для каждого модуля — лучшее из повторов: полное время импорта (без site), собственное
+время модулей luma_gen и тяжёлые пакеты, которые он подтянул. Без кэша раскладок
+(LUMA_LAYOUT_CACHE="") — отдельной строкой: столько стоит первый запуск после правки схем.
+Перед замером пакет компилируется в .pyc, как после установки.
+
+--check — код 1, если модуль ядра импортирует NumPy/Streamlit/matplotlib или дольше BUDGET_MS;
+--json — те же числа одной строкой JSON для истории в CI.
+"""
+import compileall
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# модуль -> бюджет, мс (воркеры пула импортируют luma_gen.cli)
+CORE = {"luma_gen": 10.0, "luma_gen.layouts": 10.0, "luma_gen.cli": 20.0, "luma_gen.cache": 10.0}
+HEAVY = ("numpy", "streamlit", "matplotlib", "scipy", "PIL")
+_PROBE = "import sys; before = set(sys.modules); import {0}; print(' '.join(sorted(set(sys.modules) - before)))"
+
+
+def measure(module, env=None):
+    """-> (всего мс, luma_gen мс, тяжёлые пакеты)."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", _PROBE.format(module)],
+                          capture_output=True, text=True, cwd=ROOT, env={**os.environ, **(env or {})}, check=True)
+    loaded = proc.stdout.split()
+    total = own = 0
+    for line in proc.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        if not line.startswith("import time:"):
+            continue
+        fields = line[12:].split("|")
+        try:
+            self_us, cumulative = int(fields[0]), int(fields[1])
+        except (ValueError, IndexError):
+            continue                # строка заголовка
+        name = fields[2].strip()
+        if name in loaded and not fields[2][1:].startswith(" "):
+            total += cumulative     # модули верхнего уровня — без отступа
+        if name.startswith("luma_gen"):
+            own += self_us
+    heavy = sorted({name.split(".")[0] for name in loaded} & set(HEAVY))
+    return total / 1000, own / 1000, heavy
+
+
+def best(module, repeat, env=None):
+    runs = [measure(module, env) for _ in range(repeat)]
+    return min(runs, key=lambda run: run[0])
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    repeat = int(args[0]) if args and args[0].isdigit() else 5
+    compileall.compile_dir(os.path.join(ROOT, "luma_gen"), quiet=1)
+    best("luma_gen", 1)   # прогрев кэша раскладок
+
+    results = {module: best(module, repeat) for module in CORE}
+    results["luma_gen (без кэша раскладок)"] = best("luma_gen", repeat, {"LUMA_LAYOUT_CACHE": ""})
+
+    failed = [module for module, budget in CORE.items()
+              if results[module][2] or results[module][0] > budget]
+    if "--json" in args:
+        print(json.dumps({module: {"total_ms": round(total, 2), "luma_gen_ms": round(own, 2), "heavy": heavy}
+                          for module, (total, own, heavy) in results.items()}, ensure_ascii=False))
+    else:
+        print(f"{'модуль':<32}{'всего, мс':>11}{'luma_gen, мс':>14}  тяжёлые")
+        for module, (total, own, heavy) in results.items():
+            print(f"{module:<32}{total:>11.2f}{own:>14.2f}  {', '.join(heavy) or '—'}")
+    if failed:
+        print("вне бюджета:", ", ".join(failed), file=sys.stderr)
+        if "--check" in args:
+            sys.exit(1)
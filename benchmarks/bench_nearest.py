@@ -0,0 +1,58 @@
+"""Поиск похожих пресетов: полный перебор против KD-дерева на кластерах и равномерных данных.
+
+    python benchmarks/bench_nearest.py [n_presets]
+
+Кластеры — CENTERS исходных пресетов (значения по умолчанию со случайным множителем)
+и их вариации на ~1%, как в живом архиве; равномерные — каждое поле случайно в своём
+диапазоне. Для каждой раскладки: постройка индекса, выбрал ли он дерево, время запроса
+индекса и перебора, совпадение соседей с перебором.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from luma_gen.nearest import NearestIndex
+from luma_gen.store import layout_levels
+
+CENTERS = 200
+QUERIES = 20
+
+
+def clustered(rng, defaults, n):
+    centers = defaults * rng.uniform(0.5, 1.5, (CENTERS,) + defaults.shape)
+    rows = centers[rng.integers(0, CENTERS, n)]
+    return (rows * (1 + 0.01 * rng.standard_normal(rows.shape))).astype(np.float32)
+
+
+def uniform(rng, defaults, n):
+    return (defaults * rng.uniform(0.5, 1.5, (n,) + defaults.shape)).astype(np.float32)
+
+
+def per_query(fn, queries):
+    started = time.perf_counter()
+    results = [fn(q) for q in queries]
+    return (time.perf_counter() - started) / len(queries), results
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = np.random.default_rng(0)
+    print(f"{'раскладка':<12}{'данные':<12}{'постройка, с':>13}{'индекс':>10}{'запрос, мс':>12}{'перебор, мс':>13}  соседи")
+    for layout in ("sharp_id15", "bayer"):
+        defaults = np.array([level["default"] for level in layout_levels[layout]], dtype=np.float32)
+        for kind, make in (("кластеры", clustered), ("равномерно", uniform)):
+            values = make(rng, defaults, n)
+            queries = values[rng.integers(0, n, QUERIES)] * (1 + 0.005 * rng.standard_normal((QUERIES,) + defaults.shape))
+            started = time.perf_counter()
+            index = NearestIndex(values)
+            build = time.perf_counter() - started
+            brute = NearestIndex(values, index.scale, brute_limit=n)
+            index_s, found = per_query(lambda q: index.query(q, 5)[0], queries)
+            brute_s, expected = per_query(lambda q: brute.query(q, 5)[0], queries)
+            same = sum(np.array_equal(a, b) for a, b in zip(found, expected))
+            print(f"{layout:<12}{kind:<12}{build:>13.1f}{'дерево' if index.tree is not None else 'перебор':>10}"
+                  f"{index_s * 1e3:>12.2f}{brute_s * 1e3:>13.1f}  {same}/{QUERIES}")
@@ -0,0 +1,81 @@
+"""Сгенерированные по схеме encode/decode против написанных руками под шаблон.
+
+    python benchmarks/bench_schema.py [--check]
+
+«Руками» — прежний CompiledLayout: bytearray(шаблон) + один pack_into по участку
+с float, разбор — unpack_from и сравнение служебных байтов кортежем. С --check
+выходит с кодом 1, если сгенерированный путь медленнее ручного хоть на одной раскладке.
+"""
+import os
+import struct
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from luma_gen.layouts import layout_schemas, layouts
+
+TOLERANCE = 1.05   # шум замера
+
+
+class HandWritten:
+    def __init__(self, layout):
+        self.layout = layout
+        offsets = layout.offsets
+        fmt, gaps = ["<f"], []
+        for prev, offset in zip(offsets, offsets[1:]):
+            gap = layout.template[prev + 4:offset]
+            fmt.append(f"{len(gap)}sf")
+            gaps.append(gap)
+        self.struct = struct.Struct("".join(fmt))
+        self.start = offsets[0]
+        self.gaps = tuple(gaps)
+        self.args = [0.0] * (2 * len(offsets) - 1)
+        self.args[1::2] = gaps
+
+    def encode(self, values_list):
+        if len(values_list) != self.layout.n_levels:
+            raise ValueError("уровни")
+        flat = []
+        for values in values_list:
+            if len(values) != self.layout.n_params:
+                raise ValueError("значения")
+            flat.extend(values)
+        args = self.args[:]
+        args[0::2] = flat
+        buf = bytearray(self.layout.template)
+        self.struct.pack_into(buf, self.start, *args)
+        return bytes(buf)
+
+    def decode(self, data):
+        if isinstance(data, str):
+            data = bytes.fromhex(data)
+        if len(data) >= self.start + self.struct.size:
+            fields = self.struct.unpack_from(data, self.start)
+            if fields[1::2] == self.gaps:
+                flat = fields[0::2]
+                p = self.layout.n_params
+                return [list(flat[i:i + p]) for i in range(0, len(flat), p)]
+        return self.layout.frame.decode(data, self.layout.n_levels)
+
+
+def best(fn, arg, number=20000):
+    return min(timeit.repeat(lambda: fn(arg), number=number, repeat=5)) / number
+
+
+if __name__ == "__main__":
+    slower = []
+    print(f"{'раскладка':<14}{'encode руками':>15}{'схема':>9}{'decode руками':>15}{'схема':>9}  мкс")
+    for name, layout in layouts.items():
+        hand = HandWritten(layout)
+        levels = [level["default"] for level in layout_schemas[name]["levels"]]
+        blob = layout.encode(levels)
+        assert hand.encode(levels) == blob and hand.decode(blob) == layout.decode(blob), name
+        times = [best(hand.encode, levels), best(layout.encode, levels), best(hand.decode, blob), best(layout.decode, blob)]
+        print(f"{name:<14}" + "".join(f"{t * 1e6:{w}.2f}" for t, w in zip(times, (15, 9, 15, 9))))
+        if times[1] > times[0] * TOLERANCE or times[3] > times[2] * TOLERANCE:
+            slower.append(name)
+    if slower:
+        print("медленнее ручного:", ", ".join(slower))
+        if "--check" in sys.argv:
+            sys.exit(1)
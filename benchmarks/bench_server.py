@@ -0,0 +1,112 @@
+"""Нагрузка на `luma-gen serve`: p50/p99 задержки и запросов в секунду при 1, 32 и 256 клиентах.
+
+    python benchmarks/bench_server.py [секунд на замер] [--jobs N] [--url http://host:port]
+
+Без --url сервис запускается отдельным процессом на свободном порту. Каждый клиент —
+своё keep-alive соединение, запросы идут один за другим. Сценарии:
+  encode  — /encode/sharp_id15 со случайными уровнями, все запросы разные;
+  decode  — /decode одного и того же блока, одинаковые запросы склеиваются;
+  batch   — /encode/bayer пачкой по 500 пресетов (пул процессов при --jobs > 1).
+"""
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from luma_gen.layouts import bayer_levels, layouts, main_sharp_levels
+
+CLIENTS = (1, 32, 256)
+
+
+def scenarios(rng):
+    sharp = np.array([l["default"] for l in main_sharp_levels], dtype=np.float32)
+    bayer = np.array([l["default"] for l in bayer_levels], dtype=np.float32)
+    blob = json.dumps({"hex": layouts["sharp_id15"].encode(sharp.tolist()).hex()}).encode()
+    batch = json.dumps({"presets": [{"levels": (bayer * rng.uniform(0.5, 1.5, bayer.shape)).tolist()}
+                                    for _ in range(500)]}).encode()
+    return {
+        "encode": lambda: ("/encode/sharp_id15",
+                           json.dumps({"levels": (sharp * rng.uniform(0.5, 1.5, sharp.shape)).tolist()}).encode()),
+        "decode": lambda: ("/decode", blob),
+        "batch": lambda: ("/encode/bayer", batch),
+    }
+
+
+async def request(reader, writer, host, path, body):
+    writer.write(f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line == b"\r\n":
+            break
+        name, _, value = line.decode().partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def client(host, port, make, until, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < until:
+            path, body = make()
+            started = time.perf_counter()
+            if await request(reader, writer, host, path, body) != 200:
+                errors.append(path)
+            latencies.append(time.perf_counter() - started)
+    finally:
+        writer.close()
+
+
+async def measure(host, port, make, clients, seconds):
+    latencies, errors = [], []
+    started = time.perf_counter()
+    until = started + seconds
+    await asyncio.gather(*(client(host, port, make, until, latencies, errors) for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+    ms = np.array(latencies) * 1000
+    return len(ms) / elapsed, np.percentile(ms, 50), np.percentile(ms, 99), len(errors)
+
+
+def start_server(jobs):
+    proc = subprocess.Popen([sys.executable, "-m", "luma_gen.cli", "serve", "--port", "0", "--jobs", str(jobs)],
+                            stderr=subprocess.PIPE, text=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    line = proc.stderr.readline()   # "luma-gen: слушаю http://127.0.0.1:PORT"
+    return proc, int(line.rsplit(":", 1)[1])
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    seconds = float(args[0]) if args and not args[0].startswith("--") else 5.0
+    jobs = int(args[args.index("--jobs") + 1]) if "--jobs" in args else 1
+    proc = None
+    if "--url" in args:
+        url = urlsplit(args[args.index("--url") + 1])
+        host, port = url.hostname, url.port
+    else:
+        proc, port = start_server(jobs)
+        host = "127.0.0.1"
+
+    try:
+        rng = np.random.default_rng(0)
+        print(f"{'сценарий':<10}{'клиентов':>10}{'запросов/с':>14}{'p50, мс':>10}{'p99, мс':>10}{'ошибок':>8}")
+        for name, make in scenarios(rng).items():
+            for clients in CLIENTS:
+                rps, p50, p99, errors = asyncio.run(measure(host, port, make, clients, seconds))
+                print(f"{name:<10}{clients:>10}{rps:>14,.0f}{p50:>10.2f}{p99:>10.2f}{errors:>8}")
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
@@ -0,0 +1,65 @@
+"""Память параметров на сессию: ключи *_temp с отдельными float против массивов float32.
+
+    python benchmarks/bench_store.py [n_sessions]
+
+Считаются только параметры всех семи раскладок (после парсинга каждой вкладки);
+состояние самих виджетов Streamlit одинаково в обоих вариантах и не учитывается.
+"""
+import copy
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from luma_gen.layouts import layout_keys
+from luma_gen.store import layout_levels, new_store
+
+# --- Префиксы ключей session_state до перехода на массивы ---
+old_prefix = {
+    "sharp_id15": "sharp", "sharp_id14": "2sharp", "sharp_id16": "3sharp", "sharp_id12": "4sharp",
+    "sharp_bento": "bento", "bayer": "bayer", "chroma": "chroma",
+}
+
+
+def old_session(rng):
+    state = {}
+    for layout, levels in layout_levels.items():
+        for idx, level in enumerate(levels):
+            for key, value in zip(layout_keys[layout], level["default"]):
+                state[f"{old_prefix[layout]}_{key}_{idx}_temp"] = float(round(value * rng.uniform(0.5, 1.5), 6))
+    return state
+
+
+def new_session(rng):
+    state = {"params": {}}
+    for layout, levels in layout_levels.items():
+        store = new_store(layout)
+        for name in store.dtype.names:
+            store[name] *= rng.uniform(0.5, 1.5, len(store))
+        state["params"][layout] = store
+    return state
+
+
+def measure(name, make, n):
+    rng = np.random.default_rng(0)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    sessions = [make(rng) for _ in range(n)]
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    start = time.perf_counter()
+    for state in sessions:
+        copy.deepcopy(state)
+    copy_us = (time.perf_counter() - start) / n * 1e6
+    print(f"{name:<22}{used / n:10,.0f} байт/сессию{used / 1024:12,.0f} КБ на {n}{copy_us:10,.1f} мкс/копия")
+    return sessions
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    measure("ключи *_temp", old_session, n)
+    measure("массивы float32", new_session, n)
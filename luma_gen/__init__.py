@@ -0,0 +1,12 @@
+# --- Ядро генератора без Streamlit: генераторы и парсеры (раскладки — luma_gen.layouts.layouts) ---
+from .layouts import (
+    layout_keys,
+    generate_sharp_hex, generate_sharp_hex2, generate_sharp_hex3, generate_sharp_hex4,
+    generate_bento_sharp_hex, generate_bayer_hex, generate_chroma_hex, parse_levels_hex,
+)
+
+__all__ = [
+    "layout_keys",
+    "generate_sharp_hex", "generate_sharp_hex2", "generate_sharp_hex3", "generate_sharp_hex4",
+    "generate_bento_sharp_hex", "generate_bayer_hex", "generate_chroma_hex", "parse_levels_hex",
+]
@@ -0,0 +1,331 @@
+"""Архив пресетов одной раскладки: заголовок со схемой и записи фиксированной длины.
+
+    LUMAPRE1 | uint32 длина заголовка | JSON-схема, дополненная пробелами до HEADER_ALIGN
+    запись 0 | запись 1 | ...   запись = float32 (n_levels, n_params) + uint32 crc32 значений
+
+Записи открываются через numpy.memmap: миллионы пресетов листаются, фильтруются
+(`archive.values[:, 2, 0] > 5`) и выгружаются без загрузки файла в память.
+Число записей — размер файла, делённый на длину записи, поэтому добавление не трогает
+заголовок: записи дописываются в конец, затем flush + fsync. Если запись оборвалась
+(сбой посреди добавления), хвост не кратен записи или не сходится crc — при открытии
+такие записи отбрасываются, при следующем добавлении файл по ним обрезается.
+
+Имена и теги — в соседнем файле `<архив>.idx`: строка NDJSON на запись
+{"i": номер, "name": ..., "tags": [...]}, дописывается после fsync записей. Строки
+со ссылкой за конец архива и недописанная последняя строка игнорируются.
+Добавление идёт под блокировкой архива (flock между процессами, Lock между потоками
+одного процесса — сессиями Streamlit): номер первой новой записи считается по размеру
+файла уже под блокировкой, поэтому писателей может быть несколько. Читателей сколько угодно.
+"""
+import contextlib
+import json
+import operator
+import os
+import re
+import struct
+import threading
+import zlib
+
+try:
+    import fcntl
+except ImportError:   # Windows: остаётся блокировка внутри процесса
+    fcntl = None
+
+import numpy as np
+
+from .batch import blobs_to_hex, get_encoder
+from .layouts import layout_keys, layouts
+
+MAGIC = b"LUMAPRE1"
+HEADER_ALIGN = 64
+_LENGTH = struct.Struct("<I")
+
+
+def record_dtype(layout):
+    compiled = layouts[layout]
+    return np.dtype([("values", "<f4", (compiled.n_levels, compiled.n_params)), ("crc", "<u4")])
+
+
+def _schema(layout):
+    compiled = layouts[layout]
+    return {
+        "layout": layout,
+        "n_levels": compiled.n_levels,
+        "n_params": compiled.n_params,
+        "keys": layout_keys[layout],
+        "record_size": record_dtype(layout).itemsize,
+        "template": compiled.template.hex(),
+    }
+
+
+def _skeleton(template, compiled):
+    """Шаблон без значений float: сравнение схемы не зависит от значений по умолчанию."""
+    data = bytearray(template)
+    for offset in compiled.offsets:
+        data[offset:offset + 4] = bytes(4)
+    return bytes(data)
+
+
+def _crc(values):
+    """crc32 каждой записи: (n, n_levels, n_params) float32 -> (n,) uint32."""
+    rows = np.ascontiguousarray(values, dtype="<f4").reshape(len(values), -1)
+    return np.fromiter((zlib.crc32(row) for row in rows), dtype="<u4", count=len(rows))
+
+
+def _ends_with_newline(path):
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+@contextlib.contextmanager
+def _write_lock(path, f):
+    """Один писатель архива за раз; f — открытый файл архива."""
+    with _locks_guard:
+        lock = _locks.setdefault(os.path.realpath(path), threading.Lock())
+    with lock:
+        if fcntl is None:
+            yield
+            return
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _read_header(f):
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError("не архив пресетов (нет сигнатуры LUMAPRE1)")
+    (length,) = _LENGTH.unpack(f.read(_LENGTH.size))
+    schema = json.loads(f.read(length))
+    return schema, len(MAGIC) + _LENGTH.size + length
+
+
+_OPERATORS = {"<=": operator.le, ">=": operator.ge, "==": operator.eq, "!=": operator.ne,
+              "<": operator.lt, ">": operator.gt}
+_CONDITION = re.compile(r"^\s*(\w+)(?:@(\d+))?\s*(<=|>=|==|!=|<|>)\s*(\S+)\s*$")
+
+
+def parse_condition(text):
+    """'l1@2>5' — поле l1 уровня 2 больше 5; без @ — на любом уровне."""
+    match = _CONDITION.match(text)
+    if not match:
+        raise ValueError(f"условие {text!r}: ожидалось поле[@уровень] оператор число")
+    key, level, op, value = match.groups()
+    return key.lower(), None if level is None else int(level), _OPERATORS[op], float(value)
+
+
+class PresetArchive:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.schema, self.header_size = _read_header(f)
+        self.layout = self.schema["layout"]
+        if self.layout not in layouts:
+            raise ValueError(f"архив раскладки {self.layout!r}, такой раскладки нет")
+        compiled = layouts[self.layout]
+        if _skeleton(bytes.fromhex(self.schema["template"]), compiled) != _skeleton(compiled.template, compiled):
+            raise ValueError(f"шаблон раскладки {self.layout} изменился с момента создания архива")
+        self.dtype = record_dtype(self.layout)
+        self._map()
+        self._meta = None
+
+    @classmethod
+    def create(cls, path, layout):
+        schema = json.dumps(_schema(layout), ensure_ascii=False).encode()
+        prefix = len(MAGIC) + _LENGTH.size
+        schema += b" " * (-(prefix + len(schema)) % HEADER_ALIGN)
+        with open(path, "xb") as f:
+            f.write(MAGIC + _LENGTH.pack(len(schema)) + schema)
+            f.flush()
+            os.fsync(f.fileno())
+        open(path + ".idx", "w").close()
+        return cls(path)
+
+    @classmethod
+    def open_or_create(cls, path, layout):
+        if not os.path.exists(path):
+            try:
+                return cls.create(path, layout)
+            except FileExistsError:
+                pass   # архив только что создал другой писатель
+        archive = cls(path)
+        if archive.layout != layout:
+            raise ValueError(f"{path}: архив раскладки {archive.layout}, а не {layout}")
+        return archive
+
+    # --- Записи: memmap только целых записей с верным crc в хвосте ---
+    def _map(self):
+        count = (os.path.getsize(self.path) - self.header_size) // self.dtype.itemsize
+        records = self._memmap(count)
+        # сбой посреди добавления мог оставить в хвосте нулевые или недописанные записи
+        while count and _crc(records["values"][count - 1:count])[0] != records["crc"][count - 1]:
+            count -= 1
+        self.records = records if count == len(records) else self._memmap(count)
+
+    def _memmap(self, count):
+        if not count:
+            return np.empty(0, dtype=self.dtype)
+        return np.memmap(self.path, dtype=self.dtype, mode="r", offset=self.header_size, shape=(count,))
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def values(self):
+        """(n, n_levels, n_params) float32 только для чтения, без загрузки файла."""
+        return self.records["values"]
+
+    def __getitem__(self, index):
+        return self.records["values"][index]
+
+    def levels(self, index):
+        return self.records["values"][index].tolist()
+
+    def verify(self):
+        """Номера записей с неверным crc (полная проверка, читает весь файл)."""
+        bad = []
+        for start in range(0, len(self), 65536):
+            chunk = self.records[start:start + 65536]
+            bad.extend(start + np.flatnonzero(_crc(chunk["values"]) != chunk["crc"]))
+        return bad
+
+    # --- Имена и теги: индекс читается при первом обращении, открытие архива — O(1) ---
+    def _index(self):
+        if self._meta is not None:
+            return self._meta
+        self._meta, self._names, self._tags = {}, {}, {}
+        try:
+            with open(self.path + ".idx", encoding="utf-8") as f:
+                lines = [line for line in f.read().split("\n")[:-1] if line]   # хвост без \n — недописан
+        except FileNotFoundError:
+            return self._meta
+        try:
+            entries = json.loads("[" + ",".join(lines) + "]")
+        except ValueError:
+            # --- Есть битая строка (сбой посреди дописывания): разбор по строкам ---
+            entries = []
+            for line in lines:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue
+        for entry in entries:
+            if entry["i"] < len(self):
+                self._index_entry(entry["i"], entry.get("name"), entry.get("tags", ()))
+        return self._meta
+
+    def _index_entry(self, index, name, tags):
+        self._meta[index] = (name, list(tags))
+        if name:
+            self._names[name] = index
+        for tag in tags:
+            self._tags.setdefault(tag, []).append(index)
+
+    @property
+    def names(self):
+        self._index()
+        return self._names
+
+    @property
+    def tags(self):
+        self._index()
+        return self._tags
+
+    def meta(self, index):
+        """(имя, теги) записи; (None, []) — без имени."""
+        return self._index().get(index, (None, []))
+
+    def find(self, name):
+        return self.names.get(name)
+
+    def with_tag(self, tag):
+        return np.array(self.tags.get(tag, ()), dtype=np.intp)
+
+    # --- Добавление ---
+    def extend(self, values, names=None, tags=None):
+        """(n, n_levels, n_params) -> номера новых записей. names, tags — по одному на запись."""
+        values = np.asarray(values, dtype="<f4")
+        if values.ndim == 2:
+            values = values[np.newaxis]
+        shape = (self.schema["n_levels"], self.schema["n_params"])
+        if values.shape[1:] != shape:
+            raise ValueError(f"ожидалась форма (n, {shape[0]}, {shape[1]}), получено {values.shape}")
+        records = np.empty(len(values), dtype=self.dtype)
+        records["values"] = values
+        records["crc"] = _crc(values)
+
+        names = names if names is not None else [None] * len(values)
+        tags = tags if tags is not None else [()] * len(values)
+        with open(self.path, "r+b") as f, _write_lock(self.path, f):
+            # --- Другой писатель мог дописать записи после открытия: конец — по файлу под блокировкой ---
+            seen = len(self)
+            self._map()
+            start = len(self)
+            if start != seen:
+                self._meta = None   # индекс перечитается вместе с чужими именами
+            f.truncate(self.header_size + start * self.dtype.itemsize)   # отбросить оборванный хвост
+            f.seek(0, os.SEEK_END)
+            f.write(records.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+            lines = []
+            for index, name, record_tags in zip(range(start, start + len(values)), names, tags):
+                if name or record_tags:
+                    lines.append(json.dumps({"i": index, "name": name, "tags": list(record_tags)}, ensure_ascii=False) + "\n")
+            if lines:
+                with open(self.path + ".idx", "a+", encoding="utf-8") as idx:
+                    if idx.tell() and not _ends_with_newline(self.path + ".idx"):
+                        idx.write("\n")   # оборванная строка прошлого сбоя остаётся отдельной битой строкой
+                    idx.writelines(lines)
+                    idx.flush()
+                    os.fsync(idx.fileno())
+
+        self._map()
+        if self._meta is not None:
+            for index, name, record_tags in zip(range(start, start + len(values)), names, tags):
+                if name or record_tags:
+                    self._index_entry(index, name, record_tags)
+        return range(start, start + len(values))
+
+    def append(self, levels, name=None, tags=()):
+        return self.extend([levels], [name], [tags])[0]
+
+    # --- Отбор: условия по значениям векторно по memmap, имя и теги — по индексу ---
+    def select(self, name=None, tags=(), where=()):
+        """Номера записей: имя, все теги из tags и все условия where (см. parse_condition)."""
+        if name is not None:
+            index = self.find(name)
+            selected = np.array([] if index is None else [index], dtype=np.intp)
+        else:
+            selected = None
+        for tag in tags:
+            tagged = self.with_tag(tag)
+            selected = tagged if selected is None else np.intersect1d(selected, tagged)
+        keys = self.schema["keys"]
+        mask = None
+        for key, level, compare, value in where:
+            if key not in keys:
+                raise ValueError(f"в раскладке {self.layout} нет поля {key!r}")
+            if level is not None and not 0 <= level < self.schema["n_levels"]:
+                raise ValueError(f"в раскладке {self.layout} уровни 0..{self.schema['n_levels'] - 1}, а не {level}")
+            column = self.values[:, :, keys.index(key)] if level is None else self.values[:, level:level + 1, keys.index(key)]
+            hit = compare(column, value).any(axis=1)
+            mask = hit if mask is None else mask & hit
+        if mask is None:
+            return np.arange(len(self)) if selected is None else selected
+        return np.flatnonzero(mask) if selected is None else selected[mask[selected]]
+
+    # --- Выгрузка ---
+    def hex(self, indices):
+        """Блоки выбранных записей HEX-строками одной пачкой."""
+        return blobs_to_hex(get_encoder(self.layout).encode(self.values[np.asarray(indices, dtype=np.intp)]))
+
+    def __repr__(self):
+        return f"PresetArchive({self.path!r}, {self.layout}, {len(self)} записей)"
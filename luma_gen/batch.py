@@ -0,0 +1,71 @@
+import numpy as np
+
+from .layouts import layouts
+
+
+# --- Пакетный генератор: матрица float32 -> матрица байт без вызовов на каждое значение ---
+class BatchEncoder:
+    def __init__(self, layout):
+        offsets = np.array(layout.offsets, dtype=np.intp)
+        self.shape = (layout.n_levels, layout.n_params)
+        self.template = np.frombuffer(layout.template, dtype=np.uint8)
+        # позиции всех байтов всех float в порядке (уровень, параметр, байт)
+        self._index = (offsets.reshape(-1, 1) + np.arange(4)).reshape(-1)
+
+    @property
+    def blob_size(self):
+        return self.template.size
+
+    def encode(self, values):
+        """(n_presets, n_levels, n_params) -> uint8-матрица (n_presets, blob_size)."""
+        values = np.asarray(values)
+        if values.ndim == 2:
+            values = values[np.newaxis]
+        if values.shape[1:] != self.shape:
+            raise ValueError(f"ожидалась форма (n, {self.shape[0]}, {self.shape[1]}), получено {values.shape}")
+        n = values.shape[0]
+        raw = np.ascontiguousarray(values, dtype='<f4').reshape(n, self.shape[0] * self.shape[1]).view(np.uint8)
+        blobs = np.empty((n, self.template.size), dtype=np.uint8)
+        blobs[:] = self.template
+        blobs[:, self._index] = raw
+        return blobs
+
+    def decode(self, blobs):
+        """uint8-матрица (n_presets, blob_size) -> (n_presets, n_levels, n_params) float32.
+
+        Служебные байты не сверяются — это делает тот, кому они важны (diff, detect).
+        """
+        blobs = np.asarray(blobs, dtype=np.uint8)
+        if blobs.ndim == 1:
+            blobs = blobs[np.newaxis]
+        if blobs.shape[1] != self.template.size:
+            raise ValueError(f"ожидались блоки по {self.template.size} байт, получено {blobs.shape[1]}")
+        raw = np.ascontiguousarray(blobs[:, self._index])
+        return raw.view('<f4').reshape((len(blobs),) + self.shape)
+
+    @property
+    def structure(self):
+        """Маска служебных байтов (всё, что не float-параметр) длиной blob_size."""
+        mask = np.ones(self.template.size, dtype=bool)
+        mask[self._index] = False
+        return mask
+
+
+_encoders = {}
+
+def get_encoder(layout):
+    encoder = _encoders.get(layout)
+    if encoder is None:
+        encoder = _encoders[layout] = BatchEncoder(layouts[layout])
+    return encoder
+
+
+def encode_batch(layout, values):
+    return get_encoder(layout).encode(values)
+
+
+def blobs_to_hex(blobs):
+    """Одна конвертация всей матрицы в HEX, дальше только нарезка строки."""
+    width = blobs.shape[1] * 2
+    text = blobs.tobytes().hex()
+    return [text[i:i + width] for i in range(0, len(text), width)]
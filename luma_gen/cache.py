@@ -0,0 +1,78 @@
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+from .layouts import layouts
+
+
+# --- LRU с ограничением по размеру и времени жизни, счётчики попаданий ---
+class LRUCache:
+    def __init__(self, maxsize=1024, ttl=None, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()  # key -> (время записи, значение)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and self.ttl is not None and self.clock() - item[0] > self.ttl:
+                del self._data[key]
+                self.evictions += 1
+                item = None
+            if item is None:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (self.clock(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+blob_cache = LRUCache(maxsize=4096, ttl=3600)
+
+
+def cache_key(layout, values_list):
+    """Ключ по содержимому: раскладка + параметры, приведённые к float32 (как в блоке)."""
+    flat = [v for values in values_list for v in values]
+    return layout, struct.pack(f"<{len(flat)}f", *flat)
+
+
+def encode_cached(layout, values_list, cache=None):
+    cache = blob_cache if cache is None else cache
+    key = cache_key(layout, values_list)
+    blob = cache.get(key)
+    if blob is None:
+        blob = layouts[layout].encode(values_list)
+        cache.put(key, blob)
+    return blob
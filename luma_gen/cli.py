@@ -0,0 +1,492 @@
+"""luma-gen: пакетная генерация и разбор блоков без Streamlit.
+
+    luma-gen encode --layout bayer < presets.ndjson > blobs.ndjson
+    luma-gen decode --layout sharp_id15 --format csv --jobs 8 < blobs.csv > presets.csv
+    luma-gen scan dump.bin > levels.ndjson
+    luma-gen fit --layout sharp_id14 --level 2 --target curve.csv > fitted.json
+    luma-gen diff ours.hex theirs.hex
+    luma-gen diff ours.hex --library presets.ndjson > distances.ndjson
+    luma-gen archive add presets/bayer.lpa --layout bayer < presets.ndjson
+    luma-gen archive export presets/bayer.lpa --tag night --where "l1@2>0.5" > night.ndjson
+    luma-gen archive nearest presets/bayer.lpa theirs.hex -k 5
+    luma-gen serve --port 8377 --jobs 4
+    luma-gen sweep --layout sharp_id15 --axis l1=6:12:1 --axis "l2a@0,1=0.01:0.05:0.01" -o sweep.zip
+
+Записи NDJSON для encode: {"levels": [[...], ...]} или плоские ключи l1_0, l1a_0, ...
+(как в CSV). Для decode нужно поле "hex"; без --layout раскладка определяется сама
+(в выводе появляется "confidence"). Остальные поля записи проходят насквозь,
+"layout" в записи переопределяет --layout.
+"""
+import csv
+import json
+import os
+import struct
+import sys
+from collections import deque
+from itertools import islice
+
+from .detect import decode_any
+from .layouts import layout_keys, layouts
+from .scanner import families, scan_file, to_binary
+
+_F32 = struct.Struct('<f')
+
+
+# --- Короткая запись float32 без хвостов вида 0.05999999865889549 ---
+def short_float(value):
+    packed = _F32.pack(value)
+    for digits in range(6, 10):
+        short = float(f"{value:.{digits}g}")
+        if _F32.pack(short) == packed:
+            return short
+    return value
+
+
+def _layout_name(record, default):
+    name = record.get("layout") or default
+    if not name:
+        raise ValueError("не задана раскладка (--layout или поле layout)")
+    if name not in layouts:
+        raise ValueError(f"неизвестная раскладка {name!r}")
+    return name
+
+
+def record_levels(record, name):
+    if "levels" in record:
+        return record["levels"]
+    layout = layouts[name]
+    keys = layout_keys[name]
+    return [[float(record[f"{key}_{idx}"]) for key in keys] for idx in range(layout.n_levels)]
+
+
+def encode_record(record, default_layout):
+    name = _layout_name(record, default_layout)
+    return {**record, "layout": name, "hex": layouts[name].encode(record_levels(record, name)).hex()}
+
+
+def decode_record(record, default_layout):
+    if record.get("layout") or default_layout:
+        name = _layout_name(record, default_layout)
+        levels = layouts[name].decode(record["hex"].strip())
+        extra = {}
+    else:
+        detection, levels = decode_any(record["hex"].strip())
+        name = detection.layout
+        extra = {"confidence": round(detection.confidence, 3)}
+    return {**record, "layout": name, **extra, "levels": [[short_float(v) for v in level] for level in levels]}
+
+
+def _run_chunk(task):
+    command, default_layout, records = task
+    handler = encode_record if command == "encode" else decode_record
+    results = []
+    for record in records:
+        if record.get("error"):
+            results.append(record)
+            continue
+        try:
+            results.append(handler(record, default_layout))
+        except Exception as e:
+            results.append({**record, "error": f"{type(e).__name__}: {e}"})
+    return results
+
+
+# --- Ввод/вывод ---
+def read_ndjson(stream):
+    for lineno, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield {"line": lineno, "error": f"JSON: {e}"}
+            continue
+        yield record if isinstance(record, dict) else {"levels": record}
+
+
+def read_csv(stream):
+    yield from csv.DictReader(stream)
+
+
+def _flatten(record):
+    levels = record.pop("levels", None)
+    if levels is not None:
+        keys = layout_keys[record["layout"]]
+        for idx, level in enumerate(levels):
+            for key, value in zip(keys, level):
+                record[f"{key}_{idx}"] = value
+    return record
+
+
+# --- Колонки параметров всех раскладок: l1_0, l1a_0, l1b_0, ..., l5a_4 ---
+def _key_order(key):
+    digits = "".join(ch for ch in key if ch.isdigit())
+    return int(digits or 0), key
+
+
+_param_keys = sorted({key for keys in layout_keys.values() for key in keys}, key=_key_order)
+param_columns = [f"{key}_{idx}" for idx in range(max(layout.n_levels for layout in layouts.values()))
+                 for key in _param_keys
+                 if any(key in layout_keys[name] and idx < layouts[name].n_levels for name in layouts)]
+
+_output_columns = {"encode": ["layout", "hex"], "decode": ["layout", "confidence"]}
+
+
+class CsvWriter:
+    """Заголовок пишется сразу: колонки входа, колонки команды, параметры всех раскладок, error.
+
+    В одном CSV могут оказаться разные раскладки (без --layout или с полем layout),
+    поэтому параметры — объединение по всем раскладкам; чужие колонки остаются пустыми.
+    """
+
+    def __init__(self, stream, command):
+        self.stream = stream
+        self.command = command
+        self.writer = None
+
+    def write(self, record):
+        record = _flatten(dict(record))
+        if self.writer is None:
+            params = set(param_columns)
+            fields = [key for key in record if key not in params and key != "error"]
+            fields = list(dict.fromkeys(fields + _output_columns[self.command] + param_columns + ["error"]))
+            self.writer = csv.DictWriter(self.stream, fields, restval="", extrasaction="ignore")
+            self.writer.writeheader()
+        self.writer.writerow(record)
+
+
+class NdjsonWriter:
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, record):
+        self.stream.write(json.dumps(record, ensure_ascii=False))
+        self.stream.write("\n")
+
+
+def _chunks(records, size):
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def run_tasks(tasks, jobs):
+    """Порядок сохраняется, в работе не больше 2*jobs пачек — вход читается потоково."""
+    if jobs <= 1:
+        for task in tasks:
+            yield _run_chunk(task)
+        return
+    # пул импортируется только здесь: воркеры пула импортируют этот модуль заново
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(jobs) as pool:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.submit(_run_chunk, task))
+            if len(pending) >= 2 * jobs:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def process(command, layout, stdin, stdout, fmt="ndjson", jobs=1, chunk_size=1000):
+    records = read_csv(stdin) if fmt == "csv" else read_ndjson(stdin)
+    writer = CsvWriter(stdout, command) if fmt == "csv" else NdjsonWriter(stdout)
+    tasks = ((command, layout, chunk) for chunk in _chunks(records, chunk_size))
+    errors = 0
+    for results in run_tasks(tasks, jobs):
+        for record in results:
+            errors += bool(record.get("error"))
+            writer.write(record)
+    return errors
+
+
+def run_fit(args):
+    from .fit import BayerImageModel, SharpCurveModel, SharpImageModel, fit, fitted_blob, parse_curve
+    from .store import layout_levels
+
+    name = args.layout
+    levels = layouts[name].decode(args.hex.strip()) if args.hex else [level["default"] for level in layout_levels[name]]
+    if not 0 <= args.level < len(levels):
+        raise ValueError(f"уровень {args.level} вне диапазона 0..{len(levels) - 1}")
+    if args.target:
+        if name == "bayer":
+            raise ValueError("кривая АЧХ задаёт только уровни Sharp")
+        with open(args.target, newline="") as stream:
+            f, gain = parse_curve(stream)
+        model = SharpCurveModel(gain, f, amplitude=args.amplitude)
+    elif args.before and args.after:
+        with open(args.before, "rb") as f:
+            before = f.read()
+        with open(args.after, "rb") as f:
+            after = f.read()
+        if name == "bayer":
+            from .denoise import load_mosaic
+            model = BayerImageModel(load_mosaic(before), load_mosaic(after))
+        else:
+            from .preview import load_proxy
+            model = SharpImageModel(load_proxy(before, 256), load_proxy(after, 256))
+    else:
+        raise ValueError("нужна --target или пара --before/--after")
+
+    result = fit(model, levels[args.level], name, jobs=args.jobs)
+    return {
+        "layout": name, "level": args.level,
+        "values": dict(zip(layout_keys[name], (short_float(v) for v in result.x))),
+        "initial_cost": result.initial_cost, "cost": result.cost, "evaluations": result.evaluations,
+        "hex": fitted_blob(name, levels, args.level, result.x).hex(),
+    }
+
+
+def read_blob(arg):
+    """Путь к файлу (бинарному или HEX) или сама HEX-строка -> bytes."""
+    if os.path.isfile(arg):
+        with open(arg, "rb") as f:
+            return to_binary(f.read())
+    return bytes.fromhex("".join(arg.split()))
+
+
+def read_library(stream):
+    """NDJSON с полем hex или HEX на строку -> список HEX."""
+    blobs = []
+    for line in stream:
+        line = line.strip()
+        if line:
+            blobs.append(json.loads(line)["hex"] if line.startswith("{") else line)
+    return blobs
+
+
+def run_diff(args):
+    from .diff import diff, diff_library
+
+    ours = read_blob(args.a)
+    if args.library:
+        with open(args.library) as stream:
+            library = read_library(stream)
+        result = diff_library(ours, library, args.layout)
+        for index, blob in enumerate(library):
+            yield {"index": index, "layout": result["layout"], "changed": int(result["changed"][index]),
+                   "max_abs": float(result["max_abs"][index]), "max_rel": float(result["max_rel"][index]),
+                   "structure": int(result["structure"][index]), "hex": blob}
+        return
+    if args.b is None:
+        raise ValueError("нужен второй блок или --library")
+    result = diff(ours, read_blob(args.b), args.layout)
+    for field in result.fields:
+        yield {"level": field.level, "field": field.key, "a": short_float(field.a), "b": short_float(field.b),
+               "abs": short_float(field.abs), "rel": field.rel}
+    for run in result.structure:
+        yield {"offset": run.offset, "level": run.level, "a": run.a.hex(), "b": run.b.hex()}
+    if result.size_a != result.size_b:
+        yield {"size_a": result.size_a, "size_b": result.size_b}
+
+
+def run_archive(args):
+    from .archive import PresetArchive, parse_condition
+
+    if args.action == "add":
+        archive = PresetArchive.open_or_create(args.path, args.layout)
+        records = read_csv(sys.stdin) if args.format == "csv" else read_ndjson(sys.stdin)
+        added = 0
+        for chunk in _chunks(records, args.chunk_size):
+            values, names, tags = [], [], []
+            for record in chunk:
+                if record.get("error"):
+                    raise ValueError(f"строка {record['line']}: {record['error']}")
+                if "hex" in record and "levels" not in record:
+                    values.append(layouts[archive.layout].decode(record["hex"].strip()))
+                else:
+                    values.append(record_levels(record, archive.layout))
+                names.append(record.get("name") or None)
+                record_tags = record.get("tags") or ()
+                tags.append(record_tags.split(";") if isinstance(record_tags, str) else record_tags)
+            archive.extend(values, names, tags)
+            added += len(values)
+        print(f"luma-gen: добавлено {added}, всего {len(archive)}", file=sys.stderr)
+        return
+
+    archive = PresetArchive(args.path)
+    if args.action == "info":
+        print(json.dumps({"layout": archive.layout, "count": len(archive), "keys": archive.schema["keys"],
+                          "n_levels": archive.schema["n_levels"], "record_size": archive.schema["record_size"],
+                          "named": len(archive.names), "tags": {tag: len(ix) for tag, ix in archive.tags.items()}},
+                         ensure_ascii=False, indent=2))
+        return
+
+    if args.action == "nearest":
+        from .nearest import NearestIndex
+
+        # один запрос: полный проход дешевле постройки дерева
+        index = NearestIndex(archive.values, brute_limit=len(archive))
+        indices, distances = index.query(layouts[archive.layout].decode(read_blob(args.blob)), args.k)
+        writer = NdjsonWriter(sys.stdout)
+        for index, distance, blob in zip(indices.tolist(), distances.tolist(), archive.hex(indices)):
+            name, tags = archive.meta(index)
+            writer.write({"index": index, "distance": distance, "name": name, "tags": tags, "hex": blob})
+        return
+
+    indices = archive.select(args.name, args.tag or (), [parse_condition(text) for text in args.where or ()])
+    writer = NdjsonWriter(sys.stdout)
+    for start in range(0, len(indices), 10000):
+        chunk = indices[start:start + 10000]
+        for index, blob in zip(chunk.tolist(), archive.hex(chunk)):
+            name, tags = archive.meta(index)
+            writer.write({"index": index, "layout": archive.layout, "name": name, "tags": tags, "hex": blob})
+
+
+def run_sweep(args):
+    from .store import layout_levels
+    from .sweep import Sweep, parse_axis, write_ndjson, write_zip
+
+    name = args.layout
+    base = layouts[name].decode(args.hex.strip()) if args.hex else [level["default"] for level in layout_levels[name]]
+    sweep = Sweep(name, [parse_axis(axis) for axis in args.axis], base)
+    print(f"luma-gen: {sweep.count} вариантов, {sweep.count * sweep.blob_size} байт блоков", file=sys.stderr)
+    if args.format == "ndjson":
+        if args.output in (None, "-"):
+            write_ndjson(sweep, sys.stdout, args.chunk_size, args.jobs)
+        else:
+            with open(args.output, "w") as stream:
+                write_ndjson(sweep, stream, args.chunk_size, args.jobs)
+    elif args.output in (None, "-"):
+        write_zip(sweep, sys.stdout.buffer, args.chunk_size, args.jobs)
+    else:
+        with open(args.output, "wb") as stream:
+            write_zip(sweep, stream, args.chunk_size, args.jobs)
+
+
+def main(argv=None):
+    import argparse   # не нужен воркерам пула, которые импортируют модуль ради _run_chunk
+
+    parser = argparse.ArgumentParser(prog="luma-gen", description="Генерация и разбор HEX-блоков Sharp/Bayer/Chroma")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for command, help_text in (("encode", "параметры -> HEX"), ("decode", "HEX -> параметры")):
+        p = sub.add_parser(command, help=help_text)
+        p.add_argument("--layout", choices=sorted(layouts), help="раскладка по умолчанию для записей")
+        p.add_argument("--format", choices=("ndjson", "csv"), default="ndjson")
+        p.add_argument("--jobs", type=int, default=1, help="число процессов")
+        p.add_argument("--chunk-size", type=int, default=1000, help="записей в одной пачке")
+    p = sub.add_parser("scan", help="найти блоки уровней в дампе (бинарном или HEX)")
+    p.add_argument("path")
+    p.add_argument("--family", action="append", choices=sorted(families), help="искать только эти семейства")
+    sub.add_parser("layouts", help="список раскладок и параметров")
+    p = sub.add_parser("fit", help="подобрать уровень под кривую АЧХ или пару кадров до/после")
+    p.add_argument("--layout", required=True, choices=sorted(name for name in layouts if name != "chroma"))
+    p.add_argument("--level", type=int, required=True, help="номер уровня")
+    p.add_argument("--hex", help="исходный блок (по умолчанию — значения по умолчанию)")
+    p.add_argument("--target", help="CSV частота,усиление (Sharp)")
+    p.add_argument("--amplitude", type=float, default=0.1, help="контраст деталей для АЧХ")
+    p.add_argument("--before", help="кадр до обработки (Sharp: изображение, Bayer: RGGB PNG)")
+    p.add_argument("--after", help="кадр после обработки")
+    p.add_argument("--jobs", type=int, default=1, help="число процессов для оценки кандидатов")
+    p = sub.add_parser("diff", help="сравнить два блока поле к полю или блок с библиотекой")
+    p.add_argument("a", help="HEX или путь к файлу с блоком")
+    p.add_argument("b", nargs="?", help="второй блок (HEX или путь)")
+    p.add_argument("--layout", choices=sorted(layouts), help="раскладка (по умолчанию определяется по первому блоку)")
+    p.add_argument("--library", help="NDJSON с полем hex или HEX на строку")
+    p = sub.add_parser("archive", help="архив пресетов: добавить, выгрузить, сводка")
+    actions = p.add_subparsers(dest="action", required=True)
+    a = actions.add_parser("add", help="дописать записи из stdin (как у encode, плюс поля name и tags)")
+    a.add_argument("path")
+    a.add_argument("--layout", required=True, choices=sorted(layouts), help="раскладка нового архива")
+    a.add_argument("--format", choices=("ndjson", "csv"), default="ndjson")
+    a.add_argument("--chunk-size", type=int, default=10000, help="записей в одной пачке")
+    a = actions.add_parser("export", help="выгрузить записи в NDJSON с HEX")
+    a.add_argument("path")
+    a.add_argument("--name", help="только запись с этим именем")
+    a.add_argument("--tag", action="append", help="только записи со всеми этими тегами")
+    a.add_argument("--where", action="append", help="условие поле[@уровень] оператор число, напр. l1@2>0.5")
+    a = actions.add_parser("nearest", help="k ближайших записей к блоку")
+    a.add_argument("path")
+    a.add_argument("blob", help="HEX или путь к файлу с блоком той же раскладки")
+    a.add_argument("-k", type=int, default=5, help="сколько записей вывести")
+    a = actions.add_parser("info", help="схема и число записей")
+    a.add_argument("path")
+    p = sub.add_parser("serve", help="HTTP-сервис /encode/{layout} и /decode")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8377)
+    p.add_argument("--jobs", type=int, default=1, help="процессов для больших пачек")
+    p = sub.add_parser("sweep", help="перебор значений полей -> ZIP или NDJSON с блоками")
+    p.add_argument("--layout", required=True, choices=sorted(layouts))
+    p.add_argument("--axis", action="append", required=True,
+                   help="поле[@уровни]=начало:конец:шаг или список через запятую, напр. l2a@0,2=0.01:0.05:0.01")
+    p.add_argument("--hex", help="базовый блок (по умолчанию — значения по умолчанию)")
+    p.add_argument("--format", choices=("zip", "ndjson"), default="zip")
+    p.add_argument("-o", "--output", help="файл вывода (по умолчанию stdout)")
+    p.add_argument("--jobs", type=int, default=1, help="число процессов")
+    p.add_argument("--chunk-size", type=int, default=10000, help="вариантов в одной пачке")
+    args = parser.parse_args(argv)
+
+    if args.command == "scan":
+        writer = NdjsonWriter(sys.stdout)
+        for hit in scan_file(args.path, args.family):
+            writer.write({"family": hit.family, "offset": hit.offset, "block": hit.block, "index": hit.index,
+                          "values": [short_float(v) for v in hit.values]})
+        return 0
+
+    if args.command == "fit":
+        try:
+            result = run_fit(args)
+        except (OSError, ValueError) as e:
+            print(f"luma-gen: {e}", file=sys.stderr)
+            return 1
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        return 0
+
+    if args.command == "diff":
+        writer = NdjsonWriter(sys.stdout)
+        try:
+            for record in run_diff(args):
+                writer.write(record)
+        except (OSError, ValueError) as e:
+            print(f"luma-gen: {e}", file=sys.stderr)
+            return 1
+        return 0
+
+    if args.command == "archive":
+        try:
+            run_archive(args)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"luma-gen: {e}", file=sys.stderr)
+            return 1
+        return 0
+
+    if args.command == "serve":
+        import asyncio
+
+        from .server import serve
+
+        def ready(port):
+            print(f"luma-gen: слушаю http://{args.host}:{port}", file=sys.stderr, flush=True)
+
+        try:
+            asyncio.run(serve(args.host, args.port, args.jobs, ready))
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    if args.command == "sweep":
+        try:
+            run_sweep(args)
+        except (OSError, ValueError) as e:
+            print(f"luma-gen: {e}", file=sys.stderr)
+            return 1
+        return 0
+
+    if args.command == "layouts":
+        for name, layout in layouts.items():
+            print(f"{name}\t{layout.n_levels} x {','.join(layout_keys[name])}\t{layout.size} байт")
+        return 0
+
+    errors = process(args.command, args.layout, sys.stdin, sys.stdout, args.format, args.jobs, args.chunk_size)
+    if errors:
+        print(f"luma-gen: записей с ошибками: {errors}", file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,284 @@
+import struct
+
+# --- Типы wire-формата protobuf ---
+VARINT = 0
+FIXED64 = 1
+LEN = 2
+FIXED32 = 5
+
+_F32 = struct.Struct('<f')
+_F64 = struct.Struct('<d')
+
+
+class DecodeError(ValueError):
+    pass
+
+
+class Field:
+    __slots__ = ("number", "wire_type", "value", "offset", "length", "truncated")
+
+    def __init__(self, number, wire_type, value, offset=0, length=0, truncated=False):
+        self.number = number
+        self.wire_type = wire_type
+        self.value = value          # int | float | Message | bytes
+        self.offset = offset        # смещение полезной нагрузки в исходном буфере
+        self.length = length        # заявленная длина для LEN
+        self.truncated = truncated  # LEN-поле обрезано концом фрагмента
+
+    def __repr__(self):
+        return f"Field({self.number}, wt={self.wire_type}, @{self.offset}, {self.value!r})"
+
+
+class Message:
+    __slots__ = ("fields", "tail", "truncated")
+
+    def __init__(self, fields=None, tail=b"", truncated=False):
+        self.fields = fields if fields is not None else []
+        self.tail = tail            # нераспознанный остаток (обрезанный тег, нули и т.п.)
+        self.truncated = truncated
+
+    def get(self, number):
+        return [f for f in self.fields if f.number == number]
+
+    def first(self, number, wire_type=None):
+        for f in self.fields:
+            if f.number == number and (wire_type is None or f.wire_type == wire_type):
+                return f
+        return None
+
+    def messages(self, number):
+        return [f.value for f in self.fields if f.number == number and isinstance(f.value, Message)]
+
+    def __repr__(self):
+        return f"Message({self.fields!r}, tail={bytes(self.tail).hex()!r})"
+
+
+# --- Varint ---
+def read_varint(buf, pos, end):
+    if pos < end and buf[pos] < 0x80:
+        return buf[pos], pos + 1
+    result = 0
+    shift = 0
+    while True:
+        if pos >= end:
+            raise DecodeError("обрезанный varint")
+        b = buf[pos]
+        pos += 1
+        result |= (b & 0x7F) << shift
+        if b < 0x80:
+            return result, pos
+        shift += 7
+        if shift > 63:
+            raise DecodeError("слишком длинный varint")
+
+
+def write_varint(out, value):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+# --- Декодирование ---
+def _decode(buf, pos, end, strict):
+    fields = []
+    while pos < end:
+        start = pos
+        try:
+            key = buf[pos]
+            if key < 0x80:
+                pos += 1
+            else:
+                key, pos = read_varint(buf, pos, end)
+            number, wire_type = key >> 3, key & 7
+            if number == 0:
+                raise DecodeError("нулевой номер поля")
+
+            if wire_type == FIXED32:
+                if pos + 4 > end:
+                    raise DecodeError("обрезанный fixed32")
+                fields.append(Field(number, wire_type, _F32.unpack_from(buf, pos)[0], pos))
+                pos += 4
+            elif wire_type == LEN:
+                if pos < end and buf[pos] < 0x80:
+                    length = buf[pos]
+                    pos += 1
+                else:
+                    length, pos = read_varint(buf, pos, end)
+                stop = pos + length
+                if stop <= end:
+                    sub = _decode(buf, pos, stop, True)
+                    value = sub if sub is not None else bytes(buf[pos:stop])
+                    fields.append(Field(number, wire_type, value, pos, length))
+                elif strict:
+                    raise DecodeError("обрезанное LEN-поле")
+                else:
+                    # --- Фрагмент кончился посреди сообщения: разбираем то, что есть ---
+                    sub = _decode(buf, pos, end, False)
+                    sub.truncated = True
+                    fields.append(Field(number, wire_type, sub, pos, length, True))
+                    stop = end
+                pos = stop
+            elif wire_type == VARINT:
+                value, pos = read_varint(buf, pos, end)
+                fields.append(Field(number, wire_type, value, start))
+            elif wire_type == FIXED64:
+                if pos + 8 > end:
+                    raise DecodeError("обрезанный fixed64")
+                fields.append(Field(number, wire_type, _F64.unpack_from(buf, pos)[0], pos))
+                pos += 8
+            else:
+                raise DecodeError(f"неизвестный wire type {wire_type}")
+        except (DecodeError, IndexError):
+            if strict:
+                return None
+            return Message(fields, bytes(buf[start:end]))
+    return Message(fields)
+
+
+def decode(data, strict=False):
+    """Разбор protobuf-потока в дерево полей.
+
+    Вложенные LEN-поля разбираются как сообщения, если они целиком валидны.
+    В нестрогом режиме обрезанный конец не считается ошибкой: хвост уходит в `Message.tail`,
+    а последнее незавершённое сообщение помечается `truncated`.
+    """
+    buf = data
+    if not isinstance(buf, (bytes, bytearray)):
+        # memoryview/mmap читаем без копирования, индексация по байтам
+        buf = memoryview(buf).cast('B')
+    message = _decode(buf, 0, len(buf), strict)
+    if message is None:
+        raise DecodeError("данные не являются protobuf-сообщением")
+    return message
+
+
+# --- Кодирование ---
+def _encode(message, out):
+    for f in message.fields:
+        write_varint(out, (f.number << 3) | f.wire_type)
+        if f.wire_type == FIXED32:
+            out += _F32.pack(f.value)
+        elif f.wire_type == LEN:
+            if isinstance(f.value, Message):
+                payload = bytearray()
+                _encode(f.value, payload)
+            else:
+                payload = f.value
+            write_varint(out, f.length if f.truncated else len(payload))
+            out += payload
+        elif f.wire_type == VARINT:
+            write_varint(out, f.value)
+        elif f.wire_type == FIXED64:
+            out += _F64.pack(f.value)
+    out += message.tail
+
+
+def encode(message):
+    out = bytearray()
+    _encode(message, out)
+    return bytes(out)
+
+
+# --- Фрагменты с уровнями ---
+class Frame:
+    """Раскладка уровней внутри скопированного HEX-фрагмента.
+
+    Фрагмент начинается сразу после тега первого float, поэтому для разбора
+    к нему приклеивается отрезанный заголовок `prefix`. Уровни — поля 1 верхнего
+    уровня, полосы — поля 1 внутри уровня, `bands` перечисляет номера float-полей
+    каждой полосы в порядке параметров (пустой кортеж — служебная полоса).
+
+    decode запоминает форму разобранного фрагмента: байты между float-полями и
+    Struct, который читает их одним unpack. Фрагмент с теми же байтами между
+    float (те же теги и длины, другие значения) читается без разбора wire-формата.
+    """
+
+    SHAPES = 32   # форм на Frame: разные длины фрагмента и число уровней
+
+    def __init__(self, prefix, bands):
+        self.prefix = bytes.fromhex(prefix)
+        self.bands = tuple(tuple(b) for b in bands)
+        self.n_params = sum(len(b) for b in self.bands)
+        self._shapes = {}
+
+    def parse(self, data):
+        if isinstance(data, str):
+            data = bytes.fromhex(data)
+        return decode(self.prefix + bytes(data))
+
+    def level_fields(self, level):
+        bands = level.messages(1)
+        if len(bands) < len(self.bands):
+            raise DecodeError(f"в уровне {len(bands)} полос вместо {len(self.bands)}")
+        result = []
+        for band, numbers in zip(bands, self.bands):
+            for number in numbers:
+                f = band.first(number, FIXED32)
+                if f is None:
+                    raise DecodeError(f"нет float-поля {number}")
+                result.append(f)
+        return result
+
+    def fields(self, message, n_levels=None):
+        levels = []
+        for level in message.messages(1):
+            if n_levels is not None and len(levels) == n_levels:
+                break
+            try:
+                levels.append(self.level_fields(level))
+            except DecodeError:
+                if not level.truncated:
+                    raise
+                break
+        if n_levels is not None and len(levels) < n_levels:
+            raise DecodeError(f"найдено {len(levels)} уровней вместо {n_levels}")
+        return levels
+
+    def offsets(self, template, n_levels=None):
+        """Смещения float-полей каждого уровня от начала фрагмента (без заголовка)."""
+        skip = len(self.prefix)
+        return [[f.offset - skip for f in level] for level in self.fields(self.parse(template), n_levels)]
+
+    def decode(self, data, n_levels=None):
+        data = bytes.fromhex(data) if isinstance(data, str) else bytes(data)
+        shape = self._shapes.get((len(data), n_levels))
+        if shape is not None:
+            unpack, gaps, sizes = shape
+            values = unpack(data)
+            if values[::2] == gaps:
+                floats = values[1::2]
+                return [list(floats[start:stop]) for start, stop in sizes]
+        levels = self.fields(self.parse(data), n_levels)
+        self._remember(data, n_levels, levels)
+        return [[f.value for f in level] for level in levels]
+
+    def _remember(self, data, n_levels, levels):
+        # форма: куски между float-полями + границы уровней в плоском списке значений
+        skip = len(self.prefix)
+        offsets = [f.offset - skip for level in levels for f in level]
+        if any(o < 0 or o + 4 > len(data) for o in offsets):
+            return
+        fmt, gaps, pos = ["<"], [], 0
+        for o in offsets:
+            fmt.append(f"{o - pos}sf")
+            gaps.append(data[pos:o])
+            pos = o + 4
+        fmt.append(f"{len(data) - pos}s")
+        gaps.append(data[pos:])
+        sizes, start = [], 0
+        for level in levels:
+            sizes.append((start, start + len(level)))
+            start += len(level)
+        if len(self._shapes) >= self.SHAPES:
+            self._shapes.clear()
+        self._shapes[len(data), n_levels] = (struct.Struct("".join(fmt)).unpack, tuple(gaps), sizes)
+
+    def encode(self, template, values_list):
+        message = self.parse(template)
+        for level, values in zip(self.fields(message, len(values_list)), values_list):
+            if len(values) != len(level):
+                raise ValueError(f"ожидалось {len(level)} значений, получено {len(values)}")
+            for f, v in zip(level, values):
+                f.value = float(v)
+        return encode(message)[len(self.prefix):]
@@ -0,0 +1,264 @@
+"""Превью Luma Denoise (Bayer) на RGGB-мозаике и Chroma Denoise в YCbCr.
+
+Модель приближённая. Яркость мозаики (среднее квартета RGGB, половинное разрешение)
+раскладывается на пять полос деталей — разности гауссиан с sigma 1, 2, 4, 8, 16 px —
+и остаток. Полосы 1–4 управляются тройками L/A/B, полоса 5 — парой L5/L5A:
+
+    L — сила подавления (0 — полоса без изменений, 1 — полностью),
+    A — порог мягкого коринга в шумах полосы: A = 0.1 — порог 1σ,
+    B — доля подавленного шума, возвращаемая как зерно.
+
+Шум оценивается один раз на изображение (MAD мелкой полосы), для грубых полос
+пересчитывается через их отклик на белый шум. Изменение яркости добавляется ко всем
+четырём пикселям квартета, так что цветовые разности мозаики не меняются.
+
+Кадр режется на плитки с перекрытием на радиус самого широкого ядра, плитки считаются
+в ThreadPoolExecutor: свёртки и арифметика NumPy на плитке отпускают GIL.
+
+Chroma Denoise трогает только Cb/Cr: пирамида Гаусса из пяти ступеней даёт четыре
+полосы, полоса k управляется парой Lk/LkA (пороги в шумах полосы): детали слабее
+L·σ убираются, сильнее LA·σ сохраняются как край, между ними — линейный переход.
+Пирамида строится один раз на изображение, при правке пересчитываются только
+масштабы с изменившимися парами и сборка пирамиды от них к мелким.
+"""
+import io
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .preview import gaussian_blur, gaussian_kernel
+
+band_sigmas = (1.0, 2.0, 4.0, 8.0, 16.0)
+HALO = len(gaussian_kernel(band_sigmas[-1])) // 2
+TILE = 384
+
+
+# --- Синтетические кадры ---
+def synthetic_scene(height, width):
+    """RGB float32 без шума: градиенты, кольца, штрихи."""
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    y /= height
+    x /= width
+    circles = (np.sin(40 * np.hypot(x - 0.3, y - 0.5)) > 0) * 0.25
+    bars = (np.sin(np.pi * x * width / 6) > 0) * (y > 0.7) * 0.2
+    rgb = np.stack([0.25 + 0.4 * x + circles, 0.3 + 0.3 * y + circles + bars, 0.6 - 0.3 * x + bars], axis=-1)
+    return rgb.astype(np.float32)
+
+
+def synthetic_mosaic(height=1024, width=1536, noise=0.02, seed=0):
+    """RGGB-мозаика float32 [0, 1] с дробовым и тепловым шумом."""
+    rgb = synthetic_scene(height, width)
+    mosaic = np.empty((height, width), dtype=np.float32)
+    mosaic[0::2, 0::2] = rgb[0::2, 0::2, 0]
+    mosaic[0::2, 1::2] = rgb[0::2, 1::2, 1]
+    mosaic[1::2, 0::2] = rgb[1::2, 0::2, 1]
+    mosaic[1::2, 1::2] = rgb[1::2, 1::2, 2]
+    rng = np.random.default_rng(seed)
+    sigma = np.sqrt(noise ** 2 * mosaic + (noise / 4) ** 2)
+    mosaic += sigma * rng.standard_normal(mosaic.shape, dtype=np.float32)
+    return np.clip(mosaic, 0.0, 1.0, out=mosaic)
+
+
+def synthetic_rgb(height=512, width=768, noise=0.04, seed=0):
+    """RGB float32 [0, 1] с независимым шумом в каналах (цветные пятна)."""
+    rgb = synthetic_scene(height, width)
+    rgb += noise * np.random.default_rng(seed).standard_normal(rgb.shape, dtype=np.float32)
+    return np.clip(rgb, 0.0, 1.0, out=rgb)
+
+
+def load_mosaic(data):
+    """16-битный PNG с RGGB-мозаикой; цветное изображение пересэмплируется в RGGB."""
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as img:
+        if img.mode in ("I;16", "I;16B", "I;16L", "I"):
+            mosaic = np.asarray(img, dtype=np.float32) / 65535.0
+        elif img.mode == "L":
+            mosaic = np.asarray(img, dtype=np.float32) / 255.0
+        else:
+            rgb = np.asarray(img.convert("RGB"), dtype=np.float32) / 255.0
+            mosaic = np.empty(rgb.shape[:2], dtype=np.float32)
+            mosaic[0::2, 0::2] = rgb[0::2, 0::2, 0]
+            mosaic[0::2, 1::2] = rgb[0::2, 1::2, 1]
+            mosaic[1::2, 0::2] = rgb[1::2, 0::2, 1]
+            mosaic[1::2, 1::2] = rgb[1::2, 1::2, 2]
+    height, width = mosaic.shape
+    return np.ascontiguousarray(mosaic[:height & ~1, :width & ~1])
+
+
+def mosaic_luma(mosaic):
+    return (mosaic[0::2, 0::2] + mosaic[0::2, 1::2] + mosaic[1::2, 0::2] + mosaic[1::2, 1::2]) * 0.25
+
+
+def mosaic_rgb(mosaic, step=1):
+    """Простейшая демозаика для показа: квартет -> пиксель, с прореживанием step."""
+    rgb = np.stack([
+        mosaic[0::2, 0::2], (mosaic[0::2, 1::2] + mosaic[1::2, 0::2]) * 0.5, mosaic[1::2, 1::2],
+    ], axis=-1)[::step, ::step]
+    return (np.clip(rgb, 0.0, 1.0) * 255.0 + 0.5).astype(np.uint8)
+
+
+# --- Отклик полос на белый шум единичной дисперсии ---
+def _kernel2d(sigma, size):
+    kernel = np.zeros(size, dtype=np.float64)
+    k = gaussian_kernel(sigma) if sigma else np.ones(1)
+    start = (size - len(k)) // 2
+    kernel[start:start + len(k)] = k
+    return np.outer(kernel, kernel)
+
+
+def band_noise_gains():
+    size = 2 * HALO + 1
+    kernels = [_kernel2d(sigma, size) for sigma in (0.0,) + band_sigmas]
+    return np.array([np.sqrt(((fine - coarse) ** 2).sum()) for fine, coarse in zip(kernels, kernels[1:])])
+
+
+def level_bands(values):
+    """Уровень в порядке L1, L1A, L1B, ..., L4B, L5, L5A -> [(L, A, B)] на пять полос."""
+    values = list(values)
+    return [tuple(values[i:i + 3]) for i in range(0, 12, 3)] + [(values[12], values[13], 0.0)]
+
+
+class BayerPreview:
+    __slots__ = ("mosaic", "luma", "noise", "_padded")
+
+    def __init__(self, mosaic):
+        self.mosaic = np.asarray(mosaic, dtype=np.float32)
+        self.luma = mosaic_luma(self.mosaic)
+        self._padded = np.pad(self.luma, HALO, mode="reflect")
+        self.noise = self.estimate_noise()
+
+    def estimate_noise(self, crop=512):
+        """σ шума в каждой полосе: MAD мелкой полосы на центральном фрагменте."""
+        height, width = self.luma.shape
+        y0, x0 = max(0, (height - crop) // 2), max(0, (width - crop) // 2)
+        sample = self.luma[y0:y0 + crop, x0:x0 + crop]
+        fine = sample - gaussian_blur(sample, band_sigmas[0])
+        gains = band_noise_gains()
+        pixel_sigma = np.median(np.abs(fine)) / 0.6745 / gains[0]
+        return pixel_sigma * gains
+
+    def _tile(self, y, x, height, width, params):
+        """Плитка для всех уровней сразу: params (n_levels, 5, 3) -> (n_levels, h, w)."""
+        started = time.perf_counter()
+        region = self._padded[y:y + height + 2 * HALO, x:x + width + 2 * HALO]
+        blurred = [region] + [gaussian_blur(region, sigma) for sigma in band_sigmas]
+        details = np.stack([fine - coarse for fine, coarse in zip(blurred, blurred[1:])])
+        strength, threshold, keep = (params[..., i, None, None] for i in range(3))
+        removed = np.minimum(np.abs(details), threshold * 10.0 * self.noise[:, None, None])
+        np.copysign(removed, details, out=removed)
+        removed *= strength * (1.0 - keep)
+        out = removed.sum(axis=1)
+        np.subtract(blurred[-1] + details.sum(axis=0), out, out=out)
+        out = out[:, HALO:HALO + height, HALO:HALO + width]
+        return y, x, out, (time.perf_counter() - started) * 1000
+
+    def render_luma(self, levels, tile=TILE, workers=None):
+        """Яркость после шумоподавления для всех уровней (n_levels, h, w) и тайминги плиток."""
+        params = np.array([level_bands(values) for values in levels], dtype=np.float32)
+        height, width = self.luma.shape
+        luma = np.empty((len(params), height, width), dtype=np.float32)
+        timings = []
+        jobs = [(y, x, min(tile, height - y), min(tile, width - x))
+                for y in range(0, height, tile) for x in range(0, width, tile)]
+        with ThreadPoolExecutor(workers or os.cpu_count()) as pool:
+            for y, x, result, ms in pool.map(lambda job: self._tile(*job, params), jobs):
+                luma[:, y:y + result.shape[1], x:x + result.shape[2]] = result
+                timings.append((y, x, result.shape[1], result.shape[2], ms))
+        return luma, timings
+
+    def render(self, values, tile=TILE, workers=None):
+        """Мозаика после шумоподавления и тайминги плиток [(y, x, h, w, мс)]."""
+        luma, timings = self.render_luma([values], tile, workers)
+        delta = np.repeat(np.repeat(luma[0] - self.luma, 2, axis=0), 2, axis=1)
+        return np.clip(self.mosaic + delta, 0.0, 1.0), timings
+
+    def preview_rgb(self, luma=None, step=1):
+        """Кадр для показа: без мозаики в полном разрешении, яркость уровня добавляется к RGB квартета."""
+        rgb = np.stack([
+            self.mosaic[0::2, 0::2], (self.mosaic[0::2, 1::2] + self.mosaic[1::2, 0::2]) * 0.5, self.mosaic[1::2, 1::2],
+        ], axis=-1)[::step, ::step]
+        if luma is not None:
+            rgb = rgb + (luma - self.luma)[::step, ::step, None]
+        return (np.clip(rgb, 0.0, 1.0) * 255.0 + 0.5).astype(np.uint8)
+
+
+# --- Chroma Denoise: пирамида Гаусса по Cb/Cr ---
+CHROMA_SCALES = 4
+
+
+def rgb_to_ycbcr(rgb):
+    y = rgb[..., 0] * 0.299 + rgb[..., 1] * 0.587 + rgb[..., 2] * 0.114
+    return y, np.stack([(rgb[..., 2] - y) * 0.564, (rgb[..., 0] - y) * 0.713], axis=-1)
+
+
+def ycbcr_to_rgb(y, chroma):
+    cb, cr = chroma[..., 0], chroma[..., 1]
+    rgb = np.stack([y + 1.403 * cr, y - 0.344 * cb - 0.714 * cr, y + 1.773 * cb], axis=-1)
+    return (np.clip(rgb, 0.0, 1.0) * 255.0 + 0.5).astype(np.uint8)
+
+
+def pyramid_down(img):
+    return gaussian_blur(img, 1.0)[::2, ::2]
+
+
+def pyramid_up(img, shape):
+    up = np.repeat(np.repeat(img, 2, axis=0), 2, axis=1)[:shape[0], :shape[1]]
+    return gaussian_blur(up, 1.0)
+
+
+def chroma_pairs(values):
+    """Уровень в порядке L1, L1A, ..., L4, L4A -> [(L, LA)] на четыре масштаба."""
+    values = list(values)
+    return [tuple(values[i:i + 2]) for i in range(0, 2 * CHROMA_SCALES, 2)]
+
+
+class ChromaPreview:
+    __slots__ = ("luma", "gaussians", "bands", "noise", "_lock", "_cored", "_collapsed")
+
+    def __init__(self, rgb):
+        self.luma, chroma = rgb_to_ycbcr(np.asarray(rgb, dtype=np.float32))
+        self.gaussians = [chroma]
+        for _ in range(CHROMA_SCALES):
+            self.gaussians.append(pyramid_down(self.gaussians[-1]))
+        self.bands = [fine - pyramid_up(coarse, fine.shape) for fine, coarse in zip(self.gaussians, self.gaussians[1:])]
+        self.noise = [np.median(np.abs(band)) / 0.6745 for band in self.bands]
+        self._lock = threading.Lock()
+        self._cored = {}      # масштаб -> ((L, LA), полоса после коринга)
+        self._collapsed = {}  # масштаб -> (пары масштабов k..4, собранная ступень k)
+
+    def _core(self, scale, threshold, edge):
+        band, sigma = self.bands[scale], self.noise[scale]
+        low, high = threshold * sigma, edge * sigma
+        mag = np.abs(band)
+        if high <= low:
+            return np.where(mag > low, band, 0.0).astype(np.float32)
+        ramp = np.clip((mag - low) / (high - low), 0.0, 1.0) * high
+        return np.where(mag >= high, band, np.copysign(ramp, band)).astype(np.float32)
+
+    def render(self, values):
+        """RGB uint8 после шумоподавления и список пересчитанных масштабов."""
+        pairs = chroma_pairs(values)
+        recomputed = []
+        with self._lock:
+            current = self.gaussians[-1]
+            for scale in reversed(range(CHROMA_SCALES)):
+                key = tuple(pairs[scale:])
+                collapsed = self._collapsed.get(scale)
+                if collapsed is not None and collapsed[0] == key:
+                    current = collapsed[1]
+                    continue
+                cored = self._cored.get(scale)
+                if cored is None or cored[0] != pairs[scale]:
+                    cored = (pairs[scale], self._core(scale, *pairs[scale]))
+                    self._cored[scale] = cored
+                    recomputed.append(scale)
+                current = cored[1] + pyramid_up(current, cored[1].shape)
+                self._collapsed[scale] = (key, current)
+        return ycbcr_to_rgb(self.luma, current), sorted(recomputed)
+
+    def original(self):
+        return ycbcr_to_rgb(self.luma, self.gaussians[0])
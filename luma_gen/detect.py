@@ -0,0 +1,164 @@
+"""Определение раскладки по вставленному HEX/байтам.
+
+Скелет каждой раскладки — байты шаблона, где float-параметры заменены джокером на 4 байта.
+Скелеты всех раскладок сложены в сжатое префиксное дерево: общие участки (например,
+`1d ... 250000803f2d0000803f` у Sharp) проверяются один раз через `startswith`, ветки
+расходятся на различающихся байтах (`15` у Bayer, `0a0a0d` у Chroma, `35c3f5a83e` у ID16,
+пороги `12050d...` у ID15/ID14/Bento). Точное совпадение находится за один проход по входу.
+
+Если скелет не совпал целиком (поправлены пороги, дописаны поля), раскладка выбирается
+по доле совпавших служебных байтов среди тех, что честно разбираются по тегам.
+"""
+from .codec import DecodeError
+from .layouts import layouts
+
+_WILDCARD = 4
+
+
+class _Node:
+    __slots__ = ("edges", "terminal")
+
+    def __init__(self):
+        self.edges = []         # [(bytes | int, _Node)]; int — джокер на N байт
+        self.terminal = None    # раскладка, чей скелет здесь заканчивается
+
+
+def skeleton(layout):
+    """Токены скелета до последнего float: байт (int) или джокер (None)."""
+    floats = set()
+    for offset in layout.offsets:
+        floats.update(range(offset, offset + 4))
+    end = layout.offsets[-1] + 4
+    tokens = []
+    pos = 0
+    while pos < end:
+        if pos in floats:
+            tokens.append(None)
+            pos += 4
+        else:
+            tokens.append(layout.template[pos])
+            pos += 1
+    return tokens
+
+
+def build_trie(skeletons):
+    # --- Побайтовое дерево ---
+    root = {}
+    for name, tokens in skeletons.items():
+        node = root
+        for token in tokens:
+            node = node.setdefault(token, {})
+        node["end"] = name
+
+    # --- Цепочки без ветвлений сжимаются в сегменты bytes ---
+    def compress(raw):
+        node = _Node()
+        node.terminal = raw.get("end")
+        for token, child in raw.items():
+            if token == "end":
+                continue
+            if token is None:
+                node.edges.append((_WILDCARD, compress(child)))
+                continue
+            segment = bytearray([token])
+            while len(child) == 1 and isinstance(next(iter(child)), int):
+                (token, child), = child.items()
+                segment.append(token)
+            node.edges.append((bytes(segment), compress(child)))
+        return node
+
+    return compress(root)
+
+
+_trie = None
+
+
+def _get_trie():
+    global _trie
+    if _trie is None:
+        _trie = build_trie({name: skeleton(layout) for name, layout in layouts.items()})
+    return _trie
+
+
+def _exact(data):
+    stack = [(_get_trie(), 0)]
+    while stack:
+        node, pos = stack.pop()
+        if node.terminal is not None:
+            return node.terminal
+        for token, child in node.edges:
+            if token.__class__ is int:
+                if pos + token <= len(data):
+                    stack.append((child, pos + token))
+            elif data.startswith(token, pos):
+                stack.append((child, pos + len(token)))
+    return None
+
+
+class Detection:
+    __slots__ = ("layout", "confidence", "exact", "skip", "candidates")
+
+    def __init__(self, layout, confidence, exact, skip=0, candidates=()):
+        self.layout = layout
+        self.confidence = confidence
+        self.exact = exact            # скелет совпал полностью
+        self.skip = skip              # длина заголовка уровня, если его вставили вместе с блоком
+        self.candidates = candidates  # [(раскладка, оценка)] по убыванию
+
+    def __repr__(self):
+        return f"Detection({self.layout!r}, {self.confidence:.2f}, exact={self.exact})"
+
+
+def _to_bytes(data):
+    if isinstance(data, str):
+        return bytes.fromhex(data)
+    return bytes(data)
+
+
+def _count_levels(frame, data):
+    try:
+        return len(frame.fields(frame.parse(data)))
+    except (DecodeError, ValueError):
+        return 0
+
+
+def detect(data):
+    """Раскладка блока и уверенность: 1.0 — полное совпадение скелета, 0.0 — не распознан."""
+    data = _to_bytes(data)
+    name = _exact(data)
+    if name is not None:
+        return Detection(name, 1.0, True, 0, [(name, 1.0)])
+
+    # --- Вставили вместе с заголовком уровня (0a49 0a14 0d ...) ---
+    for frame in {layout.frame for layout in layouts.values()}:
+        if data.startswith(frame.prefix):
+            name = _exact(data[len(frame.prefix):])
+            if name is not None:
+                return Detection(name, 1.0, True, len(frame.prefix), [(name, 1.0)])
+
+    # --- Точного совпадения нет: сходство служебных байтов среди разбираемых раскладок ---
+    levels_found = {}
+    candidates = []
+    for name, layout in layouts.items():
+        if layout.frame not in levels_found:
+            levels_found[layout.frame] = _count_levels(layout.frame, data)
+        found = levels_found[layout.frame]
+        if found < layout.n_levels:
+            continue
+        candidates.append((name, layout.match(data) * layout.n_levels / found))
+    if not candidates:
+        return Detection(None, 0.0, False)
+    candidates.sort(key=lambda c: c[1], reverse=True)
+    best = candidates[0][1]
+    runner_up = candidates[1][1] if len(candidates) > 1 else 0.0
+    confidence = min(0.5 * best + 0.5 * (best - runner_up), 0.99)
+    return Detection(candidates[0][0], confidence, False, 0, candidates)
+
+
+def decode_any(data):
+    """(Detection, уровни) — раскладка определяется автоматически."""
+    data = _to_bytes(data)
+    detection = detect(data)
+    if detection.layout is None:
+        raise DecodeError("раскладка не распознана")
+    return detection, layouts[detection.layout].decode(data[detection.skip:])
@@ -0,0 +1,186 @@
+"""Семантическое сравнение блоков: поле к полю плюс служебные байты.
+
+Оба блока разбираются одной раскладкой (по умолчанию — определённой по первому блоку)
+через BatchEncoder.decode: float-параметры собираются по таблице смещений одной выборкой,
+изменение поля — несовпадение битов float32 (NaN равен сам себе, -0.0 отличается от 0.0).
+Всё, что не float, — служебные байты (теги, длины, пороги вида `12050d0000a040`);
+отличающиеся служебные байты склеиваются в участки со смещением и номером уровня.
+
+Сравнение с библиотекой — то же самое над матрицей (n_presets, blob_size): без циклов
+по пресетам, тысячи блоков сравниваются за миллисекунды.
+"""
+import numpy as np
+
+from .batch import get_encoder
+from .detect import decode_any
+from .layouts import layout_keys, layouts
+
+
+def to_bytes(blob):
+    """HEX (пробелы и переводы строк допускаются) или bytes -> bytes."""
+    if isinstance(blob, str):
+        return bytes.fromhex("".join(blob.split()))
+    return bytes(blob)
+
+
+def relative_delta(a, b):
+    """|b - a| / |a|; при a == 0 — inf для изменённых и 0 для равных."""
+    a = np.asarray(a, dtype=np.float64)
+    delta = np.abs(np.asarray(b, dtype=np.float64) - a)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(a != 0, delta / np.abs(a), np.where(delta > 0, np.inf, 0.0))
+
+
+def _changed(a, b):
+    return np.asarray(a, dtype='<f4').view('<u4') != np.asarray(b, dtype='<f4').view('<u4')
+
+
+class FieldDelta:
+    __slots__ = ("level", "key", "a", "b", "abs", "rel")
+
+    def __init__(self, level, key, a, b, abs, rel):
+        self.level = level
+        self.key = key
+        self.a = a
+        self.b = b
+        self.abs = abs
+        self.rel = rel
+
+    def __repr__(self):
+        return f"FieldDelta({self.key}[{self.level}]: {self.a:g} -> {self.b:g})"
+
+
+class ByteRun:
+    """Участок отличающихся служебных байтов; level = -1 — до первого уровня."""
+    __slots__ = ("offset", "level", "a", "b")
+
+    def __init__(self, offset, level, a, b):
+        self.offset = offset
+        self.level = level
+        self.a = a
+        self.b = b
+
+    def __repr__(self):
+        return f"ByteRun(0x{self.offset:x}: {self.a.hex()} -> {self.b.hex()})"
+
+
+class BlobDiff:
+    __slots__ = ("layout", "a", "b", "fields", "structure", "size_a", "size_b")
+
+    def __init__(self, layout, a, b, fields, structure, size_a, size_b):
+        self.layout = layout
+        self.a = a                  # (n_levels, n_params) float32
+        self.b = b
+        self.fields = fields        # [FieldDelta] только изменённые
+        self.structure = structure  # [ByteRun]
+        self.size_a = size_a
+        self.size_b = size_b
+
+    @property
+    def same(self):
+        return not self.fields and not self.structure and self.size_a == self.size_b
+
+    def __repr__(self):
+        return (f"BlobDiff({self.layout}: полей изменено {len(self.fields)}, "
+                f"служебных участков {len(self.structure)})")
+
+
+def _byte_runs(mask, a, b, level_starts):
+    positions = np.flatnonzero(mask)
+    if not len(positions):
+        return []
+    breaks = np.flatnonzero(np.diff(positions) > 1) + 1
+    runs = []
+    for run in np.split(positions, breaks):
+        start, stop = int(run[0]), int(run[-1]) + 1
+        level = int(np.searchsorted(level_starts, start, side="right")) - 1
+        runs.append(ByteRun(start, level, bytes(a[start:stop]), bytes(b[start:stop])))
+    return runs
+
+
+def _level_starts(name):
+    layout = layouts[name]
+    return np.array(layout.offsets[::layout.n_params])
+
+
+def _strip_header(name, data):
+    """Блок, вставленный вместе с заголовком уровня (0a49…, 0a61…), — без заголовка, как в decode_any."""
+    layout = layouts[name]
+    prefix = layout.frame.prefix
+    if len(data) == len(prefix) + layout.size and data.startswith(prefix):
+        return data[len(prefix):]
+    return data
+
+
+def _values(name, data):
+    layout = layouts[name]
+    if len(data) == layout.size:
+        return get_encoder(name).decode(np.frombuffer(data, dtype=np.uint8))[0]
+    # --- Длина не совпала с шаблоном: разбор по тегам, служебные байты не выравниваются ---
+    return np.array(layout.decode(data), dtype=np.float32)
+
+
+def diff(a, b, layout=None):
+    """Сравнить два блока одной раскладки -> BlobDiff."""
+    a, b = to_bytes(a), to_bytes(b)
+    name = layout or decode_any(a)[0].layout
+    a, b = _strip_header(name, a), _strip_header(name, b)
+    values_a, values_b = _values(name, a), _values(name, b)
+    changed = _changed(values_a, values_b)
+    absolute = np.abs(values_b.astype(np.float64) - values_a)
+    relative = relative_delta(values_a, values_b)
+    keys = layout_keys[name]
+    fields = [FieldDelta(int(level), keys[param], float(values_a[level, param]), float(values_b[level, param]),
+                         float(absolute[level, param]), float(relative[level, param]))
+              for level, param in zip(*np.nonzero(changed))]
+
+    size = layouts[name].size
+    structure = []
+    if len(a) == len(b) == size:
+        raw_a, raw_b = np.frombuffer(a, dtype=np.uint8), np.frombuffer(b, dtype=np.uint8)
+        mask = (raw_a != raw_b) & get_encoder(name).structure
+        structure = _byte_runs(mask, raw_a, raw_b, _level_starts(name))
+    return BlobDiff(name, values_a, values_b, fields, structure, len(a), len(b))
+
+
+def as_matrix(blobs, layout):
+    """Список HEX/bytes или uint8-матрица -> (n, blob_size) uint8."""
+    if isinstance(blobs, np.ndarray):
+        return blobs.reshape(-1, layouts[layout].size)
+    size = layouts[layout].size
+    data = b"".join(_strip_header(layout, to_bytes(blob)) for blob in blobs)
+    if len(data) % size:
+        raise ValueError(f"в библиотеке есть блоки не по {size} байт")
+    return np.frombuffer(data, dtype=np.uint8).reshape(-1, size)
+
+
+def diff_library(blob, library, layout=None):
+    """Блок против библиотеки блоков той же раскладки, одной пачкой.
+
+    Возвращает словарь массивов длины n_presets: changed — число изменённых полей,
+    max_abs / max_rel — наибольшие дельты, structure — число отличающихся служебных байтов.
+    """
+    blob = to_bytes(blob)
+    name = layout or decode_any(blob)[0].layout
+    blob = _strip_header(name, blob)
+    encoder = get_encoder(name)
+    if len(blob) != encoder.blob_size:
+        raise ValueError(f"блок {len(blob)} байт, раскладка {name} — {encoder.blob_size}")
+    ref = np.frombuffer(blob, dtype=np.uint8)
+    library = as_matrix(library, name)
+
+    values = encoder.decode(library)
+    ref_values = encoder.decode(ref)
+    changed = _changed(values, ref_values)
+    absolute = np.abs(values.astype(np.float64) - ref_values)
+    relative = relative_delta(ref_values, values)
+    absolute[~changed] = 0.0
+    relative[~changed] = 0.0
+    axes = (1, 2)
+    return {
+        "layout": name,
+        "changed": changed.sum(axis=axes),
+        "max_abs": absolute.max(axis=axes, initial=0.0),
+        "max_rel": relative.max(axis=axes, initial=0.0),
+        "structure": (library[:, encoder.structure] != ref[encoder.structure]).sum(axis=1),
+    }
@@ -0,0 +1,206 @@
+"""Подбор параметров уровня под цель: кривую АЧХ (Sharp) или пару кадров до/после (Sharp, Bayer).
+
+Сначала одной пачкой оцениваются случайные стартовые кандидаты, лучшие уточняются
+методом Левенберга–Марквардта с якобианом конечными разностями. Модель принимает пачку
+кандидатов (m, n_params) и возвращает невязки (m, n_residuals) одним вызовом NumPy:
+якобиан — это одна пачка из n_params + 1 кандидатов, пробные шаги для нескольких значений
+демпфирования — ещё одна. Пачки можно раздать по процессам (jobs > 1): модель передаётся
+в каждый процесс один раз при старте пула.
+"""
+import csv
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .denoise import BayerPreview, mosaic_luma
+from .layouts import layout_keys, layouts
+from .mtf import mtf
+from .preview import SharpPreview
+
+
+# --- Допустимые диапазоны параметров ---
+def param_bounds(layout):
+    """(нижние, верхние) границы для одного уровня раскладки."""
+    if layout == "bayer":
+        return np.zeros(14), np.ones(14)
+    if layout.startswith("sharp"):
+        return np.zeros(6), np.array([50.0, 1.0] * 3)
+    raise ValueError(f"подбор для раскладки {layout!r} не поддерживается")
+
+
+def parse_curve(lines):
+    """Строки CSV частота,усиление -> (f, gain); заголовок и лишние столбцы игнорируются."""
+    f, gain = [], []
+    for row in csv.reader(lines):
+        try:
+            f.append(float(row[0]))
+            gain.append(float(row[1]))
+        except (ValueError, IndexError):
+            if len(f) > len(gain):
+                f.pop()
+    if len(f) < 2:
+        raise ValueError("нужны хотя бы две точки частота,усиление")
+    return np.array(f), np.array(gain)
+
+
+# --- Модели невязок: пачка кандидатов (m, n_params) -> (m, n_residuals) ---
+class SharpCurveModel:
+    def __init__(self, target, f, amplitude=0.1, weights=None):
+        self.target = np.asarray(target, dtype=np.float64)
+        self.f = np.asarray(f, dtype=np.float64)
+        self.amplitude = amplitude
+        self.weights = np.ones_like(self.f) if weights is None else np.asarray(weights, dtype=np.float64)
+
+    def __call__(self, candidates):
+        return (mtf(candidates, self.amplitude, self.f) - self.target) * self.weights
+
+
+class SharpImageModel:
+    def __init__(self, before, after):
+        self.preview = SharpPreview(before)
+        self.after = np.asarray(after, dtype=np.float32)
+
+    def __call__(self, candidates):
+        out = self.preview.render_levels(candidates) - self.after
+        return out.reshape(len(out), -1)
+
+
+class BayerImageModel:
+    def __init__(self, before, after, crop=256):
+        """before, after — RGGB-мозаики; сравнивается яркость центрального фрагмента."""
+        before, after = _crop(before, 2 * crop), _crop(after, 2 * crop)
+        self.preview = BayerPreview(before)
+        self.after = mosaic_luma(np.asarray(after, dtype=np.float32))
+
+    def __call__(self, candidates):
+        luma, _ = self.preview.render_luma(candidates, workers=1)
+        return (luma - self.after).reshape(len(luma), -1)
+
+
+def _crop(mosaic, size):
+    height, width = mosaic.shape
+    y, x = max(0, (height - size) // 2) & ~1, max(0, (width - size) // 2) & ~1
+    return mosaic[y:y + size, x:x + size]
+
+
+# --- Пачки кандидатов по процессам ---
+_worker_model = None
+
+
+def _init_worker(model):
+    global _worker_model
+    _worker_model = model
+
+
+def _evaluate(candidates):
+    return _worker_model(candidates)
+
+
+class Evaluator:
+    def __init__(self, model, jobs=1):
+        self.model = model
+        self.jobs = jobs
+        self.evaluations = 0
+        self._pool = ProcessPoolExecutor(jobs, initializer=_init_worker, initargs=(model,)) if jobs > 1 else None
+
+    def __call__(self, candidates):
+        candidates = np.asarray(candidates, dtype=np.float64)
+        self.evaluations += len(candidates)
+        if self._pool is None or len(candidates) < 2:
+            return np.asarray(self.model(candidates), dtype=np.float64)
+        chunks = np.array_split(candidates, min(self.jobs, len(candidates)))
+        return np.concatenate(list(self._pool.map(_evaluate, chunks)))
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FitResult:
+    __slots__ = ("x", "cost", "initial_cost", "iterations", "evaluations")
+
+    def __init__(self, x, cost, initial_cost, iterations, evaluations):
+        self.x = x
+        self.cost = cost
+        self.initial_cost = initial_cost
+        self.iterations = iterations
+        self.evaluations = evaluations
+
+    def __repr__(self):
+        return f"FitResult(cost {self.initial_cost:.4g} -> {self.cost:.4g}, {self.iterations} итераций)"
+
+
+def least_squares(evaluate, x0, lower, upper, max_iter=50, step=1e-4, tol=1e-8, dampings=(0.1, 1.0, 10.0, 100.0)):
+    """Левенберг–Марквардт в границах [lower, upper]; evaluate — пачка -> невязки."""
+    lower, upper = np.asarray(lower, dtype=np.float64), np.asarray(upper, dtype=np.float64)
+    x = np.clip(np.asarray(x0, dtype=np.float64), lower, upper)
+    r = evaluate(x[None])[0]
+    cost = initial = 0.5 * r @ r
+    damping = 1e-2
+    iterations = 0
+    for iterations in range(1, max_iter + 1):
+        # --- Якобиан: x и n сдвинутых кандидатов одной пачкой (у верхней границы — шаг назад) ---
+        h = step * np.maximum(np.abs(x), 1.0)
+        h = np.where(x + h > upper, -h, h)
+        jac = ((evaluate(x + np.diag(h)) - r) / h[:, None]).T
+        grad = jac.T @ r
+        normal = jac.T @ jac
+        scale = np.diag(np.maximum(np.diag(normal), 1e-12 * max(1.0, np.trace(normal))))
+
+        # --- Пробные шаги для нескольких демпфирований тоже одной пачкой ---
+        lambdas = damping * np.asarray(dampings)
+        trials = np.array([np.clip(x + np.linalg.lstsq(normal + lam * scale, -grad, rcond=None)[0], lower, upper)
+                           for lam in lambdas])
+        residuals = evaluate(trials)
+        costs = 0.5 * np.einsum("ij,ij->i", residuals, residuals)
+        best = int(np.argmin(costs))
+        if costs[best] < cost:
+            converged = cost - costs[best] <= tol * max(cost, 1e-30)
+            x, r, cost, damping = trials[best], residuals[best], costs[best], lambdas[best]
+            if converged:
+                break
+        else:
+            damping *= 1000.0
+            if damping > 1e12:
+                break
+    return x, cost, initial, iterations
+
+
+def sample_starts(x0, lower, upper, n, seed=0):
+    """Кандидаты для старта: x0, половина — вокруг x0 (множитель 1/4..4), половина — по всему диапазону."""
+    rng = np.random.default_rng(seed)
+    x0 = np.clip(np.asarray(x0, dtype=np.float64), lower, upper)
+    near = x0 * np.exp(rng.uniform(-np.log(4.0), np.log(4.0), (n // 2, len(x0))))
+    wide = rng.uniform(lower, upper, (n - 1 - n // 2, len(x0)))
+    return np.clip(np.vstack([x0, near, wide]), lower, upper)
+
+
+def fit(model, x0, layout, jobs=1, starts=256, refine=4, **options):
+    """Пачка стартовых кандидатов -> лучшие refine уточняются Левенбергом–Марквардтом."""
+    lower, upper = param_bounds(layout)
+    with Evaluator(model, jobs) as evaluate:
+        initial = 0.5 * np.sum(evaluate(np.clip(np.asarray(x0, dtype=np.float64), lower, upper)[None]) ** 2)
+        candidates = sample_starts(x0, lower, upper, starts)
+        residuals = evaluate(candidates)
+        order = np.argsort(np.einsum("ij,ij->i", residuals, residuals))[:refine]
+        best = None
+        for start in candidates[order]:
+            x, cost, _, iterations = least_squares(evaluate, start, lower, upper, **options)
+            if best is None or cost < best[1]:
+                best = (x, cost, iterations)
+        return FitResult(best[0], best[1], initial, best[2], evaluate.evaluations)
+
+
+def fitted_blob(layout, levels, index, values):
+    """Блок раскладки, где уровень index заменён подобранными значениями."""
+    if len(values) != len(layout_keys[layout]):
+        raise ValueError(f"ожидалось {len(layout_keys[layout])} значений, получено {len(values)}")
+    levels = [list(level) for level in levels]
+    levels[index] = [float(v) for v in values]
+    return layouts[layout].encode(levels)
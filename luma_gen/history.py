@@ -0,0 +1,102 @@
+"""История правок раскладки: отмена/возврат и переход к любой версии.
+
+Версия — кортеж строк уровней, каждая строка — неизменяемые `bytes` (float32 как в блоке,
+см. store.py). Правка одного поля создаёт одну новую строку, остальные уровни версия
+берёт у предыдущей теми же объектами, поэтому тысячи шагов стоят килобайты, а не
+копию всех параметров на шаг. Переход к версии переписывает в массиве только
+отличающиеся уровни.
+"""
+import struct
+import sys
+
+import numpy as np
+
+LIMIT = 5000   # версий на раскладку; самые старые вытесняются
+
+_F32 = struct.Struct("<f")
+
+
+class History:
+    __slots__ = ("names", "versions", "labels", "position", "limit")
+
+    def __init__(self, store, label="исходные значения", limit=LIMIT):
+        self.names = store.dtype.names
+        self.versions = [_rows(store)]
+        self.labels = [label]
+        self.position = 0
+        self.limit = limit
+
+    def __len__(self):
+        return len(self.versions)
+
+    @property
+    def can_undo(self):
+        return self.position > 0
+
+    @property
+    def can_redo(self):
+        return self.position < len(self.versions) - 1
+
+    def record(self, store, label=None):
+        """Снимок массива как новая версия; False, если ничего не изменилось.
+
+        Неизменённые уровни — те же объекты, что в текущей версии; версии после
+        текущей (отменённые) отбрасываются. Без label подпись — что именно поменялось.
+        """
+        current = self.versions[self.position]
+        rows = _rows(store)
+        if rows == current:
+            return False
+        rows = tuple(old if old == new else new for old, new in zip(current, rows))
+        if label is None:
+            label = self._describe(current, rows)
+        del self.versions[self.position + 1:], self.labels[self.position + 1:]
+        self.versions.append(rows)
+        self.labels.append(label)
+        if len(self.versions) > self.limit:
+            del self.versions[0], self.labels[0]
+        self.position = len(self.versions) - 1
+        return True
+
+    def goto(self, store, index):
+        """Записать в массив версию index; возвращает номера уровней, которые поменялись."""
+        if not 0 <= index < len(self.versions):
+            raise IndexError(f"нет версии {index}: всего {len(self.versions)}")
+        current = _rows(store)
+        rows = self.versions[index]
+        changed = [i for i, (old, new) in enumerate(zip(current, rows)) if old != new]
+        for i in changed:
+            store[i] = np.frombuffer(rows[i], dtype=store.dtype)[0]
+        self.position = index
+        return changed
+
+    def undo(self, store):
+        return self.goto(store, self.position - 1) if self.can_undo else None
+
+    def redo(self, store):
+        return self.goto(store, self.position + 1) if self.can_redo else None
+
+    def nbytes(self):
+        """Память истории: каждая строка уровня считается один раз, сколько бы версий её ни делили."""
+        rows = {id(row): row for version in self.versions for row in version}
+        return (sys.getsizeof(self.versions) + sum(map(sys.getsizeof, self.versions))
+                + sum(map(sys.getsizeof, rows.values())))
+
+    def _describe(self, old_rows, new_rows):
+        changed = []
+        for level, (old, new) in enumerate(zip(old_rows, new_rows)):
+            if old is new:
+                continue
+            changed.extend((level, i // 4) for i in range(0, len(new), 4) if old[i:i + 4] != new[i:i + 4])
+        if len(changed) == 1:
+            level, i = changed[0]
+            a, b = (_F32.unpack_from(rows[level], i * 4)[0] for rows in (old_rows, new_rows))
+            return f"{self.names[i]} ур. {level + 1}: {a:.6g} → {b:.6g}"
+        levels = sorted({level + 1 for level, _ in changed})
+        return f"изменено полей: {len(changed)}, ур. {', '.join(map(str, levels))}"
+
+
+def _rows(store):
+    data = store.tobytes()
+    size = store.dtype.itemsize
+    return tuple(data[i:i + size] for i in range(0, len(data), size))
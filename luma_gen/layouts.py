@@ -0,0 +1,191 @@
+import struct
+
+from .schema import load_layouts, schema_keys
+
+# --- Вспомогательные функции ---
+def float_to_hex(f):
+    return struct.pack('<f', f).hex()
+
+def hex_to_float(h):
+    return struct.unpack('<f', bytes.fromhex(h))[0]
+
+
+# === SHARP LEVELS ===
+
+# --- Индексы для Sharp Levels ---
+sharp_slices = {
+    "Sharp very low": (0, 6),
+    "Sharp low": (6, 12),
+    "Sharp med": (12, 18),
+    "Sharp high": (18, 24),
+    "Sharp very high": (24, 30)
+}
+
+sharp_bento_slices = {
+    "Sharp bento low": (30, 36),
+    "Sharp bento high": (36, 42)
+}
+
+# --- Sharp уровни по умолчанию ---
+all_sharp_levels = [
+    {"name": "Sharp very low",  "default": [7.0, 0.060, 3.075, 0.040, 1.875, 0.058]},
+    {"name": "Sharp low",       "default": [8.6, 0.060, 3.69, 0.040, 2.25, 0.058]},
+    {"name": "Sharp med",       "default": [10.0, 0.060, 4.225, 0.040, 2.5, 0.058]},
+    {"name": "Sharp high",      "default": [10.0, 0.066, 3.87, 0.040, 4.62, 0.0224]},
+    {"name": "Sharp very high", "default": [11.3, 0.0436, 3.70, 0.032, 2.05, 0.0232]},
+    {"name": "Sharp bento low", "default": [16.0, 0.0195, 3.10, 0.01975, 1.89, 0.02]},
+    {"name": "Sharp bento high","default": [18.5, 0.0174, 2.70, 0.0187, 1.70, 0.02]}
+]
+
+main_sharp_levels = all_sharp_levels[:5]
+bento_sharp_levels = all_sharp_levels[5:]
+
+# === SHARP LEVELS ID14 ===
+
+# --- Sharp уровни по умолчанию ---
+all_sharp_levels2 = [
+    {"name": "Sharp very low",  "default": [4.0, 0.186, 1.0, 0.1520, 1.9, 0.058]},
+    {"name": "Sharp low",       "default": [5.2, 0.066, 2.24, 0.1, 2.17, 0.011]},
+    {"name": "Sharp med",       "default": [6.55, 0.034, 2.19, 0.2, 1.31, 0.13]},
+    {"name": "Sharp high",      "default": [6.38, 0.016, 2.59, 0.018, 1.13, 0.02]},
+    {"name": "Sharp very high", "default": [5.56, 0.016, 2.37, 0.018, 2.25, 0.02]},
+]
+# === SHARP LEVELS ID16 ===
+
+# --- Sharp уровни по умолчанию ---
+all_sharp_levels3 = [
+    {"name": "Sharp very low",  "default": [4.0, 0.186, 1.0, 0.1520, 1.9, 0.058]},
+    {"name": "Sharp low",       "default": [5.2, 0.066, 2.24, 0.1, 2.17, 0.011]},
+    {"name": "Sharp med",       "default": [6.55, 0.034, 2.19, 0.2, 1.31, 0.13]},
+    {"name": "Sharp high",      "default": [6.38, 0.016, 2.59, 0.018, 1.13, 0.02]},
+    {"name": "Sharp very high", "default": [5.56, 0.016, 2.37, 0.018, 2.25, 0.02]},
+]
+# === SHARP LEVELS ID12 ===
+
+# --- Sharp уровни по умолчанию ---
+all_sharp_levels4 = [
+    {"name": "Sharp very low",  "default": [4.0, 0.186, 1.0, 0.1520, 1.9, 0.058]},
+    {"name": "Sharp low",       "default": [5.2, 0.066, 2.24, 0.1, 2.17, 0.011]},
+    {"name": "Sharp med",       "default": [6.55, 0.034, 2.19, 0.2, 1.31, 0.13]},
+    {"name": "Sharp high",      "default": [6.38, 0.016, 2.59, 0.018, 1.13, 0.02]},
+    {"name": "Sharp very high", "default": [5.56, 0.016, 2.37, 0.018, 2.25, 0.02]},
+]
+
+# --- Полосы Sharp: L и LA (поля 1 и 3) + служебные 4 и 5; у ID16 ещё поле 6 ---
+def _sharp_bands(extra):
+    return [{1: f"l{i}", 3: f"l{i}a", **extra} for i in (1, 2, 3)]
+
+_sharp_strength = [5.0, 10.0, 20.0, 40.0, 80.0]   # поле 2.1 уровня: сила по уровням
+
+
+# === BAYER LUMA DENOISE ===
+
+# --- Значения по умолчанию для новых уровней ---
+bayer_levels = [
+    {"name": "Bayer luma denoise very low", "default": [1.00, 0.10, 0.634044, 0.90, 0.10, 0.231936, 0.85, 0.050, 0.244724, 0.80, 0.050, 0.238304, 0.75, 0.347278]},
+    {"name": "Bayer luma denoise low",      "default": [0.80, 0.10, 0.568930, 0.70, 0.10, 0.301318, 0.70, 0.075, 0.283374, 0.60, 0.0625, 0.373138, 0.70, 0.464653]},
+    {"name": "Bayer luma denoise med",      "default": [0.70, 0.10, 0.503816, 0.80, 0.10, 0.370699, 0.60, 0.10, 0.322023, 0.40, 0.075, 0.507972, 0.50, 0.582028]},
+    {"name": "Bayer luma denoise high",     "default": [0.60, 0.15, 0.642869, 0.50, 0.10, 0.627118, 0.25, 0.10, 0.472521, 0.25, 0.10, 0.362973, 0.20, 0.0777525]},
+    {"name": "Bayer luma denoise very high", "default": [0.65, 0.15, 0.642869, 0.75, 0.10, 0.627118, 0.38, 0.10, 0.472521, 0.30, 0.10, 0.362973, 0.25, 0.0777525]}
+]
+
+
+# === CHROMA DENOISE ===
+
+chroma_levels = [
+    {"name": "Chroma Denoise Low", "default": [5.0, 5.0, 5.0, 5.0, 4.0, 4.0, 4.0, 4.0]},
+    {"name": "Chroma Denoise Med", "default": [5.0, 5.0, 5.0, 5.0, 1.0, 4.0, 2.0, 4.0]},
+    {"name": "Chroma Denoise High", "default": [5.0, 5.0, 4.0, 5.0, 1.0, 4.0, 1.5, 4.0]},
+    {"name": "Chroma Denoise Very High", "default": [4.0, 5.0, 4.0, 5.0, 0.8, 4.0, 1.0, 4.0]}
+]
+
+
+# === СХЕМЫ РАСКЛАДОК (формат — см. schema.py) ===
+# Новый ID — новая запись: шаблон, Frame, encode/decode собираются при импорте
+layout_schemas = {
+    # уровень 0a49: 3 полосы 0a14, сила 12050d; после уровней — обрезанный заголовок следующего
+    "sharp_id15": {
+        "levels": main_sharp_levels,
+        "bands": _sharp_bands({4: 1.0, 5: 1.0}),
+        "trailer": {2: {1: [1.25, 2.5, 5.0, 10.0, 20.0]}},
+        "tail": "0a490a140d",
+    },
+    "sharp_id14": {
+        "levels": all_sharp_levels2,
+        "bands": _sharp_bands({4: 1.0, 5: 1.0}),
+        "trailer": {2: {1: _sharp_strength}},
+        "tail": "0000000000",
+    },
+    # уровень 0a58: полосы 0a19 с полем 6
+    "sharp_id16": {
+        "levels": all_sharp_levels3,
+        "bands": _sharp_bands({4: 1.0, 5: 1.0, 6: 0.33}),
+        "trailer": {2: {1: _sharp_strength}},
+    },
+    "sharp_id12": {
+        "levels": all_sharp_levels4,
+        "bands": _sharp_bands({4: 0.03, 5: 0.5}),
+        "trailer": {2: {1: _sharp_strength}},
+    },
+    "sharp_bento": {
+        "levels": bento_sharp_levels,
+        "bands": _sharp_bands({4: 1.0, 5: 1.0}),
+        "trailer": {2: {1: [40.0, 80.0]}},
+        "tail": "000000",
+    },
+    # уровень 0a61: 4 полосы L/A/B (0a0f) + L5/L5A (0a0a); у последнего уровня только полосы
+    "bayer": {
+        "levels": bayer_levels,
+        "bands": [{1: f"l{i}", 2: f"l{i}a", 3: f"l{i}b"} for i in (1, 2, 3, 4)] + [{1: "l5", 3: "l5a"}],
+        "trailer": {2: {1: _sharp_strength}, 3: 1.6, 4: 0.5},
+        "cut_last": True,
+    },
+    # уровень 0a3e: служебная полоса 0a05 + 4 полосы L/LA (0a0a)
+    "chroma": {
+        "levels": chroma_levels,
+        "bands": [{1: 5.0}] + [{1: f"l{i}", 3: f"l{i}a"} for i in (1, 2, 3, 4)],
+        "trailer": {2: {1: [1.0, 5.0, 10.0]}},
+        "cut_last": True,
+    },
+}
+
+# === ВСЕ РАСКЛАДКИ: собираются по схемам, дальше грузятся из кэша (см. schema.py) ===
+layouts = load_layouts(layout_schemas)
+
+# --- Имена параметров каждой раскладки (как в ключах полей ввода) ---
+layout_keys = {name: schema_keys(schema) for name, schema in layout_schemas.items()}
+
+sharp_keys = layout_keys["sharp_id15"]
+bayer_keys = layout_keys["bayer"]
+chroma_keys = layout_keys["chroma"]
+
+# --- Раскладки уровней во фрагменте (для поиска в дампах, см. scanner.py) ---
+sharp_frame = layouts["sharp_id15"].frame
+sharp_frame_id16 = layouts["sharp_id16"].frame
+bayer_frame = layouts["bayer"].frame
+chroma_frame = layouts["chroma"].frame
+
+# --- Генерация HEX и парсер: одна функция на все раскладки ---
+def generate_hex(layout, values_list):
+    return layouts[layout].encode(values_list).hex()
+
+# --- Старые имена генераторов: тонкие псевдонимы generate_hex для прежних вызовов ---
+def _hex_alias(layout, name):
+    def alias(values_list, *_unused):
+        return generate_hex(layout, values_list)
+    alias.__name__ = alias.__qualname__ = name
+    alias.__doc__ = (f"generate_hex(\"{layout}\", values_list). Остальные аргументы (уровни, срезы) "
+                     f"не используются: раскладка уже скомпилирована, их можно не передавать.")
+    return alias
+
+generate_sharp_hex = _hex_alias("sharp_id15", "generate_sharp_hex")
+generate_sharp_hex2 = _hex_alias("sharp_id14", "generate_sharp_hex2")
+generate_sharp_hex3 = _hex_alias("sharp_id16", "generate_sharp_hex3")
+generate_sharp_hex4 = _hex_alias("sharp_id12", "generate_sharp_hex4")
+generate_bento_sharp_hex = _hex_alias("sharp_bento", "generate_bento_sharp_hex")
+generate_bayer_hex = _hex_alias("bayer", "generate_bayer_hex")
+generate_chroma_hex = _hex_alias("chroma", "generate_chroma_hex")
+
+# --- Парсер HEX -> список уровней (округление как в полях ввода) ---
+def parse_levels_hex(hex_str, layout):
+    return [[float(round(v, 6)) for v in level] for level in layouts[layout].decode(hex_str)]
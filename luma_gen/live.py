@@ -0,0 +1,104 @@
+"""Живой блок раскладки: последний закодированный буфер, правка поля — 4 байта на месте.
+
+Буфер (`bytearray`) кодируется один раз, дальше `sync` сравнивает биты float32 массива
+параметров (store.py: байты строки те же, что уходят в блок) со снимком прошлого вызова
+и переписывает только изменившиеся поля по таблице смещений раскладки. HEX и Base64
+строятся при первом обращении после правки, а не на каждую правку.
+
+Ключи виджетов вида `bayer_l3b_2` (префикс вкладки, поле, уровень) сопоставлены смещениям,
+так что можно и править поле по ключу (`patch`), и назвать, какие поля изменились.
+"""
+import base64
+import struct
+
+import numpy as np
+
+from .layouts import layout_keys, layouts
+
+_U32 = struct.Struct("<I")
+
+
+def widget_keys(layout, prefix):
+    """Ключи виджетов раскладки в порядке полей блока: prefix_ключ_уровень."""
+    keys = layout_keys[layout]
+    return [f"{prefix}_{key}_{level}" for level in range(layouts[layout].n_levels) for key in keys]
+
+
+class LiveBlob:
+    __slots__ = ("layout", "buf", "offsets", "keys", "_names", "_bits", "_hex", "_base64", "last_changed")
+
+    def __init__(self, layout, blob, prefix=None):
+        compiled = layouts[layout]
+        self.layout = layout
+        self.buf = bytearray(blob)
+        if len(self.buf) != compiled.size:
+            raise ValueError(f"блок {len(self.buf)} байт, раскладка {layout} — {compiled.size}")
+        self.offsets = np.array(compiled.offsets, dtype=np.intp)
+        self._names = widget_keys(layout, prefix) if prefix else None
+        self.keys = dict(zip(self._names, self.offsets.tolist())) if prefix else {}
+        raw = np.frombuffer(bytes(self.buf), dtype=np.uint8)
+        self._bits = raw[(self.offsets[:, None] + np.arange(4)).reshape(-1)].view("<u4").copy()
+        self._hex = self._base64 = None
+        self.last_changed = []
+
+    def offset(self, key):
+        """Смещение float32 поля по ключу виджета."""
+        return self.keys[key]
+
+    def _write(self, indices, bits):
+        for index, value in zip(indices, bits):
+            _U32.pack_into(self.buf, self.offsets[index], value)
+        self._bits[indices] = bits
+        self._hex = self._base64 = None
+
+    def patch(self, key, value):
+        """Записать одно поле по ключу виджета."""
+        index = int(np.searchsorted(self.offsets, self.keys[key]))
+        bits = np.array([value], dtype="<f4").view("<u4")
+        if bits[0] != self._bits[index]:
+            self._write([index], bits.tolist())
+            self.last_changed = [key]
+
+    def sync(self, values):
+        """Привести буфер к параметрам (store или (n_levels, n_params)); -> число изменённых полей."""
+        if isinstance(values, np.ndarray) and values.dtype.names:
+            data = values.tobytes()
+        else:
+            data = np.ascontiguousarray(values, dtype="<f4").tobytes()
+        if len(data) != self._bits.nbytes:
+            raise ValueError(f"ожидалось {self._bits.size} значений, получено {len(data) // 4}")
+        # --- Перезапуск без правок (самый частый случай) — одно сравнение байтов ---
+        if data == self._bits.tobytes():
+            return 0
+        bits = np.frombuffer(data, dtype="<u4")
+        changed = np.flatnonzero(bits != self._bits)
+        self._write(changed, bits[changed].tolist())
+        self.last_changed = [self._names[i] for i in changed] if self._names else changed.tolist()
+        return int(changed.size)
+
+    def bytes(self):
+        return bytes(self.buf)
+
+    def hex(self):
+        if self._hex is None:
+            self._hex = self.buf.hex()
+        return self._hex
+
+    def base64(self):
+        if self._base64 is None:
+            self._base64 = base64.b64encode(self.buf).decode()
+        return self._base64
+
+    def c_header(self):
+        return c_header(self.layout, self.buf)
+
+
+def c_header(name, data, per_line=12):
+    """Блок как заголовочный файл C: массив uint8_t и его длина."""
+    ident = "".join(ch if ch.isalnum() else "_" for ch in name).upper()
+    rows = [", ".join(f"0x{byte:02x}" for byte in data[i:i + per_line]) for i in range(0, len(data), per_line)]
+    body = ",\n    ".join(rows)
+    return (f"#ifndef {ident}_BLOB_H\n#define {ident}_BLOB_H\n\n#include <stdint.h>\n\n"
+            f"#define {ident}_BLOB_SIZE {len(data)}u\n\n"
+            f"static const uint8_t {ident.lower()}_blob[{ident}_BLOB_SIZE] = {{\n    {body}\n}};\n\n"
+            f"#endif /* {ident}_BLOB_H */\n")
@@ -0,0 +1,141 @@
+"""АЧХ (MTF) уровней Sharp по той же трёхполосной модели, что и превью резкости.
+
+Полоса b — разность гауссиан с sigma из preview.band_sigmas, её отклик на частоте f
+(циклов на пиксель прокси): D_b(f) = G(σ_{b-1}, f) − G(σ_b, f), G(σ, f) = exp(−2π²σ²f²).
+Коринг нелинеен, поэтому отклик считается для синусоиды заданной амплитуды a: пик полосы
+a·|D_b| уменьшается на порог LA, и усиление полосы L умножается на max(0, 1 − LA / (a·|D_b|)).
+
+    H(f) = 1 + Σ_b L_b · D_b(f) · max(0, 1 − LA_b / (a·|D_b(f)|))
+
+Все уровни считаются одним выражением: (n_levels, 3, 1) против (3, F).
+"""
+import numpy as np
+
+from .preview import band_sigmas
+
+freqs = np.linspace(0.0, 0.5, 257)
+
+
+def band_responses(f=freqs):
+    """(3, F): отклик каждой полосы деталей на частотах f."""
+    sigmas = np.array((0.0,) + band_sigmas)[:, None]
+    gauss = np.exp(-2.0 * np.pi ** 2 * sigmas ** 2 * f ** 2)
+    return gauss[:-1] - gauss[1:]
+
+
+def mtf(levels, amplitude=0.1, f=freqs):
+    """(n_levels, 6) в порядке L1, L1A, L2, L2A, L3, L3A -> (n_levels, F)."""
+    values = np.asarray(levels, dtype=np.float64)
+    gains = values[:, 0::2, None]
+    thresholds = values[:, 1::2, None]
+    bands = band_responses(f)
+    peak = amplitude * np.abs(bands)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        kept = np.clip(1.0 - thresholds / peak, 0.0, None)
+    kept[:, peak == 0] = 0.0
+    return 1.0 + (gains * bands * kept).sum(axis=1)
+
+
+# --- График по слоям: фон, кривая на уровень, легенда — каждый кэшируется отдельно ---
+# Все слои рисуются на одной геометрии (размер, поля, пределы осей), поэтому
+# складываются попиксельно: правка одного уровня перерисовывает только его кривую.
+FIGSIZE = (8, 4.5)
+DPI = 100
+_MARGINS = {"left": 0.08, "right": 0.98, "bottom": 0.12, "top": 0.92}
+Y_STEP = 0.5   # пределы по Y округляются, чтобы мелкие правки не меняли оси
+
+
+def y_limits(curves):
+    lo = min(float(np.min(curves)), 1.0) if len(curves) else 1.0
+    hi = max(float(np.max(curves)), 1.0) if len(curves) else 1.0
+    return float(np.floor(lo / Y_STEP) * Y_STEP - Y_STEP / 2), float(np.ceil(hi / Y_STEP) * Y_STEP + Y_STEP / 2)
+
+
+def _axes(ylim, f=freqs, transparent=False):
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=FIGSIZE, dpi=DPI)
+    FigureCanvasAgg(fig)
+    fig.subplots_adjust(**_MARGINS)
+    ax = fig.add_subplot()
+    ax.set_xlim(0.0, f[-1])
+    ax.set_ylim(*ylim)
+    if transparent:
+        fig.patch.set_alpha(0.0)
+        ax.set_axis_off()
+    return fig, ax
+
+
+def _rgba(fig):
+    fig.canvas.draw()
+    return np.asarray(fig.canvas.buffer_rgba()).copy()
+
+
+def _sparse(fig):
+    """Прозрачный слой -> (номера непрозрачных пикселей, их RGBA): кривая — пара тысяч пикселей из 360 тысяч."""
+    pixels = _rgba(fig).reshape(-1, 4)
+    index = np.flatnonzero(pixels[:, 3])
+    return index, pixels[index]
+
+
+def mtf_background(amplitude, ylim, f=freqs):
+    """Оси, сетка, подписи и линия единичного усиления — (H, W, 4) uint8."""
+    fig, ax = _axes(ylim, f)
+    ax.axhline(1.0, color="grey", linewidth=0.8)
+    ax.set_xlabel("Частота, циклов/пиксель прокси")
+    ax.set_ylabel("Усиление")
+    ax.set_title(f"АЧХ уровней Sharp при контрасте деталей {amplitude:g}")
+    ax.grid(alpha=0.3)
+    return _rgba(fig)
+
+
+def mtf_curve(level, amplitude, style, color, ylim, f=freqs):
+    """Кривая одного уровня (6 значений) — прозрачный слой (см. _sparse)."""
+    fig, ax = _axes(ylim, f, transparent=True)
+    ax.plot(f, mtf([level], amplitude, f)[0], style, color=color, linewidth=1.5)
+    return _sparse(fig)
+
+
+def mtf_legend(entries, ylim, f=freqs):
+    """Легенда [(подпись, стиль, цвет)] — прозрачный слой (см. _sparse)."""
+    from matplotlib.lines import Line2D
+
+    fig, ax = _axes(ylim, f, transparent=True)
+    handles = [Line2D([], [], linestyle=style, color=color, linewidth=1.5) for _, style, color in entries]
+    ax.legend(handles, [label for label, _, _ in entries], loc="upper left", fontsize="small", ncol=2)
+    return _sparse(fig)
+
+
+def compose(background, layers):
+    """Наложение прозрачных слоёв (см. _sparse) на фон (alpha over) -> (H, W, 3) uint8."""
+    out = background[..., :3].reshape(-1, 3).astype(np.float32)
+    for index, pixels in layers:
+        alpha = pixels[:, 3:].astype(np.float32) / 255.0
+        out[index] += (pixels[:, :3] - out[index]) * alpha
+    return out.round().astype(np.uint8).reshape(background.shape[0], background.shape[1], 3)
+
+
+def mtf_layers(series, amplitude, f=freqs):
+    """series — [(подписи уровней, стиль линии, уровни (n, 6))] ->
+    (пределы Y, [(уровень, стиль, цвет)] на кривую, [(подпись, стиль, цвет)] для легенды).
+
+    Цвет задаётся номером уровня, так что одинаковые уровни разных раскладок сравнимы.
+    """
+    from matplotlib import rcParams
+
+    colors = rcParams["axes.prop_cycle"].by_key()["color"]
+    curves, entries = [], []
+    for labels, style, levels in series:
+        for label, color, level in zip(labels, colors, levels):
+            curves.append((tuple(level), style, color))
+            entries.append((label, style, color))
+    values = mtf([level for level, _, _ in curves], amplitude, f) if curves else np.empty((0, len(f)))
+    return y_limits(values), curves, entries
+
+
+def plot_mtf(series, amplitude, f=freqs):
+    """Весь график без кэша -> (H, W, 3) uint8; кэширующая сборка — в веб-интерфейсе."""
+    ylim, curves, entries = mtf_layers(series, amplitude, f)
+    layers = [mtf_curve(level, amplitude, style, color, ylim, f) for level, style, color in curves]
+    return compose(mtf_background(amplitude, ylim, f), layers + [mtf_legend(tuple(entries), ylim, f)])
@@ -0,0 +1,112 @@
+"""Поиск ближайших пресетов архива: «такое уже выпускали?».
+
+Пресет — вектор всех float32 уровня за уровнем, в том же виде, что дают hex_to_float
+и memmap архива. Поля разного масштаба (L1 до 50, L1A в долях единицы) приводятся
+к одному делением на стандартное отклонение поля по архиву; расстояние — среднеквадратичная
+разница в этих единицах: 0.1 значит «в среднем на 0.1σ по каждому полю».
+
+До BRUTE_LIMIT записей — полный перебор пачками по memmap (без копии архива в памяти).
+Больше — KD-дерево scipy (`cKDTree`), если scipy установлен и дерево на этом архиве
+быстрее перебора. Пресеты обычно — вариации десятков исходных (кластеры): там на 10^6
+записей дерево отвечает за 1–3 мс против 150–350 мс перебора. На равномерно рассыпанных
+точках в 30–70 измерениях дерево обходит почти все листья и медленнее перебора, поэтому
+после постройки делается PROBES пробных запросов; не выиграло — остаётся перебор.
+Дерево держит нормированную копию архива в памяти (float64), см. benchmarks/bench_nearest.py.
+"""
+import time
+
+import numpy as np
+
+BRUTE_LIMIT = 50_000
+CHUNK = 65536
+PROBES = 3
+TREE_WIN = 2.0   # дерево остаётся, если пробный запрос хотя бы вдвое быстрее перебора
+
+
+def field_scale(values, chunk=CHUNK):
+    """Стандартное отклонение каждого поля по архиву, (n_levels * n_params,) float32.
+
+    Поля, одинаковые во всём архиве, получают масштаб 1.
+    """
+    total = total_sq = 0.0
+    for start in range(0, len(values), chunk):
+        rows = np.asarray(values[start:start + chunk], dtype=np.float64).reshape(-1, values[0].size)
+        total = total + rows.sum(axis=0)
+        total_sq = total_sq + np.square(rows).sum(axis=0)
+    n = max(len(values), 1)
+    std = np.sqrt(np.maximum(total_sq / n - np.square(total / n), 0.0))
+    std[~(std > 1e-9)] = 1.0
+    return std.astype(np.float32)
+
+
+class NearestIndex:
+    def __init__(self, values, scale=None, brute_limit=BRUTE_LIMIT):
+        """values — (n, n_levels, n_params), обычно `PresetArchive.values` (memmap)."""
+        self.values = values
+        self.shape = values.shape[1:]
+        self.scale = field_scale(values) if scale is None else np.asarray(scale, dtype=np.float32)
+        self.tree = self._build_tree() if len(values) > brute_limit else None
+
+    def _build_tree(self):
+        """cKDTree, если пробные запросы к нему быстрее оценки перебора; иначе None."""
+        try:
+            from scipy.spatial import cKDTree
+        except ImportError:
+            return None
+        data = self._normalized(0, len(self))
+        tree = cKDTree(data, balanced_tree=False, compact_nodes=False)
+
+        # --- Пробы: записи архива с небольшим сдвигом — как правка уже выпущенного пресета ---
+        rng = np.random.default_rng(0)
+        probes = data[rng.integers(0, len(data), PROBES)] + rng.normal(0.0, 0.05, (PROBES, data.shape[1]))
+        started = time.perf_counter()
+        self._brute(probes[0].astype(np.float32), 5, stop=CHUNK)
+        brute = (time.perf_counter() - started) * len(self) / min(CHUNK, len(self))
+        for q in probes:
+            started = time.perf_counter()
+            tree.query(q, 5)
+            if (time.perf_counter() - started) * TREE_WIN > brute:
+                return None
+        return tree
+
+    def __len__(self):
+        return len(self.values)
+
+    def _normalized(self, start, stop):
+        rows = np.asarray(self.values[start:stop], dtype=np.float32).reshape(stop - start, -1)
+        return rows / self.scale
+
+    def query(self, levels, k=5):
+        """Уровни (n_levels, n_params) -> (номера, расстояния) k ближайших, по возрастанию."""
+        q = np.asarray(levels, dtype=np.float32)
+        if q.shape != self.shape:
+            raise ValueError(f"ожидалась форма {self.shape}, получено {q.shape}")
+        q = q.reshape(-1) / self.scale
+        k = min(k, len(self))
+        if not k:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        if self.tree is not None:
+            distances, indices = self.tree.query(q, k)
+            indices, distances = np.atleast_1d(indices), np.atleast_1d(distances) ** 2
+        else:
+            indices, distances = self._brute(q, k)
+        return indices.astype(np.intp), np.sqrt(distances / q.size)
+
+    def _brute(self, q, k, stop=None):
+        # --- Пачка за пачкой: квадраты расстояний, k лучших пачки сливаются с лучшими до неё ---
+        best_i = np.empty(0, dtype=np.intp)
+        best_d = np.empty(0, dtype=np.float64)
+        end = len(self) if stop is None else min(stop, len(self))
+        for start in range(0, end, CHUNK):
+            stop = min(start + CHUNK, end)
+            rows = self._normalized(start, stop)
+            rows -= q
+            d = np.einsum("ij,ij->i", rows, rows)
+            top = np.argpartition(d, k - 1)[:k] if len(d) > k else np.arange(len(d))
+            best_i = np.concatenate([best_i, top + start])
+            best_d = np.concatenate([best_d, d[top]])
+            if len(best_d) > k:
+                keep = np.argpartition(best_d, k - 1)[:k]
+                best_i, best_d = best_i[keep], best_d[keep]
+        order = np.argsort(best_d, kind="stable")
+        return best_i[order], best_d[order]
@@ -0,0 +1,137 @@
+"""Превью резкости: трёхполосная нерезкая маска по L1/L1A, L2/L2A, L3/L3A уровня Sharp.
+
+Модель приближённая, цель — увидеть направление правки без прошивки устройства.
+Яркость раскладывается на три полосы деталей (разности гауссиан с sigma 1, 2, 4 px
+на прокси). L — усиление полосы, LA — порог коринга в долях яркости [0, 1]: детали
+слабее порога не усиливаются (шум), сильнее — усиливаются на величину превышения.
+Полосы считаются один раз на изображение раздельными свёртками, правка параметров
+стоит одного прохода по трём массивам.
+"""
+import io
+
+import numpy as np
+
+band_sigmas = (1.0, 2.0, 4.0)
+PROXY_SIDE = 512
+
+
+# --- Раздельная гауссова свёртка: строки, затем столбцы ---
+def gaussian_kernel(sigma):
+    radius = max(1, int(3 * sigma + 0.5))
+    x = np.arange(-radius, radius + 1, dtype=np.float32)
+    kernel = np.exp(-0.5 * (x / sigma) ** 2)
+    return kernel / kernel.sum()
+
+
+def convolve_axis(img, kernel, axis):
+    radius = len(kernel) // 2
+    pad = [(0, 0)] * img.ndim
+    pad[axis] = (radius, radius)
+    padded = np.pad(img, pad, mode="reflect")
+    n = img.shape[axis]
+    index = [slice(None)] * img.ndim
+    out = np.zeros_like(img)
+    tmp = np.empty_like(img)
+    for i, weight in enumerate(kernel):
+        index[axis] = slice(i, i + n)
+        np.multiply(padded[tuple(index)], weight, out=tmp)
+        out += tmp
+    return out
+
+
+def gaussian_blur(img, sigma):
+    kernel = gaussian_kernel(sigma)
+    return convolve_axis(convolve_axis(img, kernel, 0), kernel, 1)
+
+
+class SharpPreview:
+    __slots__ = ("luma", "bands")
+
+    def __init__(self, luma):
+        self.luma = np.asarray(luma, dtype=np.float32)
+        blurred = [self.luma] + [gaussian_blur(self.luma, sigma) for sigma in band_sigmas]
+        self.bands = np.stack([fine - coarse for fine, coarse in zip(blurred, blurred[1:])])
+
+    def render(self, gains, thresholds):
+        out = self.luma.copy()
+        for band, gain, threshold in zip(self.bands, gains, thresholds):
+            detail = np.abs(band)
+            detail -= threshold
+            np.maximum(detail, 0.0, out=detail)
+            out += gain * np.copysign(detail, band)
+        return np.clip(out, 0.0, 1.0, out=out)
+
+    def render_level(self, values):
+        """values — уровень Sharp в порядке L1, L1A, L2, L2A, L3, L3A."""
+        values = list(values)
+        return self.render(values[0::2], values[1::2])
+
+    def render_levels(self, levels):
+        """Все уровни одним проходом: (n_levels, 6) -> (n_levels, H, W).
+
+        Параметры уровней идут осью (n_levels, 3, 1, 1) против общих полос (3, H, W).
+        """
+        values = np.asarray(levels, dtype=np.float32)
+        gains = values[:, 0::2, None, None]
+        thresholds = values[:, 1::2, None, None]
+        detail = np.abs(self.bands) - thresholds
+        np.maximum(detail, 0.0, out=detail)
+        np.copysign(detail, self.bands, out=detail)
+        detail *= gains
+        out = detail.sum(axis=1)
+        out += self.luma
+        return np.clip(out, 0.0, 1.0, out=out)
+
+
+# --- Прокси-изображения ---
+def to_luma(rgb):
+    return rgb[..., 0] * 0.299 + rgb[..., 1] * 0.587 + rgb[..., 2] * 0.114
+
+
+def load_rgb(data, side=PROXY_SIDE):
+    """Файл изображения (bytes) -> RGB float32 [0, 1], длинная сторона не больше side."""
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as img:
+        img.draft("RGB", (side, side))
+        img = img.convert("RGB")
+        img.thumbnail((side, side), Image.LANCZOS)
+        return np.asarray(img, dtype=np.float32) / 255.0
+
+
+def load_proxy(data, side=PROXY_SIDE):
+    """Файл изображения (bytes) -> яркость float32 [0, 1], длинная сторона не больше side."""
+    return to_luma(load_rgb(data, side))
+
+
+def test_chart(side=384, seed=0):
+    """Синтетический эталон: зонная пластина, наклонный край, штрихи, слабый шум."""
+    y, x = np.mgrid[0:side, 0:side].astype(np.float32) / side
+    zone = 0.5 + 0.4 * np.cos(120 * np.pi * ((x - 0.25) ** 2 + (y - 0.5) ** 2))
+    edge = np.where(x - 0.75 > 0.1 * (y - 0.25), 0.8, 0.2)
+    bars = 0.5 + 0.3 * np.sign(np.sin(np.pi * x * side / 3))
+    chart = np.where(x < 0.5, zone, np.where(y < 0.5, edge, bars))
+    noise = np.random.default_rng(seed).normal(0.0, 0.01, chart.shape)
+    return np.clip(chart + noise, 0.0, 1.0).astype(np.float32)
+
+
+def to_uint8(luma):
+    return (luma * 255.0 + 0.5).astype(np.uint8)
+
+
+def compose_grid(images, labels, columns=3, pad=6, label_height=16):
+    """Сетка подписанных кадров (uint8, серые или RGB) одним изображением Pillow."""
+    from PIL import Image, ImageDraw
+
+    tiles = [Image.fromarray(img).convert("RGB") for img in images]
+    width = max(tile.width for tile in tiles)
+    height = max(tile.height for tile in tiles)
+    rows = -(-len(tiles) // columns)
+    grid = Image.new("RGB", (pad + columns * (width + pad), pad + rows * (height + label_height + pad)), "white")
+    draw = ImageDraw.Draw(grid)
+    for i, (tile, label) in enumerate(zip(tiles, labels)):
+        x = pad + i % columns * (width + pad)
+        y = pad + i // columns * (height + label_height + pad)
+        draw.text((x, y), label, fill="black")
+        grid.paste(tile, (x, y + label_height))
+    return grid
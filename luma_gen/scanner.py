@@ -0,0 +1,153 @@
+"""Поиск блоков уровней в полном дампе конфигурации (бинарном или HEX).
+
+Каждый уровень в дампе — это LEN-сообщение с узнаваемым заголовком: например
+`0a49 0a14 0d` у Sharp ID15/ID14/ID12/Bento, `0a61 0a0f 0d` у Bayer. Заголовки ищутся
+через `find` (mmap, bytes), найденный уровень разбирается кодеком на месте (memoryview без копий),
+подряд идущие уровни одного типа собираются в блок.
+"""
+import binascii
+import io
+import mmap
+import tempfile
+from contextlib import contextmanager
+
+from .codec import DecodeError, decode, read_varint
+from .layouts import bayer_frame, chroma_frame, sharp_frame, sharp_frame_id16
+
+# --- Семейства уровней: заголовок уровня и раскладки, которые его используют ---
+families = {
+    "sharp": (sharp_frame, ("sharp_id15", "sharp_id14", "sharp_id12", "sharp_bento")),
+    "sharp_id16": (sharp_frame_id16, ("sharp_id16",)),
+    "bayer": (bayer_frame, ("bayer",)),
+    "chroma": (chroma_frame, ("chroma",)),
+}
+
+_HEX_CHARS = frozenset(b"0123456789abcdefABCDEF \t\r\n")
+_WHITESPACE = b" \t\r\n"
+_CHUNK = 4 << 20
+
+
+class LevelHit:
+    __slots__ = ("family", "offset", "end", "block", "index", "values")
+
+    def __init__(self, family, offset, end, block, index, values):
+        self.family = family    # ключ из families
+        self.offset = offset    # смещение заголовка уровня в бинарных данных
+        self.end = end
+        self.block = block      # смещение первого уровня блока
+        self.index = index      # номер уровня внутри блока
+        self.values = values
+
+    def __repr__(self):
+        return f"LevelHit({self.family}, @{self.offset}, block @{self.block}[{self.index}])"
+
+
+def is_hex_dump(buf, probe=4096):
+    sample = bytes(buf[:probe])
+    return bool(sample) and all(b in _HEX_CHARS for b in sample)
+
+
+def unhexlify_stream(buf, out, chunk=_CHUNK):
+    """HEX-текст -> байты кусками, без одной огромной строки в памяти."""
+    carry = b""
+    for start in range(0, len(buf), chunk):
+        data = carry + bytes(buf[start:start + chunk]).translate(None, _WHITESPACE)
+        cut = len(data) & ~1
+        out.write(binascii.unhexlify(data[:cut]))
+        carry = data[cut:]
+    if carry:
+        raise ValueError("нечётное число HEX-символов")
+
+
+def _family_hits(buf, family):
+    frame = families[family][0]
+    prefix = frame.prefix
+    view = memoryview(buf)
+    try:
+        pos = buf.find(prefix)
+        while pos != -1:
+            try:
+                length, start = read_varint(view, pos + 1, len(view))
+                end = start + length
+                if end <= len(view):
+                    level = decode(view[start:end], strict=True)
+                    yield pos, end, [f.value for f in frame.level_fields(level)]
+            except DecodeError:
+                pass
+            pos = buf.find(prefix, pos + 1)
+    finally:
+        view.release()
+
+
+def scan_levels(buf, only=None):
+    """Лениво отдаёт LevelHit по возрастанию смещений для всех семейств."""
+    names = [name for name in families if only is None or name in only]
+    iters = {name: _family_hits(buf, name) for name in names}
+    heads = {}
+    for name, it in iters.items():
+        hit = next(it, None)
+        if hit is not None:
+            heads[name] = hit
+    last = {}  # семейство -> (конец предыдущего уровня, начало блока, номер)
+    while heads:
+        name = min(heads, key=lambda n: heads[n][0])
+        offset, end, values = heads[name]
+        prev_end, block, index = last.get(name, (None, None, -1))
+        if prev_end != offset:
+            block, index = offset, -1
+        index += 1
+        last[name] = (end, block, index)
+        yield LevelHit(name, offset, end, block, index, values)
+        hit = next(iters[name], None)
+        if hit is None:
+            del heads[name]
+        else:
+            heads[name] = hit
+
+
+def scan_blocks(buf, only=None):
+    """Группирует уровни в блоки (семейство, смещение блока, [LevelHit, ...]).
+
+    Блок отдаётся, как только найден следующий блок того же семейства или кончились данные.
+    """
+    open_blocks = {}
+    for hit in scan_levels(buf, only):
+        if hit.index == 0 and hit.family in open_blocks:
+            yield open_blocks.pop(hit.family)
+        open_blocks.setdefault(hit.family, (hit.family, hit.block, []))[2].append(hit)
+    yield from sorted(open_blocks.values(), key=lambda b: b[1])
+
+
+def to_binary(data):
+    """Дамп в памяти (например, загруженный файл): HEX переводится в байты, бинарный — как есть."""
+    if not is_hex_dump(data):
+        return data
+    out = io.BytesIO()
+    unhexlify_stream(data, out)
+    return out.getvalue()
+
+
+@contextmanager
+def open_dump(path):
+    """mmap файла дампа; HEX-дамп сначала потоково переводится в байты во временный файл."""
+    with open(path, "rb") as f:
+        if f.seek(0, 2) == 0:
+            yield b""
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if not is_hex_dump(mm):
+                yield mm
+                return
+            with tempfile.TemporaryFile() as tmp:
+                unhexlify_stream(mm, tmp)
+                tmp.flush()
+                if tmp.tell() == 0:
+                    yield b""
+                    return
+                with mmap.mmap(tmp.fileno(), 0, access=mmap.ACCESS_READ) as binary:
+                    yield binary
+
+
+def scan_file(path, only=None):
+    with open_dump(path) as buf:
+        yield from scan_levels(buf, only)
@@ -0,0 +1,162 @@
+"""Раскладка блока, описанная данными: из схемы собираются шаблон и Frame.
+
+    "sharp_id15": {
+        "levels": main_sharp_levels,                          # имена и значения по умолчанию
+        "bands": [{1: "l1", 3: "l1a", 4: 1.0, 5: 1.0}, ...],  # полосы уровня: поле -> параметр или константа
+        "trailer": {2: {1: [1.25, 2.5, 5.0, 10.0, 20.0]}},    # остальные поля уровня
+        "cut_last": False,                                    # у последнего уровня только полосы
+        "tail": "0a490a140d",                                 # байты после последнего уровня как есть
+    }
+
+Уровни — поля 1 верхнего уровня, полосы — поля 1 внутри уровня, за полосами идут поля
+`trailer`. Строка — параметр (float32, имя как в ключах полей ввода), число — константа
+float32, список — константа со своим значением на каждый уровень, словарь — вложенное
+сообщение. Всё до первого параметра отрезается: это заголовок фрагмента (`Frame.prefix`).
+Новая раскладка — новая запись схемы; encode/decode под неё генерирует CompiledLayout.
+
+Собранные раскладки (шаблоны, смещения, байткод encode/decode) кэшируются одним файлом
+marshal рядом с .pyc: `__pycache__/layouts.<версия python>.bin`. Ключ — crc32 схем и
+размеров/времени правки модулей, которые их собирают; при несовпадении таблицы
+собираются заново и файл перезаписывается. LUMA_LAYOUT_CACHE — другой путь к кэшу,
+пустая строка — без кэша.
+"""
+import marshal
+import os
+import struct
+import sys
+import zlib
+
+from .codec import FIXED32, LEN, Frame, write_varint
+from .templates import CompiledLayout
+
+CACHE_MAGIC = b"LUMATBL1"
+
+_F32 = struct.Struct("<f")
+
+
+def _head(number, wire_type, length=None):
+    out = bytearray()
+    write_varint(out, (number << 3) | wire_type)
+    if length is not None:
+        write_varint(out, length)
+    return out
+
+
+def _fields(items, level, n_full, values):
+    """Поля сообщения -> (байты, [(смещение, параметр), ...]).
+
+    n_full — сколько уровней попадает в блок целиком: у обрезанного последнего
+    служебные поля не пишутся, значение для него в списках можно не указывать.
+    """
+    out = bytearray()
+    params = []
+    for number, value in items:
+        if isinstance(value, dict):
+            payload, inner = _fields(value.items(), level, n_full, values)
+            out += _head(number, LEN, len(payload))
+            params.extend((len(out) + offset, key) for offset, key in inner)
+            out += payload
+            continue
+        out += _head(number, FIXED32)
+        if isinstance(value, str):
+            params.append((len(out), value))
+            value = values[value]
+        elif isinstance(value, (list, tuple)):
+            if not n_full <= len(value) <= n_full + 1:
+                raise ValueError(f"поле {number}: {len(value)} значений на {n_full} уровней")
+            value = value[level] if level < len(value) else 0.0
+        out += _F32.pack(value)
+    return out, params
+
+
+def schema_keys(schema):
+    """Имена параметров уровня в порядке полей блока."""
+    keys = []
+    for band in schema["bands"]:
+        for value in band.values():
+            if isinstance(value, dict):
+                raise ValueError("параметры полосы — только float-поля верхнего уровня полосы")
+            if isinstance(value, str):
+                keys.append(value)
+    return keys
+
+
+def build(schema):
+    """Схема -> (Frame, шаблон фрагмента)."""
+    keys = schema_keys(schema)
+    n_levels = len(schema["levels"])
+    n_full = n_levels - 1 if schema.get("cut_last") else n_levels
+    blob = bytearray()
+    first = None
+    for level, defaults in enumerate(schema["levels"]):
+        values = dict(zip(keys, defaults["default"]))
+        bands, params = _fields(((1, band) for band in schema["bands"]), level, n_full, values)
+        trailer, extra = _fields(schema.get("trailer", {}).items(), level, n_full, values)
+        if extra:
+            raise ValueError("параметры вне полос: Frame читает только полосы")
+        body = bands + trailer
+        head = _head(1, LEN, len(body))   # длина целого уровня, даже если он обрезан
+        if first is None:
+            first = len(blob) + len(head) + params[0][0]
+        if schema.get("cut_last") and level == n_levels - 1:
+            body = bands
+        blob += head + body
+    blob += bytes.fromhex(schema.get("tail", ""))
+    bands = [tuple(number for number, value in band.items() if isinstance(value, str)) for band in schema["bands"]]
+    return Frame(blob[:first].hex(), bands), bytes(blob[first:])
+
+
+def compile_schema(schema):
+    return CompiledLayout(*build(schema))
+
+
+# --- Кэш собранных раскладок ---
+def cache_path():
+    default = os.path.join(os.path.dirname(__file__), "__pycache__", f"layouts.{sys.implementation.cache_tag}.bin")
+    return os.environ.get("LUMA_LAYOUT_CACHE", default) or None
+
+
+def _cache_key(schemas):
+    here = os.path.dirname(__file__)
+    stamps = [(os.stat(os.path.join(here, name)).st_mtime_ns, os.stat(os.path.join(here, name)).st_size)
+              for name in ("codec.py", "schema.py", "templates.py")]
+    return zlib.crc32(repr((schemas, stamps, sys.implementation.cache_tag)).encode())
+
+
+def _read_cache(path, key):
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    if data[:len(CACHE_MAGIC)] != CACHE_MAGIC or int.from_bytes(data[8:12], "little") != key:
+        return None
+    try:
+        return marshal.loads(data[12:])
+    except (EOFError, ValueError, TypeError):
+        return None
+
+
+def _write_cache(path, key, tables):
+    data = CACHE_MAGIC + key.to_bytes(4, "little") + marshal.dumps(tables)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)   # параллельные воркеры не увидят недописанный файл
+    except OSError:
+        pass                    # каталог только для чтения — собираем при каждом импорте
+
+
+def load_layouts(schemas):
+    """Схемы -> {имя: CompiledLayout}, из кэша, если он соответствует схемам."""
+    path = cache_path()
+    key = _cache_key(schemas) if path else None
+    tables = _read_cache(path, key) if path else None
+    if tables is not None and list(tables) == list(schemas):
+        return {name: CompiledLayout.from_table(table) for name, table in tables.items()}
+    layouts = {name: compile_schema(schema) for name, schema in schemas.items()}
+    if path:
+        _write_cache(path, key, {name: layout.table() for name, layout in layouts.items()})
+    return layouts
@@ -0,0 +1,226 @@
+"""HTTP-сервис генерации и разбора блоков на asyncio без сторонних зависимостей.
+
+    luma-gen serve --port 8377 --jobs 4
+
+    POST /encode/{layout}   {"levels": [[...], ...]}            -> {"layout", "hex", ...}
+                            {"presets": [запись, ...]} или [...]  -> {"results": [...]}
+    POST /decode            {"hex": "...", "layout": ...?}        -> {"layout", "levels", ...}
+                            {"blobs": [hex | запись, ...], "layout": ...?} или [...] -> {"results": [...]}
+    GET  /layouts, GET /health
+
+Записи — как у `luma-gen encode/decode`: "levels" или плоские l1_0, l1a_0, ...; ошибки
+записей пачки возвращаются полем "error", ошибка одиночного запроса — кодом 400.
+Сервис без состояния: одинаковые запросы, пришедшие, пока первый ещё считается,
+не считаются заново, а ждут его результат (склейка по пути и телу запроса).
+Пачки больше POOL_THRESHOLD записей уходят в пул процессов (--jobs > 1) или в поток,
+чтобы цикл событий продолжал отвечать остальным клиентам.
+"""
+import asyncio
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+from .cli import _run_chunk
+from .layouts import layout_keys, layouts
+
+MAX_BODY = 16 * 1024 * 1024
+POOL_THRESHOLD = 64
+CHUNK = 1000
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            411: "Length Required", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _params(layout):
+    """Поля записи с параметрами: levels и плоские l1_0, l1a_0, ..."""
+    # имя раскладки приходит от клиента: незнакомые имена не кэшируются
+    return _param_fields.get(layout, _LEVELS_ONLY) if isinstance(layout, str) else _LEVELS_ONLY
+
+
+_LEVELS_ONLY = frozenset({"levels"})
+_param_fields = {
+    name: _LEVELS_ONLY | {f"{key}_{idx}" for idx in range(layout.n_levels) for key in layout_keys[name]}
+    for name, layout in layouts.items()
+}
+
+
+def _batch(body, key):
+    """Тело запроса -> (записи, одиночный ли запрос)."""
+    if isinstance(body, list):
+        return body, False
+    if not isinstance(body, dict):
+        raise HttpError(400, "ожидался JSON-объект или массив")
+    if key in body:
+        if not isinstance(body[key], list):
+            raise HttpError(400, f"{key}: ожидался массив")
+        return body[key], False
+    return [body], True
+
+
+class Service:
+    def __init__(self, jobs=1):
+        self.pool = ProcessPoolExecutor(jobs) if jobs > 1 else None   # None — поток по умолчанию
+        self.jobs = jobs
+        self.in_flight = {}
+        self.requests = 0
+        self.coalesced = 0
+
+    # --- Маршруты ---
+    async def handle(self, method, path, body):
+        """-> тело ответа (JSON, bytes)."""
+        path = path.split("?", 1)[0].rstrip("/")
+        if method == "GET" and path == "/health":
+            return to_json({"status": "ok", "requests": self.requests, "coalesced": self.coalesced})
+        if method == "GET" and path == "/layouts":
+            return to_json({name: {"n_levels": layout.n_levels, "keys": layout_keys[name], "size": layout.size}
+                            for name, layout in layouts.items()})
+        if path.startswith("/encode/") or path == "/decode":
+            if method != "POST":
+                raise HttpError(405, "нужен POST")
+            return await self.coalesce(path, body)
+        raise HttpError(404, f"нет маршрута {path}")
+
+    async def coalesce(self, path, body):
+        # --- Одинаковый запрос уже считается — ждём его готовый ответ ---
+        key = (path, body)
+        future = self.in_flight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[key] = future
+        try:
+            result = to_json(await self.compute(path, body))
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()   # исключение получат ожидающие, без предупреждения о потерянном
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self.in_flight[key]
+
+    async def compute(self, path, body):
+        try:
+            body = json.loads(body)
+        except ValueError as e:
+            raise HttpError(400, f"JSON: {e}")
+        if path == "/decode":
+            command, key = "decode", "blobs"
+            default = body.get("layout") if isinstance(body, dict) else None
+        else:
+            command, key = "encode", "presets"
+            default = path[len("/encode/"):]
+            if default not in layouts:
+                raise HttpError(404, f"неизвестная раскладка {default!r}")
+        records, single = _batch(body, key)
+        records = [{"hex": r} if isinstance(r, str) else r if isinstance(r, dict) else {"error": "ожидался объект"}
+                   for r in records]
+
+        results = await self.run(command, default, records)
+        if command == "encode":
+            # параметры не возвращаются обратно: ответ — раскладка, HEX и прочие поля записи
+            results = [{k: v for k, v in r.items() if k not in _params(r.get("layout"))} for r in results]
+        if single:
+            if results[0].get("error"):
+                raise HttpError(400, results[0]["error"])
+            return results[0]
+        return {"results": results}
+
+    async def run(self, command, layout, records):
+        if len(records) <= POOL_THRESHOLD:
+            return _run_chunk((command, layout, records))
+        loop = asyncio.get_running_loop()
+        size = max(POOL_THRESHOLD, min(CHUNK, -(-len(records) // self.jobs)))
+        parts = await asyncio.gather(*(loop.run_in_executor(self.pool, _run_chunk, (command, layout, records[i:i + size]))
+                                       for i in range(0, len(records), size)))
+        return [record for part in parts for record in part]
+
+    # --- HTTP/1.1 с keep-alive поверх asyncio-потоков ---
+    async def serve_client(self, reader, writer):
+        try:
+            while True:
+                request = await read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                self.requests += 1
+                try:
+                    status, payload = 200, await self.handle(method, path, body)
+                except HttpError as e:
+                    status, payload = e.status, to_json({"error": str(e)})
+                except Exception as e:
+                    status, payload = 500, to_json({"error": f"{type(e).__name__}: {e}"})
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except HttpError as e:
+            writer.write(response(e.status, to_json({"error": str(e)}), False))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+
+
+async def read_request(reader):
+    """(метод, путь, заголовки, тело) или None, если клиент закрыл соединение."""
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, path, _ = line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise HttpError(400, "неверная строка запроса")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    if "chunked" in headers.get("transfer-encoding", ""):
+        raise HttpError(411, "нужен Content-Length")
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise HttpError(400, "неверный Content-Length")
+    if length > MAX_BODY:
+        raise HttpError(413, f"тело больше {MAX_BODY} байт")
+    body = await reader.readexactly(length) if length else b""
+    return method, path, headers, body
+
+
+def to_json(payload):
+    return json.dumps(payload, ensure_ascii=False).encode()
+
+
+def response(status, body, keep_alive=True):
+    head = (f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode() + body
+
+
+async def serve(host="127.0.0.1", port=8377, jobs=1, ready=None):
+    service = Service(jobs)
+    server = await asyncio.start_server(service.serve_client, host, port, backlog=1024)
+    if ready is not None:
+        ready(server.sockets[0].getsockname()[1])
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
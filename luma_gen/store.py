@@ -0,0 +1,44 @@
+"""Параметры раскладки одним массивом float32 вместо сотни отдельных float в session_state.
+
+Для каждой раскладки — структурированный массив формы (n_levels,) с именованными полями
+L1, L1A, ..., L5A. Байты строки совпадают с тем, что уходит в блок (float32 little-endian),
+поэтому `tobytes()` годится и как ключ кэша, и как снимок для истории правок.
+"""
+import numpy as np
+
+from .layouts import layout_keys, layout_schemas, layouts
+
+# --- Уровни со значениями по умолчанию для каждой раскладки ---
+layout_levels = {name: schema["levels"] for name, schema in layout_schemas.items()}
+
+
+def param_dtype(layout):
+    return np.dtype([(key.upper(), "<f4") for key in layout_keys[layout]])
+
+
+dtypes = {name: param_dtype(name) for name in layouts}
+
+
+def new_store(layout, levels=None):
+    """Массив параметров раскладки; без levels — значения по умолчанию."""
+    if levels is None:
+        levels = [level["default"] for level in layout_levels[layout]]
+    store = np.zeros(layouts[layout].n_levels, dtype=dtypes[layout])
+    set_levels(store, levels)
+    return store
+
+
+def set_levels(store, levels):
+    if len(levels) != len(store):
+        raise ValueError(f"ожидалось {len(store)} уровней, получено {len(levels)}")
+    store[:] = [tuple(values) for values in levels]
+
+
+def store_values(store):
+    """(n_levels, n_params) float32 — вид на те же байты, без копии."""
+    return store.view("<f4").reshape(len(store), -1)
+
+
+def to_levels(store):
+    """Списки Python float по уровням — в том виде, что принимают генераторы."""
+    return store_values(store).tolist()
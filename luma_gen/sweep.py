@@ -0,0 +1,181 @@
+"""Перебор параметров: декартово произведение диапазонов полей -> блоки в ZIP или NDJSON.
+
+Ось перебора — поле раскладки (l1, l2a, ...) на выбранных уровнях (по умолчанию на всех)
+и список значений. Вариант с номером k восстанавливается из номера (`np.unravel_index`),
+поэтому произведение не хранится целиком: пачка — это диапазон номеров [start, stop),
+значения пачки собираются векторно и кодируются BatchEncoder'ом. Пачки можно раздать
+по процессам, в работе держится не больше 2*jobs пачек.
+
+ZIP содержит sweep.json (описание перебора) и на каждую пачку пару файлов:
+part-NNNNN.bin — блоки подряд, по blob_size байт на вариант, и part-NNNNN.csv —
+манифест: номер варианта и значения осей.
+"""
+import csv
+import io
+import json
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from math import prod
+
+import numpy as np
+
+from .batch import blobs_to_hex, get_encoder
+from .layouts import layout_keys, layouts
+
+CHUNK = 10000
+
+
+class Axis:
+    __slots__ = ("key", "levels", "values")
+
+    def __init__(self, key, values, levels=None):
+        self.key = key
+        self.levels = None if levels is None else tuple(levels)  # None — все уровни
+        with np.errstate(over="ignore"):   # переполнение float32 -> inf, отсекается ниже
+            self.values = np.asarray(values, dtype=np.float32).reshape(-1)
+        if not len(self.values):
+            raise ValueError(f"ось {key}: пустой список значений")
+        if not np.isfinite(self.values).all():
+            # nan/inf (и числа за пределом float32) не записать ни в манифест, ни в NDJSON
+            raise ValueError(f"ось {key}: значения должны быть конечными числами float32")
+
+    @property
+    def label(self):
+        return self.key if self.levels is None else f"{self.key}@{','.join(map(str, self.levels))}"
+
+    def __repr__(self):
+        return f"Axis({self.label}, {len(self.values)} значений)"
+
+
+def parse_values(text):
+    """'6:12:1' (границы включительно), '6,8,10' или одно число."""
+    text = text.strip()
+    if ":" in text:
+        start, stop, step = (float(part) for part in text.split(":"))
+        if not np.isfinite([start, stop, step]).all():
+            raise ValueError(f"диапазон {text!r}: границы и шаг должны быть конечными")
+        if step <= 0 or stop < start:
+            raise ValueError(f"диапазон {text!r}: нужен шаг > 0 и конец >= начала")
+        return np.arange(start, stop + step / 2, step)
+    return [float(part) for part in text.split(",") if part.strip()]
+
+
+def parse_axis(text):
+    """'l1=6:12:1' или 'l2a@0,2=0.01:0.05:0.01' — поле, уровни, значения."""
+    field, _, values = text.partition("=")
+    key, _, levels = field.strip().partition("@")
+    levels = [int(level) for level in levels.split(",")] if levels else None
+    return Axis(key.strip().lower(), parse_values(values), levels)
+
+
+class Sweep:
+    def __init__(self, layout, axes, base):
+        self.layout = layout
+        self.axes = list(axes)
+        self.base = np.asarray(base, dtype=np.float32)
+        compiled = layouts[layout]
+        if self.base.shape != (compiled.n_levels, compiled.n_params):
+            raise ValueError(f"базовые уровни: ожидалась форма ({compiled.n_levels}, {compiled.n_params})")
+        keys = layout_keys[layout]
+        self._columns = []
+        for axis in self.axes:
+            if axis.key not in keys:
+                raise ValueError(f"в раскладке {layout} нет поля {axis.key!r}")
+            levels = list(range(compiled.n_levels)) if axis.levels is None else list(axis.levels)
+            if not all(0 <= level < compiled.n_levels for level in levels):
+                raise ValueError(f"ось {axis.label}: уровни вне диапазона 0..{compiled.n_levels - 1}")
+            self._columns.append((levels, keys.index(axis.key)))
+        self.shape = tuple(len(axis.values) for axis in self.axes)
+        self.count = prod(self.shape)
+
+    @property
+    def blob_size(self):
+        return layouts[self.layout].size
+
+    def chunks(self, size=CHUNK):
+        for start in range(0, self.count, size):
+            yield start, min(start + size, self.count)
+
+    def params(self, start, stop):
+        """(n, n_axes): значения осей для вариантов start..stop-1."""
+        indices = np.unravel_index(np.arange(start, stop), self.shape)
+        return np.stack([axis.values[index] for axis, index in zip(self.axes, indices)], axis=1)
+
+    def values(self, start, stop):
+        """(n, n_levels, n_params) float32 для вариантов start..stop-1."""
+        params = self.params(start, stop)
+        out = np.repeat(self.base[np.newaxis], stop - start, axis=0)
+        for (levels, column), axis_values in zip(self._columns, params.T):
+            out[:, levels, column] = axis_values[:, np.newaxis]
+        return out
+
+    def encode(self, start, stop):
+        return get_encoder(self.layout).encode(self.values(start, stop))
+
+    def describe(self):
+        return {
+            "layout": self.layout,
+            "count": self.count,
+            "blob_size": self.blob_size,
+            "axes": [{"field": axis.label, "values": axis.values.tolist()} for axis in self.axes],
+            "base": self.base.tolist(),
+        }
+
+
+# --- Пачки: кодирование и сериализация идут в процессах пула, главный процесс только пишет ---
+def _zip_part(sweep, start, stop):
+    manifest = io.StringIO()
+    writer = csv.writer(manifest, lineterminator="\n")
+    writer.writerow(["index"] + [axis.label for axis in sweep.axes])
+    for index, row in zip(range(start, stop), sweep.params(start, stop).tolist()):
+        writer.writerow([index] + [f"{value:.7g}" for value in row])
+    return sweep.encode(start, stop).tobytes(), manifest.getvalue().encode()
+
+
+def _ndjson_part(sweep, start, stop):
+    labels = [json.dumps(axis.label) for axis in sweep.axes]
+    lines = []
+    for index, row, blob in zip(range(start, stop), sweep.params(start, stop).tolist(), blobs_to_hex(sweep.encode(start, stop))):
+        params = ", ".join(f"{label}: {value:.7g}" for label, value in zip(labels, row))
+        lines.append(f'{{"index": {index}, "params": {{{params}}}, "hex": "{blob}"}}\n')
+    return "".join(lines)
+
+
+def _run_part(task):
+    render, sweep, start, stop = task
+    return render(sweep, start, stop)
+
+
+def run_parts(sweep, render, chunk_size=CHUNK, jobs=1):
+    """render(sweep, start, stop) по пачкам, по порядку; не больше 2*jobs пачек в работе."""
+    tasks = ((render, sweep, start, stop) for start, stop in sweep.chunks(chunk_size))
+    if jobs <= 1:
+        for task in tasks:
+            yield _run_part(task)
+        return
+    with ProcessPoolExecutor(jobs) as pool:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.submit(_run_part, task))
+            if len(pending) >= 2 * jobs:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def write_zip(sweep, stream, chunk_size=CHUNK, jobs=1, compression=zipfile.ZIP_DEFLATED):
+    """Потоковая запись ZIP (stream может не поддерживать seek)."""
+    with zipfile.ZipFile(stream, "w", compression=compression) as zf:
+        zf.writestr("sweep.json", json.dumps({**sweep.describe(), "chunk_size": chunk_size}, ensure_ascii=False, indent=1))
+        for part, (blobs, manifest) in enumerate(run_parts(sweep, _zip_part, chunk_size, jobs)):
+            with zf.open(f"part-{part:05d}.bin", "w") as member:
+                member.write(blobs)
+            with zf.open(f"part-{part:05d}.csv", "w") as member:
+                member.write(manifest)
+
+
+def write_ndjson(sweep, stream, chunk_size=CHUNK, jobs=1):
+    """Строка на вариант: {"index", "params", "hex"}; stream — текстовый."""
+    for text in run_parts(sweep, _ndjson_part, chunk_size, jobs):
+        stream.write(text)
@@ -0,0 +1,173 @@
+import struct
+
+from .codec import Frame
+
+
+# --- Скомпилированная раскладка: неизменяемый шаблон + таблица смещений float ---
+class CompiledLayout:
+    """Шаблон блока, собранный один раз при импорте.
+
+    `offsets` — смещения всех float-параметров (уровень за уровнем) от начала блока.
+    Под шаблон генерируются свои `encode`/`decode` (исходник — `source`): все значения
+    и служебные байты развёрнуты в один вызов `struct.pack` на весь блок, разбор — сверка
+    служебных байтов одной маской по целому числу и один `unpack_from` только по float.
+    `_struct` описывает участок от первого до последнего float с байтами между ними
+    (`Ns`) и нужен `match` для определения раскладки.
+    """
+
+    __slots__ = ("frame", "template", "offsets", "n_levels", "n_params", "encode", "decode",
+                 "_code", "_consts", "_struct", "_start", "_gaps")
+
+    def __init__(self, frame, template, offsets=None, code=None, consts=None):
+        """offsets/code/consts — из готовой таблицы (`table()`), иначе считаются здесь."""
+        if isinstance(template, str):
+            template = bytes.fromhex(template)
+        self.frame = frame
+        self.template = bytes(template)
+        if offsets is None:
+            offsets = [o for level in frame.offsets(self.template) for o in level]
+        self.offsets = tuple(offsets)
+        self.n_params = frame.n_params
+        self.n_levels = len(self.offsets) // self.n_params
+
+        # --- Формат: f, служебные байты, f, ..., f ---
+        fmt = ["<f"]
+        gaps = []
+        for prev, offset in zip(self.offsets, self.offsets[1:]):
+            gap = self.template[prev + 4:offset]
+            if not gap:
+                raise ValueError("float-поля без тегов между ними")
+            fmt.append(f"{len(gap)}sf")
+            gaps.append(gap)
+        self._struct = struct.Struct("".join(fmt))
+        self._start = self.offsets[0]
+        self._gaps = tuple(gaps)
+
+        if code is None:
+            source, consts = _generate(self)
+            code = compile(source, f"<layout {self.size} bytes>", "exec")
+        self._code, self._consts = code, consts
+        namespace = _namespace(self, consts)
+        exec(code, namespace)
+        self.encode = namespace["encode"]
+        self.decode = namespace["decode"]
+
+    @classmethod
+    def from_table(cls, table):
+        prefix, bands, template, offsets, code, consts = table
+        return cls(Frame(prefix.hex(), bands), template, offsets, code, consts)
+
+    def table(self):
+        """Всё собранное — простыми типами для marshal: кэш раскладок (schema.load_layouts)."""
+        return (self.frame.prefix, self.frame.bands, self.template, self.offsets, self._code, self._consts)
+
+    @property
+    def source(self):
+        """Исходник сгенерированных encode/decode."""
+        return _generate(self)[0]
+
+    @property
+    def size(self):
+        return len(self.template)
+
+    def check(self, values_list):
+        """Та же проверка формы, что даёт encode, — с понятным сообщением."""
+        if len(values_list) != self.n_levels:
+            raise ValueError(f"ожидалось {self.n_levels} уровней, получено {len(values_list)}")
+        for values in values_list:
+            if len(values) != self.n_params:
+                raise ValueError(f"ожидалось {self.n_params} значений, получено {len(values)}")
+
+    def match(self, data):
+        """Доля служебных байтов шаблона, совпавших с данными (0, если данных не хватает)."""
+        if len(data) < self._start + self._struct.size:
+            return 0.0
+        got = self._struct.unpack_from(data, self._start)[1::2]
+        total = same = 0
+        for expected, actual in zip(self._gaps, got):
+            total += len(expected)
+            if expected == actual:
+                same += len(expected)
+            else:
+                same += sum(a == b for a, b in zip(expected, actual))
+        return same / total
+
+
+# --- Генерация encode/decode под конкретный шаблон ---
+def _generate(layout):
+    """-> (исходник encode и decode, константы: bytes, форматы struct и маски — для marshal)."""
+    template, offsets = layout.template, layout.offsets
+    n, p = layout.n_levels, layout.n_params
+    start, end = offsets[0], offsets[-1] + 4
+    names = [f"v{i}" for i in range(len(offsets))]
+    consts = {}
+
+    def const(value):
+        # одинаковые служебные участки (их в блоке десятки) — одна константа
+        for name, known in consts.items():
+            if known == value:
+                return name
+        name = f"_c{len(consts)}"
+        consts[name] = value
+        return name
+
+    # --- encode: весь блок — один pack, служебные байты идут константами "Ns" ---
+    fmt, args = ["<"], []
+    pos = 0
+    for name, offset in zip(names, offsets):
+        if offset > pos:
+            fmt.append(f"{offset - pos}s")
+            args.append(const(template[pos:offset]))
+        fmt.append("f")
+        args.append(name)
+        pos = offset + 4
+    if pos < len(template):
+        fmt.append(f"{len(template) - pos}s")
+        args.append(const(template[pos:]))
+    rows = " ".join("(" + ", ".join(names[level * p:(level + 1) * p]) + ",)," for level in range(n))
+
+    # --- decode: служебные байты — маска по целому числу, float — unpack_from с "Nx" ---
+    unpack, mask, skeleton = ["<"], bytearray(b"\xff" * (end - start)), bytearray(template[start:end])
+    pos = start
+    for offset in offsets:
+        if offset > pos:
+            unpack.append(f"{offset - pos}x")
+        unpack.append("f")
+        mask[offset - start:offset - start + 4] = skeleton[offset - start:offset - start + 4] = bytes(4)
+        pos = offset + 4
+    levels = ", ".join("[" + ", ".join(f"f[{i}]" for i in range(level * p, (level + 1) * p)) + "]"
+                       for level in range(n))
+
+    source = (
+        "def encode(values_list):\n"
+        "    try:\n"
+        f"        {rows} = values_list\n"
+        "    except ValueError:\n"
+        "        _layout.check(values_list)\n"
+        "        raise\n"
+        f"    return _pack({', '.join(args)})\n"
+        "\n"
+        "def decode(data):\n"
+        "    if isinstance(data, str):\n"
+        "        data = bytes.fromhex(data)\n"
+        f"    if len(data) >= {end} and int.from_bytes(data[{start}:{end}], 'little') & _mask == _skeleton:\n"
+        "        f = _unpack(data, " + str(start) + ")\n"
+        f"        return [{levels}]\n"
+        "    # --- Служебные байты не совпали с шаблоном: честный разбор по тегам ---\n"
+        f"    return _layout.frame.decode(data, {n})\n"
+    )
+    consts.update({
+        "_pack": "".join(fmt),
+        "_unpack": "".join(unpack),
+        "_mask": int.from_bytes(mask, "little"),
+        "_skeleton": int.from_bytes(skeleton, "little"),
+    })
+    return source, consts
+
+
+def _namespace(layout, consts):
+    namespace = dict(consts)
+    namespace["_pack"] = struct.Struct(consts["_pack"]).pack
+    namespace["_unpack"] = struct.Struct(consts["_unpack"]).unpack_from
+    namespace["_layout"] = layout
+    return namespace
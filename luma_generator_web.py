@@ -1,1216 +1,806 @@
+import functools
+import hashlib
+import io
+import json
+import os
+import time
+
 import streamlit as st
-import struct
-from copy import deepcopy
+from streamlit.errors import StreamlitAPIException
 import numpy as np
 
-# --- Вспомогательные функции ---
-def float_to_hex(f):
-    return struct.pack('<f', f).hex()
-
-def hex_to_float(h):
-    return struct.unpack('<f', bytes.fromhex(h))[0]
-
-
-# === SHARP LEVELS ===
-
-# --- Все строки из оригинального сообщения (Sharp) ---
-original_sharp_hex_lines = [
-    # Sharp very low
-    "0000e0401d8fc2753d",
-    "250000803f2d0000803f0a140d",
-    "cdcc44401d0ad7233d",
-    "250000803f2d0000803f0a140d",
-    "0000f03f1d68916d3d",
-    "250000803f2d0000803f12050d0000a03f0a490a140d",
-
-    # Sharp low
-    "9a9909411d8fc2753d",
-    "250000803f2d0000803f0a140d",
-    "f6286c401d0ad7233d",
-    "250000803f2d0000803f0a140d",
-    "000010401d68916d3d",
-    "250000803f2d0000803f12050d000020400a490a140d",
-
-    # Sharp med
-    "000020411d8fc2753d",
-    "250000803f2d0000803f0a140d",
-    "333387401d0ad7233d",
-    "250000803f2d0000803f0a140d",
-    "000020401d68916d3d",
-    "250000803f2d0000803f12050d0000a0400a490a140d",
-
-    # Sharp high
-    "000020411d022b873d",
-    "250000803f2d0000803f0a140d",
-    "14ae77401d0ad7233d",
-    "250000803f2d0000803f0a140d",
-    "0ad793401d3480b73c",
-    "250000803f2d0000803f12050d000020410a490a140d",
-
-    # Sharp very high
-    "cdcc34411dea95323d",
-    "250000803f2d0000803f0a140d",
-    "cdcc6c401d6f12033d",
-    "250000803f2d0000803f0a140d",
-    "333303401ded0dbe3c",
-    "250000803f2d0000803f12050d0000a0410a490a140d",
-
-    # Sharp bento low
-    "000080411d77be9f3c",
-    "250000803f2d0000803f0a140d",
-    "666646401dc1caa13c",
-    "250000803f2d0000803f0a140d",
-    "85ebf13f1d0ad7a33c",
-    "250000803f2d0000803f12050d000020420a490a140d",
-
-    # Sharp bento high
-    "000094411d728a8e3c",
-    "250000803f2d0000803f0a140d",
-    "cdcc2c401dbe30993c",
-    "250000803f2d0000803f0a140d",
-    "9a99d93f1d0ad7a33c",
-    "250000803f2d0000803f12050d0000a042000000"
-]
-
-# --- Индексы для Sharp Levels ---
-sharp_slices = {
-    "Sharp very low": (0, 6),
-    "Sharp low": (6, 12),
-    "Sharp med": (12, 18),
-    "Sharp high": (18, 24),
-    "Sharp very high": (24, 30)
+from luma_gen.cache import LRUCache, encode_cached
+from luma_gen.layouts import layout_keys, layout_schemas, layouts, parse_levels_hex
+from luma_gen.detect import decode_any
+from luma_gen.store import layout_levels, new_store, set_levels, to_levels
+from luma_gen.preview import SharpPreview, compose_grid, load_proxy, load_rgb, test_chart, to_uint8
+from luma_gen.mtf import compose, freqs, mtf, mtf_background, mtf_curve, mtf_layers, mtf_legend
+from luma_gen.fit import SharpCurveModel, fit, fitted_blob, parse_curve
+from luma_gen.denoise import BayerPreview, ChromaPreview, load_mosaic, mosaic_rgb, synthetic_mosaic, synthetic_rgb
+from luma_gen.scanner import families, scan_blocks, to_binary
+from luma_gen.diff import diff, diff_library
+from luma_gen.archive import PresetArchive, parse_condition
+from luma_gen.nearest import NearestIndex
+from luma_gen.live import LiveBlob
+from luma_gen.history import History
+from luma_gen.sweep import Sweep, parse_axis, write_ndjson, write_zip
+
+# --- Параметры каждой раскладки — один массив float32 в session_state ---
+def param_store(layout):
+    stores = st.session_state.setdefault("params", {})
+    if layout not in stores:
+        stores[layout] = new_store(layout)
+        st.session_state.setdefault("history", {})[layout] = History(stores[layout])
+    return stores[layout]
+
+# --- История правок раскладки: версии делят неизменённые уровни друг с другом ---
+def layout_history(layout):
+    param_store(layout)
+    return st.session_state["history"][layout]
+
+# --- Записать уровни (из парсера, дампа) в параметры раскладки — отдельной версией в истории ---
+def store_levels(layout, levels, label="вставка HEX"):
+    history = layout_history(layout)
+    set_levels(param_store(layout), levels)
+    history.record(param_store(layout), label)
+
+# --- Кэш блоков общий для всех сессий: одни и те же пресеты генерируются весь день ---
+@st.cache_resource
+def blob_cache():
+    return LRUCache(maxsize=4096, ttl=3600)
+
+# --- Последний блок раскладки в сессии: правка поля переписывает 4 байта, HEX строится при показе ---
+def live_blob(layout, store):
+    blobs = st.session_state.setdefault("live_blobs", {})
+    if layout not in blobs:
+        blobs[layout] = LiveBlob(layout, encode_cached(layout, to_levels(store), blob_cache()), layout_tabs[layout]["prefix"])
+    else:
+        blobs[layout].sync(store)
+    return blobs[layout]
+
+def generate_cached(layout, store):
+    return live_blob(layout, store).hex()
+
+# --- Вывод блока: короткое превью на странице, файл целиком — кнопкой скачивания ---
+PREVIEW_CHARS = 192
+output_formats = {
+    "HEX": ("hex", "text/plain"),
+    "Base64": ("b64", "text/plain"),
+    "Бинарный": ("bin", "application/octet-stream"),
+    "Заголовок C": ("h", "text/x-c"),
 }
 
-sharp_bento_slices = {
-    "Sharp bento low": (30, 36),
-    "Sharp bento high": (36, 42)
+def output_data(blob, fmt):
+    if fmt == "HEX":
+        return blob.hex()
+    if fmt == "Base64":
+        return blob.base64()
+    if fmt == "Заголовок C":
+        return blob.c_header()
+    return blob.bytes()
+
+def output_panel(layout, params):
+    # Панель появляется после «Сгенерировать» и дальше обновляется при каждой правке
+    if not st.session_state.get(f"{layout}_output"):
+        return
+    started = time.perf_counter()
+    blob = live_blob(layout, params)
+    text = blob.hex()
+    st.code(text if len(text) <= PREVIEW_CHARS else text[:PREVIEW_CHARS] + "…", language="text")
+    cols = st.columns([3, 2])
+    fmt = cols[0].radio("Формат файла:", list(output_formats), horizontal=True, key=f"{layout}_output_format")
+    # Готовится только выбранный формат; HEX и Base64 кэшируются в блоке до следующей правки
+    ext, mime = output_formats[fmt]
+    cols[1].download_button(f"💾 Скачать .{ext}", output_data(blob, fmt), file_name=f"{layout}.{ext}", mime=mime,
+                            on_click="ignore", key=f"{layout}_download", use_container_width=True)
+    elapsed = (time.perf_counter() - started) * 1e6
+    changed = blob.last_changed
+    names = ", ".join(changed[:4]) + (f" и ещё {len(changed) - 4}" if len(changed) > 4 else "")
+    st.caption(f"{len(blob.buf)} байт · последняя правка: {names or '—'} (переписано {4 * len(changed)} байт) · "
+               f"⏱ {elapsed:.0f} мкс")
+
+@st.cache_data(max_entries=2, show_spinner="Поиск блоков в дампе...")
+def scan_dump(file_id, _data):
+    blocks = []
+    for family, offset, hits in scan_blocks(to_binary(_data)):
+        blocks.append({"family": family, "offset": offset, "levels": [hit.values for hit in hits]})
+    return blocks
+
+# --- Превью резкости: прокси и полосы деталей считаются один раз на изображение ---
+@st.cache_resource(max_entries=4, show_spinner="Подготовка превью...")
+def sharp_preview(file_id, _data):
+    return SharpPreview(test_chart() if _data is None else load_proxy(_data))
+
+def sharp_preview_panel(layout, params):
+    if not st.toggle("👁 Превью резкости", key=f"{layout}_preview"):
+        return
+    names = [level["name"] for level in layout_levels[layout]]
+    image = st.session_state.get("preview_image")
+    preview = sharp_preview(image.file_id, image.getvalue()) if image is not None else sharp_preview(None, None)
+    if st.radio("Режим превью:", ["Один уровень", "Все уровни"], horizontal=True, key=f"{layout}_preview_mode") == "Все уровни":
+        started = time.perf_counter()
+        frames = preview.render_levels(params.tolist())
+        elapsed = (time.perf_counter() - started) * 1000
+        grid = compose_grid([to_uint8(preview.luma)] + [to_uint8(frame) for frame in frames], ["Исходник (прокси)"] + names)
+        st.image(grid, use_container_width=True)
+        timing = f"⏱ Все уровни одним проходом: {elapsed:.1f} мс"
+        if st.checkbox("Сравнить с циклом по уровням", key=f"{layout}_preview_loop"):
+            started = time.perf_counter()
+            for values in params.tolist():
+                preview.render_level(values)
+            timing += f" · цикл по уровням: {(time.perf_counter() - started) * 1000:.1f} мс"
+        st.caption(timing)
+        return
+
+    idx = st.selectbox("Уровень для превью:", range(len(names)), format_func=names.__getitem__, key=f"{layout}_preview_level")
+    started = time.perf_counter()
+    sharpened = preview.render_level(params[idx].tolist())
+    elapsed = (time.perf_counter() - started) * 1000
+
+    cols = st.columns(2)
+    cols[0].image(to_uint8(preview.luma), caption="Исходник (прокси)", use_container_width=True)
+    cols[1].image(to_uint8(sharpened), caption=f"{names[idx]} — расчёт {elapsed:.1f} мс", use_container_width=True)
+
+# --- АЧХ уровней Sharp: фон, каждая кривая и легенда кэшируются отдельно
+# (cache_resource: слои только читаются, копировать мегабайтные массивы на каждый перезапуск незачем) ---
+@st.cache_resource(max_entries=16, show_spinner=False)
+def mtf_background_cached(amplitude, ylim):
+    return mtf_background(amplitude, ylim)
+
+@st.cache_resource(max_entries=256, show_spinner=False)
+def mtf_curve_cached(level, amplitude, style, color, ylim):
+    return mtf_curve(level, amplitude, style, color, ylim)
+
+@st.cache_resource(max_entries=16, show_spinner=False)
+def mtf_legend_cached(entries, ylim):
+    return mtf_legend(entries, ylim)
+
+def mtf_image(series, amplitude):
+    # правка одного уровня перерисовывает только его кривую, остальные слои — из кэша
+    ylim, curves, entries = mtf_layers(series, amplitude)
+    layers = [mtf_curve_cached(level, amplitude, style, color, ylim) for level, style, color in curves]
+    return compose(mtf_background_cached(amplitude, ylim), layers + [mtf_legend_cached(tuple(entries), ylim)])
+
+def sharp_mtf_panel(layout, params):
+    if not st.toggle("📈 АЧХ уровней", key=f"{layout}_mtf"):
+        return
+    cols = st.columns(2)
+    amplitude = cols[0].slider("Контраст деталей:", 0.01, 0.5, 0.1, 0.01, key=f"{layout}_mtf_amplitude")
+    others = [name for name in sharp_short_titles if name != layout]
+    compare = cols[1].multiselect("Сравнить с раскладками:", others, format_func=sharp_short_titles.get, key=f"{layout}_mtf_compare")
+
+    series = []
+    for style, name in zip(["-", "--", ":", "-.", (0, (5, 1, 1, 1))], [layout] + compare):
+        store = params if name == layout else param_store(name)
+        labels = tuple(f"{sharp_short_titles[name]} · {level['name']}" for level in layout_levels[name])
+        series.append((labels, style, tuple(store.tolist())))
+    started = time.perf_counter()
+    image = mtf_image(series, amplitude)
+    st.image(image, use_container_width=True)
+    st.caption(f"⏱ АЧХ: {(time.perf_counter() - started) * 1000:.1f} мс")
+
+# --- Подбор уровня Sharp под целевую АЧХ ---
+def sharp_fit_panel(layout, params):
+    if not st.toggle("🎯 Подбор под целевую АЧХ", key=f"{layout}_fit"):
+        return
+    names = [level["name"] for level in layout_levels[layout]]
+    cols = st.columns(3)
+    idx = cols[0].selectbox("Подобрать уровень:", range(len(names)), format_func=names.__getitem__, key=f"{layout}_fit_level")
+    amplitude = cols[1].number_input("Контраст деталей:", 0.01, 0.5, 0.1, 0.01, key=f"{layout}_fit_amplitude")
+    source = cols[2].radio("Цель:", ["Уровень другой раскладки", "CSV частота,усиление"], key=f"{layout}_fit_source")
+
+    if source == "CSV частота,усиление":
+        curve = st.file_uploader("Кривая АЧХ (CSV):", type=["csv", "txt"], key=f"{layout}_fit_csv")
+        if curve is None:
+            return
+        try:
+            f, target = parse_curve(curve.getvalue().decode("utf-8", "replace").splitlines())
+        except ValueError as e:
+            st.warning(f"❌ {e}")
+            return
+    else:
+        cols = st.columns(2)
+        other = cols[0].selectbox("Раскладка:", list(sharp_short_titles), format_func=sharp_short_titles.get, key=f"{layout}_fit_other")
+        other_names = [level["name"] for level in layout_levels[other]]
+        other_idx = cols[1].selectbox("Уровень:", range(len(other_names)), format_func=other_names.__getitem__, key=f"{layout}_fit_other_level")
+        f, target = freqs, mtf([param_store(other)[other_idx].tolist()], amplitude)[0]
+
+    if st.button("🎯 Подобрать", key=f"{layout}_fit_run"):
+        with st.spinner("Подбор параметров..."):
+            started = time.perf_counter()
+            # кривая считается за микросекунды: пул процессов только добавит накладные расходы
+            # (и форкнул бы многопоточный сервер Streamlit) — пул остаётся для CLI и дорогих моделей
+            result = fit(SharpCurveModel(target, f, amplitude), params[idx].tolist(), layout, jobs=1)
+            elapsed = time.perf_counter() - started
+        params[idx] = tuple(result.x)
+        layout_history(layout).record(params, f"🎯 подбор, ур. {idx + 1}")
+        st.session_state[f"{layout}_fit_result"] = (
+            f"Невязка {result.initial_cost:.4g} → {result.cost:.4g}, кандидатов {result.evaluations}, {elapsed:.1f} с",
+            fitted_blob(layout, params.tolist(), idx, result.x).hex(),
+        )
+        rerun_panel()
+
+    if f"{layout}_fit_result" in st.session_state:
+        summary, blob = st.session_state.pop(f"{layout}_fit_result")
+        st.success(f"✅ Поля уровня обновлены. {summary}")
+        st.code(blob, language="text")
+
+# --- Превью Luma Denoise: мозаика, её яркость и оценка шума кэшируются на источник ---
+synthetic_sizes = {"1536×1024": (1024, 1536), "4000×3000 (12 МП)": (3000, 4000)}
+
+@st.cache_resource(max_entries=2, show_spinner="Подготовка мозаики...")
+def bayer_preview(source, _data=None):
+    mosaic = load_mosaic(_data) if _data is not None else synthetic_mosaic(*source[1:])
+    return BayerPreview(mosaic)
+
+def crop_center(mosaic, size=512):
+    height, width = mosaic.shape
+    y, x = max(0, (height - size) // 2) & ~1, max(0, (width - size) // 2) & ~1
+    return mosaic[y:y + size, x:x + size]
+
+def tile_timing(timings, tile, workers, elapsed):
+    tile_ms = [ms for *_, ms in timings]
+    return (f"⏱ {len(timings)} плиток по {tile} px, потоков {workers}: всего {elapsed:.0f} мс, "
+            f"плитка в среднем {sum(tile_ms) / len(tile_ms):.0f} мс, максимум {max(tile_ms):.0f} мс")
+
+def bayer_preview_panel(layout, params):
+    if not st.toggle("👁 Превью шумоподавления", key="bayer_preview"):
+        return
+    names = [level["name"] for level in layout_levels[layout]]
+    cols = st.columns(2)
+    tile = cols[0].select_slider("Плитка, px:", [128, 256, 384, 512, 1024], value=384, key="bayer_preview_tile")
+    workers = cols[1].number_input("Потоков:", min_value=1, max_value=64, value=os.cpu_count() or 1, key="bayer_preview_workers")
+
+    mosaic_file = st.file_uploader("RGGB-мозаика (16-битный PNG):", type=["png", "tif", "tiff"], key="bayer_mosaic")
+    if mosaic_file is not None:
+        preview = bayer_preview(mosaic_file.file_id, mosaic_file.getvalue())
+    else:
+        cols = st.columns(2)
+        size = cols[0].selectbox("Синтетический кадр:", list(synthetic_sizes), key="bayer_synthetic_size")
+        noise = cols[1].slider("Шум:", 0.0, 0.1, 0.02, 0.005, key="bayer_synthetic_noise")
+        preview = bayer_preview(("synthetic", *synthetic_sizes[size], noise))
+
+    if st.radio("Режим превью:", ["Один уровень", "Все уровни"], horizontal=True, key="bayer_preview_mode") == "Все уровни":
+        started = time.perf_counter()
+        lumas, timings = preview.render_luma(params.tolist(), tile, workers)
+        elapsed = (time.perf_counter() - started) * 1000
+        step = max(1, preview.luma.shape[1] // 384)
+        grid = compose_grid([preview.preview_rgb(step=step)] + [preview.preview_rgb(luma, step) for luma in lumas],
+                            ["Исходная мозаика"] + names)
+        st.image(grid, use_container_width=True)
+        timing = tile_timing(timings, tile, workers, elapsed) + " (все уровни одним проходом)"
+        if st.checkbox("Сравнить с циклом по уровням", key="bayer_preview_loop"):
+            started = time.perf_counter()
+            for values in params.tolist():
+                preview.render_luma([values], tile, workers)
+            timing += f" · цикл по уровням: {(time.perf_counter() - started) * 1000:.0f} мс"
+        st.caption(timing)
+        return
+
+    idx = st.selectbox("Уровень для превью:", range(len(names)), format_func=names.__getitem__, key="bayer_preview_level")
+    started = time.perf_counter()
+    mosaic, timings = preview.render(params[idx].tolist(), tile, workers)
+    elapsed = (time.perf_counter() - started) * 1000
+
+    step = max(1, preview.luma.shape[1] // 768)
+    cols = st.columns(2)
+    cols[0].image(mosaic_rgb(preview.mosaic, step), caption="Исходная мозаика", use_container_width=True)
+    cols[1].image(mosaic_rgb(mosaic, step), caption=names[idx], use_container_width=True)
+    cols[0].image(mosaic_rgb(crop_center(preview.mosaic)), caption="Фрагмент 1:1", use_container_width=True)
+    cols[1].image(mosaic_rgb(crop_center(mosaic)), caption="Фрагмент 1:1", use_container_width=True)
+
+    st.caption(tile_timing(timings, tile, workers, elapsed))
+    with st.expander("Тайминги плиток", expanded=False):
+        st.dataframe([{"y": y, "x": x, "Размер": f"{w}×{h}", "мс": round(ms, 1)} for y, x, h, w, ms in timings],
+                     use_container_width=True)
+
+# --- Превью Chroma Denoise: YCbCr и пирамида кэшируются по хэшу изображения ---
+@st.cache_resource(max_entries=4, show_spinner="Подготовка пирамиды...")
+def chroma_preview(source, _data=None):
+    return ChromaPreview(load_rgb(_data, 768) if _data is not None else synthetic_rgb(noise=source[1]))
+
+def chroma_preview_panel(layout, params):
+    if not st.toggle("👁 Превью Chroma Denoise", key="chroma_preview"):
+        return
+    names = [level["name"] for level in layout_levels[layout]]
+    idx = st.selectbox("Уровень для превью:", range(len(names)), format_func=names.__getitem__, key="chroma_preview_level")
+    image = st.file_uploader("Изображение:", type=["png", "jpg", "jpeg", "tif", "tiff", "bmp"], key="chroma_image")
+    if image is not None:
+        data = image.getvalue()
+        preview = chroma_preview(hashlib.blake2b(data, digest_size=16).hexdigest(), data)
+    else:
+        noise = st.slider("Цветной шум синтетического кадра:", 0.0, 0.15, 0.04, 0.01, key="chroma_synthetic_noise")
+        preview = chroma_preview(("synthetic", noise))
+
+    started = time.perf_counter()
+    rgb, recomputed = preview.render(params[idx].tolist())
+    elapsed = (time.perf_counter() - started) * 1000
+
+    cols = st.columns(2)
+    cols[0].image(preview.original(), caption="Исходник", use_container_width=True)
+    cols[1].image(rgb, caption=names[idx], use_container_width=True)
+    scales = ", ".join(f"L{scale + 1}" for scale in recomputed) or "нет, всё из кэша"
+    st.caption(f"⏱ Расчёт превью: {elapsed:.1f} мс · пересчитаны масштабы: {scales}")
+
+# --- Вкладка как фрагмент: правка поля перезапускает только её, а не все семь ---
+def timed_fragment(func):
+    @functools.wraps(func)
+    def run(*args):
+        started = time.perf_counter()
+        func(*args)
+        elapsed = (time.perf_counter() - started) * 1000
+        full = st.session_state.get("full_rerun_ms")
+        st.caption(f"⏱ Перезапуск вкладки: {elapsed:.1f} мс"
+                   + (f" · полный перезапуск страницы: {full:.1f} мс" if full is not None else ""))
+    return st.fragment(run)
+
+def rerun_panel():
+    # Кнопка внутри фрагмента перезапускает только его; при полном прогоне страницы — всю страницу
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()
+
+# --- Отмена/возврат и ползунок по версиям: колбэки срабатывают до перезапуска вкладки,
+# поля ввода получают значения версии через value (см. param_store) ---
+def history_step(layout, step):
+    history = layout_history(layout)
+    history.goto(param_store(layout), history.position + step)
+
+def history_jump(layout):
+    layout_history(layout).goto(param_store(layout), st.session_state[f"{layout}_history_pos"] - 1)
+
+def history_panel(layout, params):
+    history = layout_history(layout)
+    history.record(params)   # правки полей за этот перезапуск; без изменений — ничего
+    with st.expander("🕘 История правок", expanded=False):
+        cols = st.columns([1, 1, 3])
+        cols[0].button("↶ Отменить", key=f"{layout}_undo", disabled=not history.can_undo,
+                       on_click=history_step, args=(layout, -1), use_container_width=True)
+        cols[1].button("↷ Вернуть", key=f"{layout}_redo", disabled=not history.can_redo,
+                       on_click=history_step, args=(layout, 1), use_container_width=True)
+        cols[2].caption(f"Версия {history.position + 1} из {len(history)}: {history.labels[history.position]} · "
+                        f"память истории {history.nbytes() / 1024:.1f} КБ")
+        if len(history) > 1:
+            st.slider("Перейти к версии:", 1, len(history), history.position + 1, key=f"{layout}_history_pos",
+                      on_change=history_jump, args=(layout,))
+
+# --- Вкладки раскладок: подписи, префикс ключей полей ввода (bayer_l3b_2 — поле l3b уровня 2),
+# формат полей и панели под ними. Раскладка без своей записи получает вкладку с подписями по имени ---
+def layout_tab(layout, **tab):
+    name = tab.get("name", layout)
+    return {
+        "title": layout,
+        "heading": f"### {name}",
+        "generate": f"🚀 Сгенерировать HEX ({name})",
+        "parser": f"Парсер {name}",
+        "hint": f"Вставь HEX-строку с уровнями {name}",
+        "name": name,
+        "parser_key": f"{layout}_parser_input",
+        "prefix": layout,
+        "format": "%.6f",
+        "columns": 3,
+        "panels": (),
+    } | tab
+
+def main_sharp_tab(layout, code, suffix, prefix, parser_key, short):
+    return layout_tab(
+        layout,
+        title=f"🔍 Sharp Main {short}",
+        heading=f"### 🔧 Редактирование основных Sharp уровней: {code}",
+        generate=f"🚀 Сгенерировать основной Sharp HEX{suffix}",
+        parser="🔸Парсер Sharp Main Levels",
+        hint="Вставь HEX-строку с уровнями Sharp",
+        name=f"Main Sharp{suffix}",
+        parser_key=parser_key,
+        prefix=prefix,
+        short=short,
+        format="%.4f",
+        panels=(sharp_preview_panel, sharp_mtf_panel, sharp_fit_panel),
+    )
+
+layout_tabs = {
+    "sharp_id15": main_sharp_tab("sharp_id15", "10A8B45", "", "sharp", "main_parser_input", "ID15"),
+    "sharp_id14": main_sharp_tab("sharp_id14", "10A8315", " ID14", "2sharp", "main_parser_input2", "ID14"),
+    "sharp_id16": main_sharp_tab("sharp_id16", "10A8D55", " ID16", "3sharp", "main_parser_input3", "ID16"),
+    "sharp_bento": layout_tab(
+        "sharp_bento",
+        title="🍱 Sharp Bento",
+        heading="### 🍱 Редактирование Bento Sharp уровней",
+        generate="🚀 Сгенерировать Bento Sharp HEX",
+        parser="Парсер Sharp Bento Low & High",
+        hint="Вставь HEX-строку с уровнями Sharp Bento (без заголовка):",
+        name="Sharp Bento",
+        parser_key="bento_parser_input",
+        prefix="bento",
+        short="Bento",
+        format="%.4f",
+        panels=(sharp_preview_panel, sharp_mtf_panel, sharp_fit_panel),
+    ),
+    "sharp_id12": main_sharp_tab("sharp_id12", "10A8315", " ID12", "4sharp", "main_parser_input4", "ID12"),
+    "bayer": layout_tab(
+        "bayer",
+        title="🌪️ Luma Denoise",
+        heading="### 🌪️ Настройка параметров Luma Denoise, id 14 - 10a42a5, id 15 - 10a4a95, id 16 - 10a4c85",
+        generate="🚀 Сгенерировать HEX (Bayer Denoise)",
+        parser="Парсер для Bayer Denoise",
+        hint="### 🔁 Расшифровать HEX обратно (Bayer Denoise)",
+        name="Bayer Denoise",
+        parser_key="bayer_parser_input_inside_3",
+        panels=(bayer_preview_panel,),
+    ),
+    "chroma": layout_tab(
+        "chroma",
+        title="Chroma Denoise",
+        heading="### 🎨 Chroma Denoise: 010A3C2C",
+        parser="🔸 Chroma Denoise (все уровни)",
+        hint="Вставь HEX-строку с уровнями `Chroma Denoise`, сгенерированную программой.\n\n"
+             "Структура: `заголовок` + `low`, `med`, `high`, `very high`",
+        name="Chroma Denoise",
+        parser_key="chroma_parser_input_inside",
+        columns=2,
+        panels=(chroma_preview_panel,),
+    ),
 }
+layout_tabs |= {name: layout_tab(name) for name in layouts if name not in layout_tabs}
 
-# --- Sharp уровни по умолчанию ---
-all_sharp_levels = [
-    {"name": "Sharp very low",  "default": [7.0, 0.060, 3.075, 0.040, 1.875, 0.058]},
-    {"name": "Sharp low",       "default": [8.6, 0.060, 3.69, 0.040, 2.25, 0.058]},
-    {"name": "Sharp med",       "default": [10.0, 0.060, 4.225, 0.040, 2.5, 0.058]},
-    {"name": "Sharp high",      "default": [10.0, 0.066, 3.87, 0.040, 4.62, 0.0224]},
-    {"name": "Sharp very high", "default": [11.3, 0.0436, 3.70, 0.032, 2.05, 0.0232]},
-    {"name": "Sharp bento low", "default": [16.0, 0.0195, 3.10, 0.01975, 1.89, 0.02]},
-    {"name": "Sharp bento high","default": [18.5, 0.0174, 2.70, 0.0187, 1.70, 0.02]}
-]
-
-main_sharp_levels = all_sharp_levels[:5]
-bento_sharp_levels = all_sharp_levels[5:]
-
-# === SHARP LEVELS ID14 ===
-
-# --- Все строки из оригинального сообщения (Sharp) ---
-original_sharp_hex_lines2 = [
-    # Sharp very low
-    "000080401dc9763e3e",
-    "250000803f2d0000803f0a140d",
-    "0000803f1de3a51b3e",
-    "250000803f2d0000803f0a140d",
-    "3333f33f1d68916d3d",
-    "250000803f2d0000803f12050d0000a0400a490a140d",
-
-    # Sharp low
-    "9a9909411d8fc2753d",
-    "250000803f2d0000803f0a140d",
-    "f6286c401d0ad7233d",
-    "250000803f2d0000803f0a140d",
-    "000010401d68916d3d",
-    "250000803f2d0000803f12050d000020410a490a140d",
-
-    # Sharp med
-    "000020411d8fc2753d",
-    "250000803f2d0000803f0a140d",
-    "333387401d0ad7233d",
-    "250000803f2d0000803f0a140d",
-    "000020401d68916d3d",
-    "250000803f2d0000803f12050d0000a0410a490a140d",
-
-    # Sharp high
-    "000020411d022b873d",
-    "250000803f2d0000803f0a140d",
-    "14ae77401d0ad7233d",
-    "250000803f2d0000803f0a140d",
-    "0ad793401d3480b73c",
-    "250000803f2d0000803f12050d000020420a490a140d",
-
-    # Sharp very high
-    "cdcc34411dea95323d",
-    "250000803f2d0000803f0a140d",
-    "cdcc6c401d6f12033d",
-    "250000803f2d0000803f0a140d",
-    "333303401ded0dbe3c",
-    "250000803f2d0000803f12050d0000a0420000000000"
-]
-
-
-# --- Sharp уровни по умолчанию ---
-all_sharp_levels2 = [
-    {"name": "Sharp very low",  "default": [4.0, 0.186, 1.0, 0.1520, 1.9, 0.058]},
-    {"name": "Sharp low",       "default": [5.2, 0.066, 2.24, 0.1, 2.17, 0.011]},
-    {"name": "Sharp med",       "default": [6.55, 0.034, 2.19, 0.2, 1.31, 0.13]},
-    {"name": "Sharp high",      "default": [6.38, 0.016, 2.59, 0.018, 1.13, 0.02]},
-    {"name": "Sharp very high", "default": [5.56, 0.016, 2.37, 0.018, 2.25, 0.02]},
-]
-# === SHARP LEVELS ID16 ===
-
-# --- Все строки из оригинального сообщения (Sharp) ---
-original_sharp_hex_lines3 = [
-    # Sharp very low
-    "000080401dc9763e3e",
-    "250000803f2d0000803f35c3f5a83e0a190d",
-    "0000803f1de3a51b3e",
-    "250000803f2d0000803f35c3f5a83e0a190d",
-    "3333f33f1d68916d3d",
-    "250000803f2d0000803f35c3f5a83e12050d0000a0400a580a190d",
-
-    # Sharp low
-    "9a9909411d8fc2753d",
-    "250000803f2d0000803f35c3f5a83e0a190d",
-    "f6286c401d0ad7233d",
-    "250000803f2d0000803f35c3f5a83e0a190d",
-    "000010401d68916d3d",
-    "250000803f2d0000803f35c3f5a83e12050d000020410a580a190d",
-
-    # Sharp med
-    "000020411d8fc2753d",
-    "250000803f2d0000803f35c3f5a83e0a190d",
-    "333387401d0ad7233d",
-    "250000803f2d0000803f35c3f5a83e0a190d",
-    "000020401d68916d3d",
-    "250000803f2d0000803f35c3f5a83e12050d0000a0410a580a190d",
-
-    # Sharp high
-    "000020411d022b873d",
-    "250000803f2d0000803f35c3f5a83e0a190d",
-    "14ae77401d0ad7233d",
-    "250000803f2d0000803f35c3f5a83e0a190d",
-    "0ad793401d3480b73c",
-    "250000803f2d0000803f35c3f5a83e12050d000020420a580a190d",
-
-    # Sharp very high
-    "cdcc34411dea95323d",
-    "250000803f2d0000803f35c3f5a83e0a190d",
-    "cdcc6c401d6f12033d",
-    "250000803f2d0000803f35c3f5a83e0a190d",
-    "333303401ded0dbe3c",
-    "250000803f2d0000803f35c3f5a83e12050d0000a042"
-]
-
-
-# --- Sharp уровни по умолчанию ---
-all_sharp_levels3 = [
-    {"name": "Sharp very low",  "default": [4.0, 0.186, 1.0, 0.1520, 1.9, 0.058]},
-    {"name": "Sharp low",       "default": [5.2, 0.066, 2.24, 0.1, 2.17, 0.011]},
-    {"name": "Sharp med",       "default": [6.55, 0.034, 2.19, 0.2, 1.31, 0.13]},
-    {"name": "Sharp high",      "default": [6.38, 0.016, 2.59, 0.018, 1.13, 0.02]},
-    {"name": "Sharp very high", "default": [5.56, 0.016, 2.37, 0.018, 2.25, 0.02]},
-]
-# === SHARP LEVELS ID12 ===
-
-# --- Все строки из оригинального сообщения (Sharp) ---
-original_sharp_hex_lines4 = [
-    # Sharp very low
-    "000080401dc9763e3e",
-    "258fc2f53c2d0000003f0a140d",
-    "0000803f1de3a51b3e",
-    "258fc2f53c2d0000003f0a140d",
-    "3333f33f1d68916d3d",
-    "258fc2f53c2d0000003f12050d0000a0400a490a140d",
-
-    # Sharp low
-    "9a9909411d8fc2753d",
-    "258fc2f53c2d0000003f0a140d",
-    "f6286c401d0ad7233d",
-    "258fc2f53c2d0000003f0a140d",
-    "000010401d68916d3d",
-    "258fc2f53c2d0000003f12050d000020410a490a140d",
-
-    # Sharp med
-    "000020411d8fc2753d",
-    "258fc2f53c2d0000003f0a140d",
-    "333387401d0ad7233d",
-    "258fc2f53c2d0000003f0a140d",
-    "000020401d68916d3d",
-    "258fc2f53c2d0000003f12050d0000a0410a490a140d",
-
-    # Sharp high
-    "000020411d022b873d",
-    "258fc2f53c2d0000003f0a140d",
-    "14ae77401d0ad7233d",
-    "258fc2f53c2d0000003f0a140d",
-    "0ad793401d3480b73c",
-    "258fc2f53c2d0000003f12050d000020420a490a140d",
-
-    # Sharp very high
-    "cdcc34411dea95323d",
-    "258fc2f53c2d0000003f0a140d",
-    "cdcc6c401d6f12033d",
-    "258fc2f53c2d0000003f0a140d",
-    "333303401ded0dbe3c",
-    "258fc2f53c2d0000003f12050d0000a042"
-]
-
-
-# --- Sharp уровни по умолчанию ---
-all_sharp_levels4 = [
-    {"name": "Sharp very low",  "default": [4.0, 0.186, 1.0, 0.1520, 1.9, 0.058]},
-    {"name": "Sharp low",       "default": [5.2, 0.066, 2.24, 0.1, 2.17, 0.011]},
-    {"name": "Sharp med",       "default": [6.55, 0.034, 2.19, 0.2, 1.31, 0.13]},
-    {"name": "Sharp high",      "default": [6.38, 0.016, 2.59, 0.018, 1.13, 0.02]},
-    {"name": "Sharp very high", "default": [5.56, 0.016, 2.37, 0.018, 2.25, 0.02]},
-]
-# --- Генерация HEX для Sharp Levels ---
-def generate_sharp_hex(values_list, level_names, level_slices):
-    lines = []
-
-    for i, values in enumerate(values_list):
-        l1, l1a, l2, l2a, l3, l3a = values
-        name = level_names[i]["name"]
-        start, end = level_slices[name]
-
-        modified_block = deepcopy(original_sharp_hex_lines[start:end])
-        modified_block[0] = f"{float_to_hex(l1)}1d{float_to_hex(l1a)}"
-        modified_block[2] = f"{float_to_hex(l2)}1d{float_to_hex(l2a)}"
-        modified_block[4] = f"{float_to_hex(l3)}1d{float_to_hex(l3a)}"
-
-        lines.extend(modified_block)
-
-    full_hex = "".join(lines)
-    return full_hex
-    
-# --- Генерация HEX для Sharp Levels ---
-def generate_sharp_hex2(values_list, level_names, level_slices):
-    lines2 = []
-
-    for i, values in enumerate(values_list):
-        l1, l1a, l2, l2a, l3, l3a = values
-        name = level_names[i]["name"]
-        start, end = level_slices[name]
-
-        modified_block = deepcopy(original_sharp_hex_lines2[start:end])
-        modified_block[0] = f"{float_to_hex(l1)}1d{float_to_hex(l1a)}"
-        modified_block[2] = f"{float_to_hex(l2)}1d{float_to_hex(l2a)}"
-        modified_block[4] = f"{float_to_hex(l3)}1d{float_to_hex(l3a)}"
-
-        lines2.extend(modified_block)
-
-    full_hex = "".join(lines2)
-    return full_hex
-    
-# --- Генерация HEX для Sharp Levels ---
-def generate_sharp_hex3(values_list, level_names, level_slices):
-    lines3 = []
-
-    for i, values in enumerate(values_list):
-        l1, l1a, l2, l2a, l3, l3a = values
-        name = level_names[i]["name"]
-        start, end = level_slices[name]
-
-        modified_block = deepcopy(original_sharp_hex_lines3[start:end])
-        modified_block[0] = f"{float_to_hex(l1)}1d{float_to_hex(l1a)}"
-        modified_block[2] = f"{float_to_hex(l2)}1d{float_to_hex(l2a)}"
-        modified_block[4] = f"{float_to_hex(l3)}1d{float_to_hex(l3a)}"
-
-        lines3.extend(modified_block)
-
-    full_hex = "".join(lines3)
-    return full_hex
-    
-# --- Генерация HEX для Sharp Levels ---
-def generate_sharp_hex4(values_list, level_names, level_slices):
-    lines4 = []
-
-    for i, values in enumerate(values_list):
-        l1, l1a, l2, l2a, l3, l3a = values
-        name = level_names[i]["name"]
-        start, end = level_slices[name]
-
-        modified_block = deepcopy(original_sharp_hex_lines4[start:end])
-        modified_block[0] = f"{float_to_hex(l1)}1d{float_to_hex(l1a)}"
-        modified_block[2] = f"{float_to_hex(l2)}1d{float_to_hex(l2a)}"
-        modified_block[4] = f"{float_to_hex(l3)}1d{float_to_hex(l3a)}"
-
-        lines4.extend(modified_block)
-
-    full_hex = "".join(lines4)
-    return full_hex
-    
-# --- Генерация HEX только для Bento Sharp ---
-def generate_bento_sharp_hex(values_list, level_names, level_slices):
-    lines = []
-
-    for i, values in enumerate(values_list):
-        l1, l1a, l2, l2a, l3, l3a = values
-        name = level_names[i]["name"]
-        start, end = level_slices[name]
-
-        modified_block = deepcopy(original_sharp_hex_lines[start:end])
-        modified_block[0] = f"{float_to_hex(l1)}1d{float_to_hex(l1a)}"
-        modified_block[2] = f"{float_to_hex(l2)}1d{float_to_hex(l2a)}"
-        modified_block[4] = f"{float_to_hex(l3)}1d{float_to_hex(l3a)}"
-
-        lines.extend(modified_block)
-
-    full_hex = "".join(lines)
-    return full_hex
-
-
-# === BAYER LUMA DENOISE ===
-
-# --- Bayer Denoise Blocks ---
-bayer_blocks = {
-    "Bayer luma denoise very low": [
-        "00000a610a0f0d",
-        "0000803f",         # L1
-        "15",
-        "cdcccc3d",         # L1A
-        "1d",
-        "ae50223f",         # L1B
-        "0a0f0d",
-        "6666663f",         # L2
-        "15",
-        "cdcccc3d",         # L2A
-        "1d",
-        "95806d3e",         # L2B
-        "0a0f0d",
-        "9a99593f",         # L3
-        "15",
-        "cdcc4c3d",         # L3A
-        "1d",
-        "09997a3e",         # L3B
-        "0a0f0d",
-        "cdcc4c3f",         # L4
-        "15",
-        "cdcc4c3d",         # L4A
-        "1d",
-        "0e06743e",         # L4B
-        "0a0a0d",
-        "0000403f",         # L5
-        "1d",
-        "68ceb13e",         # L5A
-        "12050d0000a0401dcdcccc3f250000003f0a610a0f0d"
-    ],
-    "Bayer luma denoise low": [
-        "cdcc4c3f",         # L1
-        "15",
-        "cdcccc3d",         # L1A
-        "1d",
-        "65a5113f",         # L1B
-        "0a0f0d",
-        "3333333f",         # L2
-        "15",
-        "cdcccc3d",         # L2A
-        "1d",
-        "5a469a3e",         # L2B
-        "0a0f0d",
-        "3333333f",         # L3
-        "15",
-        "9a99993d",         # L3A
-        "1d",
-        "6616913e",         # L3B
-        "0a0f0d",
-        "9a99193f",         # L4
-        "15",
-        "0000803d",         # L4A
-        "1d",
-        "f20bbf3e",         # L4B
-        "0a0a0d",
-        "3333333f",         # L5
-        "1d",
-        "ffe6ed3e",         # L5A
-        "12050d000020411dcdcccc3f250000003f0a610a0f0d"
-    ],
-    "Bayer luma denoise med": [
-        "3333333f",         # L1
-        "15",
-        "cdcccc3d",         # L1A
-        "1d",
-        "14fa003f",         # L1B
-        "0a0f0d",
-        "cdcc4c3f",         # L2
-        "15",
-        "cdcccc3d",         # L2A
-        "1d",
-        "49ccbd3e",         # L2B
-        "0a0f0d",
-        "9a99193f",         # L3
-        "15",
-        "cdcccc3d",         # L3A
-        "1d",
-        "37e0a43e",         # L3B
-        "0a0f0d",
-        "cdcccc3e",         # L4
-        "15",
-        "9a99993d",         # L4A
-        "1d",
-        "7b0a023f",         # L4B
-        "0a0a0d",
-        "0000003f",         # L5
-        "1d",
-        "d1ff143f",         # L5A
-        "12050d0000a0411dcdcccc3f250000003f0a610a0f0d"
-    ],
-    "Bayer luma denoise high": [
-        "9a99193f",         # L1
-        "15",
-        "9a99193e",         # L1A
-        "1d",
-        "1093243f",         # L1B
-        "0a0f0d",
-        "0000003f",         # L2
-        "15",
-        "cdcccc3d",         # L2A
-        "1d",
-        "d08a203f",         # L2B
-        "0a0f0d",
-        "5c8fc23e",         # L3
-        "15",
-        "cdcccc3d",         # L3A
-        "1d",
-        "54eef13e",         # L3B
-        "0a0f0d",
-        "9a99993e",         # L4
-        "15",
-        "cdcccc3d",         # L4A
-        "1d",
-        "93d7b93e",         # L4B
-        "0a0a0d",
-        "cdcc4c3e",         # L5
-        "1d",
-        "af3c9f3d",         # L5A
-        "12050d000020421dcdcccc3f250000003f0a610a0f0d"
-    ],
-    "Bayer luma denoise very high": [
-        "6666263f",         # L1
-        "15",
-        "9a99193e",         # L1A
-        "1d",
-        "1093243f",         # L1B
-        "0a0f0d",
-        "0000403f",         # L2
-        "15",
-        "cdcccc3d",         # L2A
-        "1d",
-        "d08a203f",         # L2B
-        "0a0f0d",
-        "0000803e",         # L3
-        "15",
-        "cdcccc3d",         # L3A
-        "1d",
-        "54eef13e",         # L3B
-        "0a0f0d",
-        "0000803e",         # L4
-        "15",
-        "cdcccc3d",         # L4A
-        "1d",
-        "93d7b93e",         # L4B
-        "0a0a0d",
-        "cdcc4c3e",         # L5
-        "1d",
-        "af3c9f3d",         # L5A
-        "12050d0000a0421dcdcccc3f250000003f000a610a0f0d"
-    ]
-}
+layout_titles = {name: tab["title"] for name, tab in layout_tabs.items()}
+# --- Раскладки Sharp для сравнения АЧХ и подбора: короткие подписи ---
+sharp_short_titles = {name: tab["short"] for name, tab in layout_tabs.items() if "short" in tab}
 
-# --- Значения по умолчанию для новых уровней ---
-bayer_levels = [
-    {"name": "Bayer luma denoise very low", "default": [1.00, 0.10, 0.634044, 0.90, 0.10, 0.231936, 0.85, 0.050, 0.244724, 0.80, 0.050, 0.238304, 0.75, 0.347278]},
-    {"name": "Bayer luma denoise low",      "default": [0.80, 0.10, 0.568930, 0.70, 0.10, 0.301318, 0.70, 0.075, 0.283374, 0.60, 0.0625, 0.373138, 0.70, 0.464653]},
-    {"name": "Bayer luma denoise med",      "default": [0.70, 0.10, 0.503816, 0.80, 0.10, 0.370699, 0.60, 0.10, 0.322023, 0.40, 0.075, 0.507972, 0.50, 0.582028]},
-    {"name": "Bayer luma denoise high",     "default": [0.60, 0.15, 0.642869, 0.50, 0.10, 0.627118, 0.25, 0.10, 0.472521, 0.25, 0.10, 0.362973, 0.20, 0.0777525]},
-    {"name": "Bayer luma denoise very high", "default": [0.65, 0.15, 0.642869, 0.75, 0.10, 0.627118, 0.38, 0.10, 0.472521, 0.30, 0.10, 0.362973, 0.25, 0.0777525]}
-]
-
-# --- Функция генерации HEX для Bayer Denoise (по аналогии с Sharp Main) ---
-def generate_bayer_hex(values_list, level_names):
-    lines = []
-
-    # --- Генерация каждого уровня ---
-    for i, values in enumerate(values_list):
-        l1, l1a, l1b, l2, l2a, l2b, l3, l3a, l3b, l4, l4a, l4b, l5, l5a = values
-
-        # --- Шаблон уровня ---
-        level_hex = (
-            f"{float_to_hex(l1)}"
-            "15"
-            f"{float_to_hex(l1a)}"
-            "1d"
-            f"{float_to_hex(l1b)}"
-            "0a0f0d"
-            f"{float_to_hex(l2)}"
-            "15"
-            f"{float_to_hex(l2a)}"
-            "1d"
-            f"{float_to_hex(l2b)}"
-            "0a0f0d"
-            f"{float_to_hex(l3)}"
-            "15"
-            f"{float_to_hex(l3a)}"
-            "1d"
-            f"{float_to_hex(l3b)}"
-            "0a0f0d"
-            f"{float_to_hex(l4)}"
-            "15"
-            f"{float_to_hex(l4a)}"
-            "1d"
-            f"{float_to_hex(l4b)}"
-            "0a0a0d"
-            f"{float_to_hex(l5)}"
-            "1d"
-            f"{float_to_hex(l5a)}"
-        )
-        # === Добавляем правильную завершающую служебную строку ===
-        if i == len(values_list) - 5:
-            level_hex += "12050d0000a0401dcdcccc3f250000003f0a610a0f0d"
-        if i == len(values_list) - 4:
-            level_hex += "12050d000020411dcdcccc3f250000003f0a610a0f0d"
-        if i == len(values_list) - 3:
-            level_hex += "12050d0000a0411dcdcccc3f250000003f0a610a0f0d"
-        if i == len(values_list) - 2:
-            level_hex += "12050d000020421dcdcccc3f250000003f0a610a0f0d" 
-        lines.append(level_hex)
-
-    full_hex = "".join(lines)
-    return full_hex
-
-# --- Генерация HEX для Chroma Denoise ---
-def generate_chroma_hex(values_list, level_names):
-    lines = []
-    # --- Генерация каждого уровня ---
-    for i, values in enumerate(values_list):
-        l1, l1a, l2, l2a, l3, l3a, l4, l4a = values
-
-        # === Шаблон уровня ===
-        level_hex = (
-            f"{float_to_hex(l1)}1d{float_to_hex(l1a)}0a0a0d"
-            f"{float_to_hex(l2)}1d{float_to_hex(l2a)}0a0a0d"
-            f"{float_to_hex(l3)}1d{float_to_hex(l3a)}0a0a0d"
-            f"{float_to_hex(l4)}1d{float_to_hex(l4a)}"
-        )
+# --- Столбец поля ввода: место параметра в своей полосе схемы (L — левый, A — средний, B — правый) ---
+def band_columns(layout):
+    return [i for band in layout_schemas[layout]["bands"]
+            for i, _ in enumerate(value for value in band.values() if isinstance(value, str))]
 
-        # === Добавляем правильную завершающую служебную строку ===
-        if i == len(values_list) - 4:
-            level_hex += "12050d0000803f0a3e0a050d0000a0400a0a0d"
-        if i == len(values_list) - 3:
-            level_hex += "12050d0000a0400a3e0a050d0000a0400a0a0d"
-        if i == len(values_list) - 2:
-            level_hex += "12050d000020410a3e0a050d0000a0400a0a0d" 
-        lines.append(level_hex)
-
-    full_hex = "".join(lines)
-    return full_hex
-    
-    
 # --- Интерфейс Streamlit ---
+run_started = time.perf_counter()
 st.set_page_config(page_title="HEX Sharp & Denoise Generator", layout="wide")
 st.title("🔧 Sharp & Bayer Denoise HEX Code Generator")
 
-tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs(["🔍 Sharp Main ID15", "🔍 Sharp Main ID14", "🔍 Sharp Main ID16", "🍱 Sharp Bento", "🔍 Sharp Main ID12", "🌪️ Luma Denoise", "Chroma Denoise"])
-
-
-# === ВКЛАДКА 1: ОСНОВНЫЕ SHARP УРОВНИ ===
-with tab1:
-    st.markdown("### 🔧 Редактирование основных Sharp уровней: 10A8B45")
-
-    sharp_inputs = []
-    for idx, level in enumerate(main_sharp_levels):
-        with st.expander(level["name"], expanded=True):
-            cols = st.columns(3)
-            l1 = cols[0].number_input("L1", value=st.session_state.get(f"sharp_l1_{idx}_temp", level["default"][0]), format="%.4f", key=f"sharp_l1_{idx}")
-            l1a = cols[1].number_input("L1A", value=st.session_state.get(f"sharp_l1a_{idx}_temp", level["default"][1]), format="%.4f", key=f"sharp_l1a_{idx}")
-            l2 = cols[0].number_input("L2", value=st.session_state.get(f"sharp_l2_{idx}_temp", level["default"][2]), format="%.4f", key=f"sharp_l2_{idx}")
-            l2a = cols[1].number_input("L2A", value=st.session_state.get(f"sharp_l2a_{idx}_temp", level["default"][3]), format="%.4f", key=f"sharp_l2a_{idx}")
-            l3 = cols[0].number_input("L3", value=st.session_state.get(f"sharp_l3_{idx}_temp", level["default"][4]), format="%.4f", key=f"sharp_l3_{idx}")
-            l3a = cols[1].number_input("L3A", value=st.session_state.get(f"sharp_l3a_{idx}_temp", level["default"][5]), format="%.4f", key=f"sharp_l3a_{idx}")
-
-            sharp_inputs.append([l1, l1a, l2, l2a, l3, l3a])
-
-    if st.button("🚀 Сгенерировать основной Sharp HEX"):
-        full_hex = generate_sharp_hex(sharp_inputs, main_sharp_levels, sharp_slices)
-        st.code(full_hex, language="text")
-    # --- Раздел 2: MAIN SHARP PARSER ---
-    with st.expander("🔸Парсер Sharp Main Levels", expanded=False):
-        st.markdown("Вставь HEX-строку с уровнями Sharp")
-
-        hex_input_main = st.text_area("HEX для Main Sharp:", value="", height=200, key="main_parser_input")
-
-        if st.button("🔍 Распарсить Main Sharp HEX"):
-            if not hex_input_main.strip():
-                st.warning("❌ Вставь HEX-строку для расшифровки!")
-            else:
-                try:
-                    results = []
-                    offset = 0
-                    for level_name in ["very low", "low", "med", "high", "very high"]:
-                        # === L1, L1A, L2, L2A, L3, L3A ===
-                        l1 = hex_input_main[offset:offset+8]
-                        offset += 8 + 2
-                        l1a = hex_input_main[offset:offset+8]
-                        offset += 8 + 26
-
-                        l2 = hex_input_main[offset:offset+8]
-                        offset += 8 + 2
-                        l2a = hex_input_main[offset:offset+8]
-                        offset += 8 + 26
-
-                        l3 = hex_input_main[offset:offset+8]
-                        offset += 8 + 2
-                        l3a = hex_input_main[offset:offset+8]
-                        offset += 8 + 44
-
-                        results.append({
-                            "name": level_name,
-                            "L1": l1,
-                            "L1A": l1a,
-                            "L2": l2,
-                            "L2A": l2a,
-                            "L3": l3,
-                            "L3A": l3a
-                        })
-
-                    # --- Сохраняем в session_state ---
-                    for idx, res in enumerate(results):
-                        st.session_state[f"sharp_l1_{idx}_temp"] = float(round(hex_to_float(res['L1']), 6))
-                        st.session_state[f"sharp_l1a_{idx}_temp"] = float(round(hex_to_float(res['L1A']), 6))
-                        st.session_state[f"sharp_l2_{idx}_temp"] = float(round(hex_to_float(res['L2']), 6))
-                        st.session_state[f"sharp_l2a_{idx}_temp"] = float(round(hex_to_float(res['L2A']), 6))
-                        st.session_state[f"sharp_l3_{idx}_temp"] = float(round(hex_to_float(res['L3']), 6))
-                        st.session_state[f"sharp_l3a_{idx}_temp"] = float(round(hex_to_float(res['L3A']), 6))
-
-                    st.success("✅ Поля Main Sharp обновлены")
-                    st.rerun()
-
-                except Exception as e:
-                    st.error(f"❌ Ошибка при парсинге Main Sharp: {e}")
-                    
-# === ВКЛАДКА 2: ОСНОВНЫЕ SHARP УРОВНИ ID14 ===
-with tab2:
-    st.markdown("### 🔧 Редактирование основных Sharp уровней: 10A8315")
-
-    sharp_inputs2 = []
-    for idx, level in enumerate(all_sharp_levels2):
-        with st.expander(level["name"], expanded=True):
-            cols = st.columns(3)
-            l1 = cols[0].number_input("L1", value=st.session_state.get(f"2sharp_l1_{idx}_temp", level["default"][0]), format="%.4f", key=f"2sharp_l1_{idx}")
-            l1a = cols[1].number_input("L1A", value=st.session_state.get(f"2sharp_l1a_{idx}_temp", level["default"][1]), format="%.4f", key=f"2sharp_l1a_{idx}")
-            l2 = cols[0].number_input("L2", value=st.session_state.get(f"2sharp_l2_{idx}_temp", level["default"][2]), format="%.4f", key=f"2sharp_l2_{idx}")
-            l2a = cols[1].number_input("L2A", value=st.session_state.get(f"2sharp_l2a_{idx}_temp", level["default"][3]), format="%.4f", key=f"2sharp_l2a_{idx}")
-            l3 = cols[0].number_input("L3", value=st.session_state.get(f"2sharp_l3_{idx}_temp", level["default"][4]), format="%.4f", key=f"2sharp_l3_{idx}")
-            l3a = cols[1].number_input("L3A", value=st.session_state.get(f"2sharp_l3a_{idx}_temp", level["default"][5]), format="%.4f", key=f"2sharp_l3a_{idx}")
-
-            sharp_inputs2.append([l1, l1a, l2, l2a, l3, l3a])
-
-    if st.button("🚀 Сгенерировать основной Sharp HEX ID14"):
-        full_hex = generate_sharp_hex2(sharp_inputs2, all_sharp_levels2, sharp_slices)
-        st.code(full_hex, language="text")
-    # --- Раздел 2: MAIN SHARP PARSER ---
-    with st.expander("🔸Парсер Sharp Main Levels", expanded=False):
-        st.markdown("Вставь HEX-строку с уровнями Sharp")
-
-        hex_input_main2 = st.text_area("HEX для Main Sharp ID14:", value="", height=200, key="main_parser_input2")
-
-        if st.button("🔍 Распарсить Main Sharp HEX ID14"):
-            if not hex_input_main2.strip():
-                st.warning("❌ Вставь HEX-строку для расшифровки!")
-            else:
-                try:
-                    results = []
-                    offset = 0
-                    for level_name in ["very low", "low", "med", "high", "very high"]:
-                        # === L1, L1A, L2, L2A, L3, L3A ===
-                        l1 = hex_input_main2[offset:offset+8]
-                        offset += 8 + 2
-                        l1a = hex_input_main2[offset:offset+8]
-                        offset += 8 + 26
-
-                        l2 = hex_input_main2[offset:offset+8]
-                        offset += 8 + 2
-                        l2a = hex_input_main2[offset:offset+8]
-                        offset += 8 + 26
-
-                        l3 = hex_input_main2[offset:offset+8]
-                        offset += 8 + 2
-                        l3a = hex_input_main2[offset:offset+8]
-                        offset += 8 + 44
-
-                        results.append({
-                            "name": level_name,
-                            "L1": l1,
-                            "L1A": l1a,
-                            "L2": l2,
-                            "L2A": l2a,
-                            "L3": l3,
-                            "L3A": l3a
-                        })
-
-                    # --- Сохраняем в session_state ---
-                    for idx, res in enumerate(results):
-                        st.session_state[f"2sharp_l1_{idx}_temp"] = float(round(hex_to_float(res['L1']), 6))
-                        st.session_state[f"2sharp_l1a_{idx}_temp"] = float(round(hex_to_float(res['L1A']), 6))
-                        st.session_state[f"2sharp_l2_{idx}_temp"] = float(round(hex_to_float(res['L2']), 6))
-                        st.session_state[f"2sharp_l2a_{idx}_temp"] = float(round(hex_to_float(res['L2A']), 6))
-                        st.session_state[f"2sharp_l3_{idx}_temp"] = float(round(hex_to_float(res['L3']), 6))
-                        st.session_state[f"2sharp_l3a_{idx}_temp"] = float(round(hex_to_float(res['L3A']), 6))
-
-                    st.success("✅ Поля Main Sharp ID14 обновлены")
-                    st.rerun()
-
-                except Exception as e:
-                    st.error(f"❌ Ошибка при парсинге Main Sharp ID14: {e}")
-
-# === ВКЛАДКА 3: ОСНОВНЫЕ SHARP УРОВНИ ID16 ===
-with tab3:
-    st.markdown("### 🔧 Редактирование основных Sharp уровней: 10A8D55")
-
-    sharp_inputs3 = []
-    for idx, level in enumerate(all_sharp_levels3):
-        with st.expander(level["name"], expanded=True):
-            cols = st.columns(3)
-            l1 = cols[0].number_input("L1", value=st.session_state.get(f"3sharp_l1_{idx}_temp", level["default"][0]), format="%.4f", key=f"3sharp_l1_{idx}")
-            l1a = cols[1].number_input("L1A", value=st.session_state.get(f"3sharp_l1a_{idx}_temp", level["default"][1]), format="%.4f", key=f"3sharp_l1a_{idx}")
-            l2 = cols[0].number_input("L2", value=st.session_state.get(f"3sharp_l2_{idx}_temp", level["default"][2]), format="%.4f", key=f"3sharp_l2_{idx}")
-            l2a = cols[1].number_input("L2A", value=st.session_state.get(f"3sharp_l2a_{idx}_temp", level["default"][3]), format="%.4f", key=f"3sharp_l2a_{idx}")
-            l3 = cols[0].number_input("L3", value=st.session_state.get(f"3sharp_l3_{idx}_temp", level["default"][4]), format="%.4f", key=f"3sharp_l3_{idx}")
-            l3a = cols[1].number_input("L3A", value=st.session_state.get(f"3sharp_l3a_{idx}_temp", level["default"][5]), format="%.4f", key=f"3sharp_l3a_{idx}")
-
-            sharp_inputs3.append([l1, l1a, l2, l2a, l3, l3a])
-
-    if st.button("🚀 Сгенерировать основной Sharp HEX ID16"):
-        full_hex = generate_sharp_hex3(sharp_inputs3, all_sharp_levels3, sharp_slices)
-        st.code(full_hex, language="text")
-    # --- Раздел 2: MAIN SHARP PARSER ---
-    with st.expander("🔸Парсер Sharp Main Levels", expanded=False):
-        st.markdown("Вставь HEX-строку с уровнями Sharp")
-
-        hex_input_main3 = st.text_area("HEX для Main Sharp ID16:", value="", height=200, key="main_parser_input3")
-
-        if st.button("🔍 Распарсить Main Sharp HEX ID16"):
-            if not hex_input_main3.strip():
-                st.warning("❌ Вставь HEX-строку для расшифровки!")
-            else:
-                try:
-                    results = []
-                    offset = 0
-                    for level_name in ["very low", "low", "med", "high", "very high"]:
-                        # === L1, L1A, L2, L2A, L3, L3A ===
-                        l1 = hex_input_main3[offset:offset+8]
-                        offset += 8 + 2
-                        l1a = hex_input_main3[offset:offset+8]
-                        offset += 8 + 36
-
-                        l2 = hex_input_main3[offset:offset+8]
-                        offset += 8 + 2
-                        l2a = hex_input_main3[offset:offset+8]
-                        offset += 8 + 36
-
-                        l3 = hex_input_main3[offset:offset+8]
-                        offset += 8 + 2
-                        l3a = hex_input_main3[offset:offset+8]
-                        offset += 8 + 54
-
-                        results.append({
-                            "name": level_name,
-                            "L1": l1,
-                            "L1A": l1a,
-                            "L2": l2,
-                            "L2A": l2a,
-                            "L3": l3,
-                            "L3A": l3a
-                        })
-
-                    # --- Сохраняем в session_state ---
-                    for idx, res in enumerate(results):
-                        st.session_state[f"3sharp_l1_{idx}_temp"] = float(round(hex_to_float(res['L1']), 6))
-                        st.session_state[f"3sharp_l1a_{idx}_temp"] = float(round(hex_to_float(res['L1A']), 6))
-                        st.session_state[f"3sharp_l2_{idx}_temp"] = float(round(hex_to_float(res['L2']), 6))
-                        st.session_state[f"3sharp_l2a_{idx}_temp"] = float(round(hex_to_float(res['L2A']), 6))
-                        st.session_state[f"3sharp_l3_{idx}_temp"] = float(round(hex_to_float(res['L3']), 6))
-                        st.session_state[f"3sharp_l3a_{idx}_temp"] = float(round(hex_to_float(res['L3A']), 6))
-
-                    st.success("✅ Поля Main Sharp ID16 обновлены")
-                    st.rerun()
-
-                except Exception as e:
-                    st.error(f"❌ Ошибка при парсинге Main Sharp ID16: {e}")
-                    
-# === ВКЛАДКА 4: BENTO SHARP ===
-with tab4:
-    st.markdown("### 🍱 Редактирование Bento Sharp уровней")
-
-    bento_inputs = []
-    # === Sharp bento low (index 0) ===
-    with st.expander("Sharp bento low", expanded=True):
-        cols = st.columns(3)
-        l1 = cols[0].number_input("L1", value=st.session_state.get("bento_l1_0_temp", 16.0), format="%.4f", key="bento_l1_0")
-        l1a = cols[1].number_input("L1A", value=st.session_state.get("bento_l1a_0_temp", 0.0195), format="%.4f", key="bento_l1a_0")
-        l2 = cols[0].number_input("L2", value=st.session_state.get("bento_l2_0_temp", 3.10), format="%.4f", key="bento_l2_0")
-        l2a = cols[1].number_input("L2A", value=st.session_state.get("bento_l2a_0_temp", 0.01975), format="%.4f", key="bento_l2a_0")
-        l3 = cols[0].number_input("L3", value=st.session_state.get("bento_l3_0_temp", 1.89), format="%.4f", key="bento_l3_0")
-        l3a = cols[1].number_input("L3A", value=st.session_state.get("bento_l3a_0_temp", 0.02), format="%.4f", key="bento_l3a_0")
-        bento_inputs.append([l1, l1a, l2, l2a, l3, l3a])
-    
-    # === Sharp bento high (index 1) ===
-    with st.expander("Sharp bento high", expanded=True):
-        cols = st.columns(3)
-        l1 = cols[0].number_input("L1", value=st.session_state.get("bento_l1_1_temp", 18.5), format="%.4f", key="bento_l1_1")
-        l1a = cols[1].number_input("L1A", value=st.session_state.get("bento_l1a_1_temp", 0.0174), format="%.4f", key="bento_l1a_1")
-        l2 = cols[0].number_input("L2", value=st.session_state.get("bento_l2_1_temp", 2.70), format="%.4f", key="bento_l2_1")
-        l2a = cols[1].number_input("L2A", value=st.session_state.get("bento_l2a_1_temp", 0.0187), format="%.4f", key="bento_l2a_1")
-        l3 = cols[0].number_input("L3", value=st.session_state.get("bento_l3_1_temp", 1.70), format="%.4f", key="bento_l3_1")
-        l3a = cols[1].number_input("L3A", value=st.session_state.get("bento_l3a_1_temp", 0.02), format="%.4f", key="bento_l3a_1")
-        bento_inputs.append([l1, l1a, l2, l2a, l3, l3a])
-    
-    if st.button("🚀 Сгенерировать Bento Sharp HEX"):
-        full_hex = generate_bento_sharp_hex(bento_inputs, bento_sharp_levels, sharp_bento_slices)
-        st.code(full_hex, language="text")
-        
-    with st.expander("Парсер Sharp Bento Low & High", expanded=False):
-        st.markdown("Вставь HEX-строку с уровнями Sharp Bento (без заголовка):")
-        hex_input_bento = st.text_area("HEX для Bento уровней:", value="", height=200, key="bento_parser_input")
-    
-        if st.button("🔍 Распарсить Sharp Bento HEX"):
-            if not hex_input_bento.strip():
-                st.warning("❌ Вставь HEX-строку для расшифровки!")
-            else:
-                try:
-                    offset = 0
-    
-                    # === Sharp bento low (index 0) ===
-                    l1_low = hex_input_bento[offset:offset+8]
-                    offset += 8 + 2
-                    l1a_low = hex_input_bento[offset:offset+8]
-                    offset += 8 + 26
-    
-                    l2_low = hex_input_bento[offset:offset+8]
-                    offset += 8 + 2
-                    l2a_low = hex_input_bento[offset:offset+8]
-                    offset += 8 + 26
-    
-                    l3_low = hex_input_bento[offset:offset+8]
-                    offset += 8 + 2
-                    l3a_low = hex_input_bento[offset:offset+8]
-    
-                    # После low — служебная строка длиной 44
-                    offset += 8 + 44
-    
-                    # === Sharp bento high (index 1) ===
-                    l1_high = hex_input_bento[offset:offset+8]
-                    offset += 8 + 2
-                    l1a_high = hex_input_bento[offset:offset+8]
-                    offset += 8 + 26
-    
-                    l2_high = hex_input_bento[offset:offset+8]
-                    offset += 8 + 2
-                    l2a_high = hex_input_bento[offset:offset+8]
-                    offset += 8 + 26
-    
-                    l3_high = hex_input_bento[offset:offset+8]
-                    offset += 8 + 2
-                    l3a_high = hex_input_bento[offset:offset+8]
-    
-                    # === Сохраняем во временные ключи по индексам (0 и 1) ===
-                    for idx, (l1, l1a, l2, l2a, l3, l3a) in enumerate([
-                        [l1_low, l1a_low, l2_low, l2a_low, l3_low, l3a_low],
-                        [l1_high, l1a_high, l2_high, l2a_high, l3_high, l3a_high]
-                    ]):
-                        st.session_state[f"bento_l1_{idx}_temp"] = float(round(hex_to_float(l1), 6))
-                        st.session_state[f"bento_l1a_{idx}_temp"] = float(round(hex_to_float(l1a), 6))
-                        st.session_state[f"bento_l2_{idx}_temp"] = float(round(hex_to_float(l2), 6))
-                        st.session_state[f"bento_l2a_{idx}_temp"] = float(round(hex_to_float(l2a), 6))
-                        st.session_state[f"bento_l3_{idx}_temp"] = float(round(hex_to_float(l3), 6))
-                        st.session_state[f"bento_l3a_{idx}_temp"] = float(round(hex_to_float(l3a), 6))
-    
-                    st.success("✅ Поля Sharp Bento обновлены")
-                    st.rerun()
-    
-                except Exception as e:
-                    st.error(f"❌ Ошибка при парсинге Bento: {e}")
-                    
-# === ВКЛАДКА 5: ОСНОВНЫЕ SHARP УРОВНИ ID12 ===
-with tab5:
-    st.markdown("### 🔧 Редактирование основных Sharp уровней: 10A8315")
-
-    sharp_inputs4 = []
-    for idx, level in enumerate(all_sharp_levels4):
+st.sidebar.file_uploader("🖼 Эталон для превью резкости:", type=["png", "jpg", "jpeg", "tif", "tiff", "bmp"], key="preview_image")
+
+with st.sidebar.expander("📊 Кэш блоков", expanded=False):
+    stats = blob_cache().stats()
+    cols = st.columns(2)
+    cols[0].metric("Попадания", stats["hits"])
+    cols[1].metric("Промахи", stats["misses"])
+    st.caption(f"Записей: {stats['size']} / {stats['maxsize']}, вытеснено: {stats['evictions']}, "
+               f"доля попаданий: {stats['hit_rate']:.0%}")
+
+# --- Общий парсер: раскладка определяется автоматически ---
+with st.expander("🧭 Вставь любой HEX — вкладка определится сама", expanded=False):
+    hex_input_any = st.text_area("HEX любого блока:", value="", height=150, key="any_parser_input")
+
+    if st.button("🔍 Распознать и распарсить"):
+        if not hex_input_any.strip():
+            st.warning("❌ Вставь HEX-строку для расшифровки!")
+        else:
+            try:
+                detection, levels = decode_any(hex_input_any)
+                store_levels(detection.layout, levels, "вставка HEX (распознан)")
+                st.session_state["any_parser_result"] = (detection.layout, detection.confidence)
+                st.rerun()
+            except Exception as e:
+                st.error(f"❌ Ошибка при распознавании: {e}")
+
+    if "any_parser_result" in st.session_state:
+        layout, confidence = st.session_state.pop("any_parser_result")
+        message = f"Поля вкладки «{layout_titles[layout]}» обновлены (уверенность {confidence:.0%})"
+        if confidence < 0.9:
+            st.warning(f"⚠️ {message} — структура совпала не полностью, проверь вкладку")
+        else:
+            st.success(f"✅ {message}")
+
+*layout_tab_slots, tab8, tab9, tab10, tab11 = st.tabs(
+    [tab["title"] for tab in layout_tabs.values()] + ["📂 Дамп", "🧮 Перебор", "🆚 Сравнение", "🗄 Архив"])
+
+
+# === ВКЛАДКИ РАСКЛАДОК: поля ввода — по ключам и полосам схемы, подписи — из layout_tabs ===
+@timed_fragment
+def layout_panel(layout):
+    tab = layout_tabs[layout]
+    st.markdown(tab["heading"])
+
+    params = param_store(layout)
+    prefix = tab["prefix"]
+    keys = layout_keys[layout]
+    columns = band_columns(layout)
+    for idx, level in enumerate(layout_levels[layout]):
         with st.expander(level["name"], expanded=True):
-            cols = st.columns(3)
-            l1 = cols[0].number_input("L1", value=st.session_state.get(f"4sharp_l1_{idx}_temp", level["default"][0]), format="%.4f", key=f"4sharp_l1_{idx}")
-            l1a = cols[1].number_input("L1A", value=st.session_state.get(f"4sharp_l1a_{idx}_temp", level["default"][1]), format="%.4f", key=f"4sharp_l1a_{idx}")
-            l2 = cols[0].number_input("L2", value=st.session_state.get(f"4sharp_l2_{idx}_temp", level["default"][2]), format="%.4f", key=f"4sharp_l2_{idx}")
-            l2a = cols[1].number_input("L2A", value=st.session_state.get(f"4sharp_l2a_{idx}_temp", level["default"][3]), format="%.4f", key=f"4sharp_l2a_{idx}")
-            l3 = cols[0].number_input("L3", value=st.session_state.get(f"4sharp_l3_{idx}_temp", level["default"][4]), format="%.4f", key=f"4sharp_l3_{idx}")
-            l3a = cols[1].number_input("L3A", value=st.session_state.get(f"4sharp_l3a_{idx}_temp", level["default"][5]), format="%.4f", key=f"4sharp_l3a_{idx}")
-
-            sharp_inputs4.append([l1, l1a, l2, l2a, l3, l3a])
-
-    if st.button("🚀 Сгенерировать основной Sharp HEX ID12"):
-        full_hex = generate_sharp_hex4(sharp_inputs4, all_sharp_levels4, sharp_slices)
-        st.code(full_hex, language="text")
-    # --- Раздел 2: MAIN SHARP PARSER ---
-    with st.expander("🔸Парсер Sharp Main Levels", expanded=False):
-        st.markdown("Вставь HEX-строку с уровнями Sharp")
-
-        hex_input_main4 = st.text_area("HEX для Main Sharp ID12:", value="", height=200, key="main_parser_input4")
-
-        if st.button("🔍 Распарсить Main Sharp HEX ID12"):
-            if not hex_input_main4.strip():
+            cols = st.columns(tab["columns"])
+            params[idx] = tuple(
+                cols[column].number_input(key.upper(), value=float(params[idx][key.upper()]), format=tab["format"],
+                                          key=f"{prefix}_{key}_{idx}")
+                for key, column in zip(keys, columns))
+    history_panel(layout, params)
+
+    if st.button(tab["generate"]):
+        st.session_state[f"{layout}_output"] = True
+    output_panel(layout, params)
+    for panel in tab["panels"]:
+        panel(layout, params)
+    # --- Парсер HEX -> поля вкладки ---
+    with st.expander(tab["parser"], expanded=False):
+        st.markdown(tab["hint"])
+
+        hex_input = st.text_area(f"HEX для {tab['name']}:", value="", height=200, key=tab["parser_key"])
+
+        if st.button(f"🔍 Распарсить {tab['name']} HEX", key=f"{layout}_parse"):
+            if not hex_input.strip():
                 st.warning("❌ Вставь HEX-строку для расшифровки!")
             else:
                 try:
-                    results = []
-                    offset = 0
-                    for level_name in ["very low", "low", "med", "high", "very high"]:
-                        # === L1, L1A, L2, L2A, L3, L3A ===
-                        l1 = hex_input_main4[offset:offset+8]
-                        offset += 8 + 2
-                        l1a = hex_input_main4[offset:offset+8]
-                        offset += 8 + 26
-
-                        l2 = hex_input_main4[offset:offset+8]
-                        offset += 8 + 2
-                        l2a = hex_input_main4[offset:offset+8]
-                        offset += 8 + 26
-
-                        l3 = hex_input_main4[offset:offset+8]
-                        offset += 8 + 2
-                        l3a = hex_input_main4[offset:offset+8]
-                        offset += 8 + 44
-
-                        results.append({
-                            "name": level_name,
-                            "L1": l1,
-                            "L1A": l1a,
-                            "L2": l2,
-                            "L2A": l2a,
-                            "L3": l3,
-                            "L3A": l3a
-                        })
-
-                    # --- Сохраняем в session_state ---
-                    for idx, res in enumerate(results):
-                        st.session_state[f"4sharp_l1_{idx}_temp"] = float(round(hex_to_float(res['L1']), 6))
-                        st.session_state[f"4sharp_l1a_{idx}_temp"] = float(round(hex_to_float(res['L1A']), 6))
-                        st.session_state[f"4sharp_l2_{idx}_temp"] = float(round(hex_to_float(res['L2']), 6))
-                        st.session_state[f"4sharp_l2a_{idx}_temp"] = float(round(hex_to_float(res['L2A']), 6))
-                        st.session_state[f"4sharp_l3_{idx}_temp"] = float(round(hex_to_float(res['L3']), 6))
-                        st.session_state[f"4sharp_l3a_{idx}_temp"] = float(round(hex_to_float(res['L3A']), 6))
-
-                    st.success("✅ Поля Main Sharp ID12 обновлены")
-                    st.rerun()
-
-                except Exception as e:
-                    st.error(f"❌ Ошибка при парсинге Main Sharp ID12: {e}")
-
-
-# === ВКЛАДКА 6: LUMA DENOISE (генератор + парсер) ===
-with tab6:
-    st.markdown("### 🌪️ Настройка параметров Luma Denoise, id 14 - 10a42a5, id 15 - 10a4a95, id 16 - 10a4c85")
-
-    bayer_inputs = []
-
-    for idx, level in enumerate(bayer_levels):
-        with st.expander(level["name"], expanded=True):
-            cols = st.columns(3)
-
-            l1 = cols[0].number_input("L1", value=st.session_state.get(f"bayer_l1_{idx}_temp", level["default"][0]), format="%.6f", key=f"bayer_l1_{idx}")
-            l1a = cols[1].number_input("L1A", value=st.session_state.get(f"bayer_l1a_{idx}_temp", level["default"][1]), format="%.6f", key=f"bayer_l1a_{idx}")
-            l1b = cols[2].number_input("L1B", value=st.session_state.get(f"bayer_l1b_{idx}_temp", level["default"][2]), format="%.6f", key=f"bayer_l1b_{idx}")
+                    store_levels(layout, parse_levels_hex(hex_input, layout))
 
-            l2 = cols[0].number_input("L2", value=st.session_state.get(f"bayer_l2_{idx}_temp", level["default"][3]), format="%.6f", key=f"bayer_l2_{idx}")
-            l2a = cols[1].number_input("L2A", value=st.session_state.get(f"bayer_l2a_{idx}_temp", level["default"][4]), format="%.6f", key=f"bayer_l2a_{idx}")
-            l2b = cols[2].number_input("L2B", value=st.session_state.get(f"bayer_l2b_{idx}_temp", level["default"][5]), format="%.6f", key=f"bayer_l2b_{idx}")
+                    st.success(f"✅ Поля {tab['name']} обновлены")
+                    rerun_panel()
 
-            l3 = cols[0].number_input("L3", value=st.session_state.get(f"bayer_l3_{idx}_temp", level["default"][6]), format="%.6f", key=f"bayer_l3_{idx}")
-            l3a = cols[1].number_input("L3A", value=st.session_state.get(f"bayer_l3a_{idx}_temp", level["default"][7]), format="%.6f", key=f"bayer_l3a_{idx}")
-            l3b = cols[2].number_input("L3B", value=st.session_state.get(f"bayer_l3b_{idx}_temp", level["default"][8]), format="%.6f", key=f"bayer_l3b_{idx}")
-
-            l4 = cols[0].number_input("L4", value=st.session_state.get(f"bayer_l4_{idx}_temp", level["default"][9]), format="%.6f", key=f"bayer_l4_{idx}")
-            l4a = cols[1].number_input("L4A", value=st.session_state.get(f"bayer_l4a_{idx}_temp", level["default"][10]), format="%.6f", key=f"bayer_l4a_{idx}")
-            l4b = cols[2].number_input("L4B", value=st.session_state.get(f"bayer_l4b_{idx}_temp", level["default"][11]), format="%.6f", key=f"bayer_l4b_{idx}")
-
-            l5 = cols[0].number_input("L5", value=st.session_state.get(f"bayer_l5_{idx}_temp", level["default"][12]), format="%.6f", key=f"bayer_l5_{idx}")
-            l5a = cols[1].number_input("L5A", value=st.session_state.get(f"bayer_l5a_{idx}_temp", level["default"][13]), format="%.6f", key=f"bayer_l5a_{idx}")
-
-            bayer_inputs.append([l1, l1a, l1b, l2, l2a, l2b, l3, l3a, l3b, l4, l4a, l4b, l5, l5a])
-
-    if st.button("🚀 Сгенерировать HEX (Bayer Denoise)"):
-        full_hex = generate_bayer_hex(bayer_inputs, bayer_levels)
-        st.code(full_hex, language="text")
-
-    # === Парсер HEX → Float для Bayer Denoise (внутри вкладки 3) ===
-    with st.expander("Парсер для Bayer Denoise", expanded=False):
-        st.markdown("### 🔁 Расшифровать HEX обратно (Bayer Denoise)")
-        hex_input_bayer = st.text_area("Вставь HEX-строку сюда:", value="", height=200, key="bayer_parser_input_inside_3")
-        
-        if st.button("🔍 Распарсить HEX (автозаполнение)"):
-            if not hex_input_bayer.strip():
-                st.warning("❌ Вставь HEX-строку для расшифровки!")
-            else:
-                try:
-                    offset = 0
-        
-                    # --- Обрабатываем 5 уровней ---
-                    for idx in range(5):  # всегда 5 уровней
-                        # === L1, L1A, L1B ===
-                        l1 = hex_input_bayer[offset:offset+8]
-                        offset += 8 + 2
-                        l1a = hex_input_bayer[offset:offset+8]
-                        offset += 8 + 2
-                        l1b = hex_input_bayer[offset:offset+8]
-                        offset += 8 + 6  # "0a0f0d" = 6 символов
-        
-                        # === L2, L2A, L2B ===
-                        l2 = hex_input_bayer[offset:offset+8]
-                        offset += 8 + 2
-                        l2a = hex_input_bayer[offset:offset+8]
-                        offset += 8 + 2
-                        l2b = hex_input_bayer[offset:offset+8]
-                        offset += 8 + 6
-        
-                        # === L3, L3A, L3B ===
-                        l3 = hex_input_bayer[offset:offset+8]
-                        offset += 8 + 2
-                        l3a = hex_input_bayer[offset:offset+8]
-                        offset += 8 + 2
-                        l3b = hex_input_bayer[offset:offset+8]
-                        offset += 8 + 6
-        
-                        # === L4, L4A, L4B ===
-                        l4 = hex_input_bayer[offset:offset+8]
-                        offset += 8 + 2
-                        l4a = hex_input_bayer[offset:offset+8]
-                        offset += 8 + 2
-                        l4b = hex_input_bayer[offset:offset+8]
-                        offset += 8 + 6
-        
-                        # === L5, L5A + служебная строка ===
-                        l5 = hex_input_bayer[offset:offset+8]
-                        offset += 8 + 2
-                        l5a = hex_input_bayer[offset:offset+8]
-                        offset += 8 + 44  # служебная строка после L5A = 44 символа
-        
-                        # === Сохраняем во временные ключи ===
-                        st.session_state[f"bayer_l1_{idx}_temp"] = float(round(hex_to_float(l1), 6))
-                        st.session_state[f"bayer_l1a_{idx}_temp"] = float(round(hex_to_float(l1a), 6))
-                        st.session_state[f"bayer_l1b_{idx}_temp"] = float(round(hex_to_float(l1b), 6))
-                        st.session_state[f"bayer_l2_{idx}_temp"] = float(round(hex_to_float(l2), 6))
-                        st.session_state[f"bayer_l2a_{idx}_temp"] = float(round(hex_to_float(l2a), 6))
-                        st.session_state[f"bayer_l2b_{idx}_temp"] = float(round(hex_to_float(l2b), 6))
-                        st.session_state[f"bayer_l3_{idx}_temp"] = float(round(hex_to_float(l3), 6))
-                        st.session_state[f"bayer_l3a_{idx}_temp"] = float(round(hex_to_float(l3a), 6))
-                        st.session_state[f"bayer_l3b_{idx}_temp"] = float(round(hex_to_float(l3b), 6))
-                        st.session_state[f"bayer_l4_{idx}_temp"] = float(round(hex_to_float(l4), 6))
-                        st.session_state[f"bayer_l4a_{idx}_temp"] = float(round(hex_to_float(l4a), 6))
-                        st.session_state[f"bayer_l4b_{idx}_temp"] = float(round(hex_to_float(l4b), 6))
-                        st.session_state[f"bayer_l5_{idx}_temp"] = float(round(hex_to_float(l5), 6))
-                        st.session_state[f"bayer_l5a_{idx}_temp"] = float(round(hex_to_float(l5a), 6))
-        
-                    st.success("✅ Поля ввода обновлены")
-                    st.rerun()
-    
                 except Exception as e:
-                    st.error(f"❌ Ошибка при парсинге Bayer Denoise: {e}")
-# === ВКЛАДКА 7: CHROMA DENOISE (новая вкладка) ===
-with tab7:
-    st.markdown("### 🎨 Chroma Denoise: 010A3C2C")
-
-    chroma_levels = [
-        {"name": "Chroma Denoise Low", "default": [5.0, 5.0, 5.0, 5.0, 4.0, 4.0, 4.0, 4.0]},
-        {"name": "Chroma Denoise Med", "default": [5.0, 5.0, 5.0, 5.0, 1.0, 4.0, 2.0, 4.0]},
-        {"name": "Chroma Denoise High", "default": [5.0, 5.0, 4.0, 5.0, 1.0, 4.0, 1.5, 4.0]},
-        {"name": "Chroma Denoise Very High", "default": [4.0, 5.0, 4.0, 5.0, 0.8, 4.0, 1.0, 4.0]}
-    ]
-
-    chroma_inputs = []
-    for idx, level in enumerate(chroma_levels):
-        with st.expander(level["name"], expanded=True):
+                    st.error(f"❌ Ошибка при парсинге {tab['name']}: {e}")
+
+for layout, slot in zip(layout_tabs, layout_tab_slots):
+    with slot:
+        layout_panel(layout)
+
+# === ВКЛАДКА 8: ПОИСК БЛОКОВ В ДАМПЕ ===
+@timed_fragment
+def dump_panel():
+    st.markdown("### 📂 Поиск блоков Sharp / Bayer / Chroma в полном дампе")
+    st.markdown("Загрузи бинарный или HEX-дамп целиком — вырезать блок вручную не нужно.")
+
+    dump_file = st.file_uploader("Дамп конфигурации:", key="dump_file")
+    if dump_file is not None:
+        try:
+            blocks = scan_dump(dump_file.file_id, dump_file.getvalue())
+        except Exception as e:
+            st.error(f"❌ Ошибка при чтении дампа: {e}")
+            blocks = []
+
+        if not blocks:
+            st.warning("❌ Известные блоки не найдены")
+        else:
+            st.dataframe(
+                [{"Семейство": b["family"], "Смещение": f"0x{b['offset']:x}", "Уровней": len(b["levels"])} for b in blocks],
+                use_container_width=True,
+            )
+            block_idx = st.selectbox(
+                "Блок:", range(len(blocks)),
+                format_func=lambda i: f"{blocks[i]['family']} @ 0x{blocks[i]['offset']:x} ({len(blocks[i]['levels'])} ур.)",
+                key="dump_block",
+            )
+            block = blocks[block_idx]
             cols = st.columns(2)
-            l1 = cols[0].number_input("L1", value=st.session_state.get(f"chroma_l1_{idx}_temp", level["default"][0]), format="%.6f", key=f"chroma_l1_{idx}")
-            l1a = cols[1].number_input("L1A", value=st.session_state.get(f"chroma_l1a_{idx}_temp", level["default"][1]), format="%.6f", key=f"chroma_l1a_{idx}")
-            l2 = cols[0].number_input("L2", value=st.session_state.get(f"chroma_l2_{idx}_temp", level["default"][2]), format="%.6f", key=f"chroma_l2_{idx}")
-            l2a = cols[1].number_input("L2A", value=st.session_state.get(f"chroma_l2a_{idx}_temp", level["default"][3]), format="%.6f", key=f"chroma_l2a_{idx}")
-            l3 = cols[0].number_input("L3", value=st.session_state.get(f"chroma_l3_{idx}_temp", level["default"][4]), format="%.6f", key=f"chroma_l3_{idx}")
-            l3a = cols[1].number_input("L3A", value=st.session_state.get(f"chroma_l3a_{idx}_temp", level["default"][5]), format="%.6f", key=f"chroma_l3a_{idx}")
-            l4 = cols[0].number_input("L4", value=st.session_state.get(f"chroma_l4_{idx}_temp", level["default"][6]), format="%.6f", key=f"chroma_l4_{idx}")
-            l4a = cols[1].number_input("L4A", value=st.session_state.get(f"chroma_l4a_{idx}_temp", level["default"][7]), format="%.6f", key=f"chroma_l4a_{idx}")
-
-            chroma_inputs.append([l1, l1a, l2, l2a, l3, l3a, l4, l4a])
-
-    if st.button("🚀 Сгенерировать HEX (Chroma Denoise)"):
-        full_hex = generate_chroma_hex(chroma_inputs, chroma_levels)
-        st.text_area("Сгенерированный HEX (Chroma Denoise):", value=full_hex, height=400)
-        st.code(full_hex, language="text")
-    # --- Раздел 4: CHROMA DENOISE PARSER (без вывода значений) ---
-    with st.expander("🔸 Chroma Denoise (все уровни)", expanded=False):
-        st.markdown("Вставь HEX-строку с уровнями `Chroma Denoise`, сгенерированную программой.")
-        st.markdown("Структура: `заголовок` + `low`, `med`, `high`, `very high`")
-    
-        hex_input_chroma = st.text_area("HEX для Chroma Denoise:", value="", height=200, key="chroma_parser_input_inside")
-    
-        if st.button("🔍 Распарсить Chroma Denoise HEX"):
-            if not hex_input_chroma.strip():
-                st.warning("❌ Вставь HEX-строку для расшифровки!")
-            else:
-                try:
-                    offset = 0 
-                    results = []
-    
-                    for idx in range(4):  # 4 уровня
-                        # === L1, L1A ===
-                        l1 = hex_input_chroma[offset:offset+8]
-                        offset += 8 + 2
-                        l1a = hex_input_chroma[offset:offset+8]
-                        offset += 8 + 6
-    
-                        # === L2, L2A ===
-                        l2 = hex_input_chroma[offset:offset+8]
-                        offset += 8 + 2
-                        l2a = hex_input_chroma[offset:offset+8]
-                        offset += 8 + 6
-    
-                        # === L3, L3A ===
-                        l3 = hex_input_chroma[offset:offset+8]
-                        offset += 8 + 2
-                        l3a = hex_input_chroma[offset:offset+8]
-                        offset += 8 + 6
-    
-                        # === L4, L4A ===
-                        l4 = hex_input_chroma[offset:offset+8]
-                        offset += 8 + 2
-                        l4a = hex_input_chroma[offset:offset+8]
-    
-                        # === Завершающая служебная строка ===
-                        if idx == 3:
-                            offset += 8 + 30  # для very high
-                        else:
-                            offset += 8 + 38  # для low, med, high
-    
-                        results.append({
-                            "L1": l1,
-                            "L1A": l1a,
-                            "L2": l2,
-                            "L2A": l2a,
-                            "L3": l3,
-                            "L3A": l3a,
-                            "L4": l4,
-                            "L4A": l4a,
-                        })
-    
-                    # --- Сохраняем во временные ключи ---
-                    for idx, res in enumerate(results):
-                        st.session_state[f"chroma_l1_{idx}_temp"] = float(round(hex_to_float(res["L1"]), 6))
-                        st.session_state[f"chroma_l1a_{idx}_temp"] = float(round(hex_to_float(res["L1A"]), 6))
-                        st.session_state[f"chroma_l2_{idx}_temp"] = float(round(hex_to_float(res["L2"]), 6))
-                        st.session_state[f"chroma_l2a_{idx}_temp"] = float(round(hex_to_float(res["L2A"]), 6))
-                        st.session_state[f"chroma_l3_{idx}_temp"] = float(round(hex_to_float(res["L3"]), 6))
-                        st.session_state[f"chroma_l3a_{idx}_temp"] = float(round(hex_to_float(res["L3A"]), 6))
-                        st.session_state[f"chroma_l4_{idx}_temp"] = float(round(hex_to_float(res["L4"]), 6))
-                        st.session_state[f"chroma_l4a_{idx}_temp"] = float(round(hex_to_float(res["L4A"]), 6))
-    
-                    st.success("✅ Поля Chroma Denoise обновлены")
+            target = cols[0].selectbox("Загрузить во вкладку:", families[block["family"]][1], key="dump_target")
+            start = cols[1].number_input("С уровня:", min_value=0, max_value=len(block["levels"]) - 1, value=0, key="dump_start")
+
+            if st.button("📥 Загрузить уровни из дампа"):
+                n_levels = layouts[target].n_levels
+                levels = block["levels"][start:start + n_levels]
+                if len(levels) < n_levels:
+                    st.warning(f"❌ В блоке после уровня {start} только {len(levels)} уровней из {n_levels}")
+                else:
+                    store_levels(target, levels, f"дамп: {block['family']} @ 0x{block['offset']:x}")
+                    st.success("✅ Поля обновлены")
                     st.rerun()
-                except Exception as e:
-                    st.error(f"❌ Ошибка при парсинге Chroma Denoise: {e}")
+
+with tab8:
+    dump_panel()
+
+# === ВКЛАДКА 9: ПЕРЕБОР ПАРАМЕТРОВ ===
+# Архив для скачивания держится в памяти сервера, поэтому здесь предел; большие переборы — `luma-gen sweep`
+SWEEP_LIMIT = 100_000
+
+@timed_fragment
+def sweep_panel():
+    st.markdown("### 🧮 Перебор параметров")
+    st.markdown("Все сочетания значений выбранных полей; остальные поля берутся из вкладки раскладки. "
+                "Ось на строку: `l1=6:12:1` (включительно), `l2a@0,2=0.01,0.02,0.05` — поле на уровнях 0 и 2.")
+    cols = st.columns(2)
+    layout = cols[0].selectbox("Раскладка:", list(layout_titles), format_func=layout_titles.get, key="sweep_layout")
+    fmt = cols[1].radio("Формат:", ["ZIP", "NDJSON"], horizontal=True, key="sweep_format")
+    axes_text = st.text_area("Оси перебора:", value="l1=6:12:1\nl2a=0.01:0.05:0.01", height=120, key="sweep_axes")
+
+    try:
+        sweep = Sweep(layout, [parse_axis(line) for line in axes_text.splitlines() if line.strip()],
+                      to_levels(param_store(layout)))
+    except ValueError as e:
+        st.error(f"❌ {e}")
+        return
+    st.caption(f"Вариантов: {sweep.count:,} · блоков: {sweep.count * sweep.blob_size / 1e6:.1f} МБ".replace(",", " "))
+    if sweep.count > SWEEP_LIMIT:
+        axes = " ".join(f'--axis "{line.strip()}"' for line in axes_text.splitlines() if line.strip())
+        st.warning(f"❌ В интерфейсе не больше {SWEEP_LIMIT:,} вариантов. Большой перебор — из командной строки:".replace(",", " "))
+        st.code(f"luma-gen sweep --layout {layout} {axes} --hex {generate_cached(layout, param_store(layout))} "
+                f"--jobs {os.cpu_count() or 1} -o sweep.zip", language="bash")
+        return
+
+    if st.button("🧮 Собрать", key="sweep_run"):
+        started = time.perf_counter()
+        if fmt == "ZIP":
+            out = io.BytesIO()
+            write_zip(sweep, out)
+            data, name, mime = out.getvalue(), f"{layout}_sweep.zip", "application/zip"
+        else:
+            out = io.StringIO()
+            write_ndjson(sweep, out)
+            data, name, mime = out.getvalue().encode(), f"{layout}_sweep.ndjson", "application/x-ndjson"
+        st.session_state["sweep_result"] = ((layout, fmt, axes_text), data, name, mime, (time.perf_counter() - started) * 1000)
+
+    # Архив показывается, пока не изменились раскладка, формат или оси
+    result = st.session_state.get("sweep_result")
+    if result is not None and result[0] == (layout, fmt, axes_text):
+        _, data, name, mime, elapsed = result
+        st.download_button(f"💾 Скачать {name} ({len(data) / 1e6:.1f} МБ)", data, file_name=name, mime=mime,
+                           on_click="ignore", key="sweep_download")
+        st.caption(f"⏱ Сборка: {elapsed:.0f} мс")
+
+with tab9:
+    sweep_panel()
+
+# === ВКЛАДКА 10: СРАВНЕНИЕ БЛОКОВ ===
+@st.cache_data(max_entries=2, show_spinner="Чтение библиотеки...")
+def read_library(file_id, _data):
+    lines = [line.strip() for line in _data.decode(errors="replace").splitlines() if line.strip()]
+    return [json.loads(line)["hex"] if line.startswith("{") else line for line in lines]
+
+@timed_fragment
+def diff_panel():
+    st.markdown("### 🆚 Сравнение блоков поле к полю")
+    cols = st.columns(2)
+    ours = cols[0].text_area("Блок A (наш):", value="", height=150, key="diff_a")
+    theirs = cols[1].text_area("Блок B (присланный):", value="", height=150, key="diff_b")
+    if not ours.strip():
+        st.info("Вставь блок A — раскладка определится по нему")
+        return
+
+    if theirs.strip():
+        try:
+            result = diff(ours, theirs)
+        except Exception as e:
+            st.error(f"❌ Ошибка при сравнении: {e}")
+        else:
+            st.markdown(f"Раскладка: **{layout_titles[result.layout]}**")
+            if result.same:
+                st.success("✅ Блоки совпадают")
+            if result.size_a != result.size_b:
+                st.warning(f"⚠️ Разная длина: {result.size_a} и {result.size_b} байт — служебные байты не сравнивались")
+            if result.fields:
+                st.dataframe([{"Уровень": f.level, "Поле": f.key.upper(), "A": f.a, "B": f.b, "Δ": f.b - f.a,
+                               "Δ, %": f.rel * 100} for f in result.fields], use_container_width=True)
+            if result.structure:
+                st.warning(f"⚠️ Отличаются служебные байты: {len(result.structure)} участков")
+                st.dataframe([{"Смещение": f"0x{run.offset:x}", "Уровень": run.level if run.level >= 0 else "заголовок",
+                               "A": run.a.hex(), "B": run.b.hex()} for run in result.structure],
+                             use_container_width=True)
+
+    library_file = st.file_uploader("Библиотека пресетов (HEX на строку или NDJSON с полем hex):",
+                                    type=["txt", "hex", "ndjson", "jsonl"], key="diff_library")
+    if library_file is not None:
+        try:
+            library = read_library(library_file.file_id, library_file.getvalue())
+            started = time.perf_counter()
+            result = diff_library(ours, library)
+            elapsed = (time.perf_counter() - started) * 1000
+        except Exception as e:
+            st.error(f"❌ Ошибка при сравнении с библиотекой: {e}")
+            return
+        order = np.lexsort((result["max_rel"], result["structure"], result["changed"]))[:50]
+        st.dataframe([{"№": int(i), "Изменено полей": int(result["changed"][i]), "Макс. Δ": float(result["max_abs"][i]),
+                       "Макс. Δ, %": float(result["max_rel"][i]) * 100, "Служебных байт": int(result["structure"][i])}
+                      for i in order], use_container_width=True)
+        st.caption(f"⏱ Сравнение с {len(library)} пресетами: {elapsed:.1f} мс")
+
+with tab10:
+    diff_panel()
+
+# === ВКЛАДКА 11: АРХИВ ПРЕСЕТОВ ===
+ARCHIVE_DIR = os.environ.get("LUMA_ARCHIVE_DIR", "presets")
+ARCHIVE_PAGE = 200
+
+# Архив открывается заново, когда меняется размер файла (дописали записи)
+@st.cache_resource(max_entries=8)
+def open_archive(path, size):
+    return PresetArchive(path)
+
+@st.cache_resource(max_entries=4, show_spinner="Построение индекса похожих пресетов...")
+def nearest_index(path, size):
+    return NearestIndex(open_archive(path, size).values)
+
+def nearest_panel(layout, path, archive):
+    with st.expander("🔎 Похожие пресеты", expanded=False):
+        cols = st.columns([2, 1])
+        source = cols[0].radio("Искать похожие на:", ["Параметры вкладки", "Вставленный блок"], horizontal=True,
+                               key="nearest_source")
+        k = cols[1].number_input("Сколько:", min_value=1, max_value=100, value=5, key="nearest_k")
+        if source == "Вставленный блок":
+            blob = st.text_area("HEX блока:", value="", height=100, key="nearest_hex")
+            if not blob.strip():
+                return
+            try:
+                levels = layouts[layout].decode(blob.strip())
+            except Exception as e:
+                st.error(f"❌ Ошибка при разборе блока: {e}")
+                return
+        else:
+            levels = to_levels(param_store(layout))
+
+        index = nearest_index(path, os.path.getsize(path))
+        started = time.perf_counter()
+        indices, distances = index.query(levels, k)
+        elapsed = (time.perf_counter() - started) * 1000
+        st.dataframe([{"№": i, "Расстояние, σ": d, "Имя": archive.meta(i)[0] or "", "Теги": ", ".join(archive.meta(i)[1])}
+                      for i, d in zip(indices.tolist(), distances.tolist())], use_container_width=True)
+        method = "KD-дерево" if index.tree is not None else "полный перебор"
+        st.caption(f"⏱ Поиск среди {len(index)} пресетов: {elapsed:.1f} мс ({method}) · "
+                   "расстояние — средняя разница полей в стандартных отклонениях по архиву")
+
+@timed_fragment
+def archive_panel():
+    st.markdown("### 🗄 Архив пресетов")
+    st.markdown(f"Архив на раскладку в `{ARCHIVE_DIR}/`: записи фиксированной длины читаются через memmap, "
+                "без загрузки файла целиком.")
+    layout = st.selectbox("Раскладка:", list(layout_titles), format_func=layout_titles.get, key="archive_layout")
+    path = os.path.join(ARCHIVE_DIR, f"{layout}.lpa")
+
+    with st.expander("💾 Сохранить текущие параметры вкладки", expanded=False):
+        cols = st.columns(2)
+        name = cols[0].text_input("Имя:", key="archive_name")
+        tags = cols[1].text_input("Теги через запятую:", key="archive_tags")
+        if st.button("💾 Сохранить в архив", key="archive_save"):
+            try:
+                os.makedirs(ARCHIVE_DIR, exist_ok=True)
+                index = PresetArchive.open_or_create(path, layout).append(
+                    to_levels(param_store(layout)), name.strip() or None,
+                    [tag.strip() for tag in tags.split(",") if tag.strip()])
+                st.success(f"✅ Сохранено под номером {index}")
+            except Exception as e:
+                st.error(f"❌ Ошибка при сохранении: {e}")
+
+    if not os.path.exists(path):
+        st.info("Архив этой раскладки пока пуст")
+        return
+    try:
+        archive = open_archive(path, os.path.getsize(path))
+    except Exception as e:
+        st.error(f"❌ Ошибка при открытии архива: {e}")
+        return
+
+    nearest_panel(layout, path, archive)
+
+    cols = st.columns(2)
+    tag_filter = cols[0].multiselect("Теги:", sorted(archive.tags), key="archive_tag_filter")
+    where = cols[1].text_input("Условия через «;», напр. l1@2>0.5; l3a<0.1:", key="archive_where")
+    try:
+        selected = archive.select(tags=tag_filter, where=[parse_condition(text) for text in where.split(";") if text.strip()])
+    except ValueError as e:
+        st.error(f"❌ {e}")
+        return
+    st.caption(f"Записей: {len(archive)} · отобрано: {len(selected)}")
+    if not len(selected):
+        return
+
+    pages = -(-len(selected) // ARCHIVE_PAGE)
+    page = st.number_input("Страница:", min_value=1, max_value=pages, value=1, key="archive_page") if pages > 1 else 1
+    shown = selected[(page - 1) * ARCHIVE_PAGE:page * ARCHIVE_PAGE]
+    rows = []
+    for index, blob in zip(shown.tolist(), archive.hex(shown)):
+        name, tags = archive.meta(index)
+        rows.append({"№": index, "Имя": name or "", "Теги": ", ".join(tags), "HEX": blob[:48] + "…"})
+    st.dataframe(rows, use_container_width=True)
+
+    cols = st.columns(2)
+    index = cols[0].selectbox("Запись:", shown.tolist(), key="archive_index",
+                              format_func=lambda i: f"{i} {archive.meta(i)[0] or ''}")
+    if cols[1].button("📥 Загрузить во вкладку", key="archive_load"):
+        store_levels(layout, archive.levels(index), f"архив: запись {index}")
+        st.session_state["archive_loaded"] = (index, layout)
+        st.rerun()
+    if "archive_loaded" in st.session_state:
+        index, loaded = st.session_state.pop("archive_loaded")
+        st.success(f"✅ Запись {index} загружена во вкладку «{layout_titles[loaded]}»")
+
+with tab11:
+    archive_panel()
+
+st.session_state["full_rerun_ms"] = (time.perf_counter() - run_started) * 1000